@@ -18,10 +18,16 @@ RCON_BIN="${RCON_BIN:-/usr/bin/rcon-cli}"
 RCON_PASS="${RCON_PASS:-}"
 
 DRY_RUN=""
-if [[ "${1:-}" == "--dry-run" ]]; then
-  DRY_RUN="--dry-run"
-  echo "🔎 Dry run: no remote changes will be made."
-fi
+DELTA=""
+for arg in "$@"; do
+  case "$arg" in
+    --dry-run)
+      DRY_RUN="--dry-run"
+      echo "🔎 Dry run: no remote changes will be made."
+      ;;
+    --delta) DELTA="1";;   # transfer only files changed since the last deploy
+  esac
+done
 
 # --- sanity checks (clear errors fast) ---
 echo "📍 Repo: ${REPO_DIR}"
@@ -45,19 +51,34 @@ ssh -o BatchMode=yes "${REMOTE_HOST}" true 2>/dev/null || {
 echo "📁 Ensuring remote directories exist…"
 ssh "${REMOTE_HOST}" "mkdir -p '${REMOTE_DENIZEN}/scripts' '${REMOTE_DENIZEN}/data'"
 
-echo "🚚 Syncing scripts → ${REMOTE_HOST}:${REMOTE_DENIZEN}/scripts ..."
-rsync -az ${DRY_RUN} --delete \
-  --chmod=Du=rwx,Fu=rw,Do=rx,Fo=r \
-  --exclude='**/*.dsc.OFF' \
-  "${LOCAL_SCRIPTS_DIR}/" "${REMOTE_HOST}:${REMOTE_DENIZEN}/scripts/"
+if [[ -n "$DELTA" ]]; then
+  echo "🚚 Delta deploy → ${REMOTE_HOST}:${REMOTE_DENIZEN} ..."
+  DELTA_STATUS=0
+  python3 "${REPO_DIR}/reference/delta_deploy.py" --remote "${REMOTE_HOST}:${REMOTE_DENIZEN}" \
+    --exit-status ${DRY_RUN} || DELTA_STATUS=$?
+  if [[ "$DELTA_STATUS" -eq 0 ]]; then
+    echo "ℹ️  No script containers changed; reload skipped."
+    RELOAD_MODE="none"
+  elif [[ "$DELTA_STATUS" -ne 10 ]]; then
+    echo "❌ Delta deploy failed (exit ${DELTA_STATUS})."
+    exit "$DELTA_STATUS"
+  fi
+else
+  echo "🚚 Syncing scripts → ${REMOTE_HOST}:${REMOTE_DENIZEN}/scripts ..."
+  rsync -az ${DRY_RUN} --delete \
+    --chmod=Du=rwx,Fu=rw,Do=rx,Fo=r \
+    --exclude='**/*.dsc.OFF' \
+    "${LOCAL_SCRIPTS_DIR}/" "${REMOTE_HOST}:${REMOTE_DENIZEN}/scripts/"
 
-echo "🚚 Syncing data → ${REMOTE_HOST}:${REMOTE_DENIZEN}/data ..."
-rsync -az ${DRY_RUN} --delete \
-  --chmod=Du=rwx,Fu=rw,Do=rx,Fo=r \
-  "${LOCAL_DATA_DIR}/" "${REMOTE_HOST}:${REMOTE_DENIZEN}/data/"
+  echo "🚚 Syncing data → ${REMOTE_HOST}:${REMOTE_DENIZEN}/data ..."
+  rsync -az ${DRY_RUN} --delete \
+    --chmod=Du=rwx,Fu=rw,Do=rx,Fo=r \
+    "${LOCAL_DATA_DIR}/" "${REMOTE_HOST}:${REMOTE_DENIZEN}/data/"
+fi
 
 # --- optional reload ---
 case "$RELOAD_MODE" in
+  none) ;;
   tmux)
     echo "🔁 Reloading via tmux (${TMUX_SESSION})…"
     ssh "${REMOTE_HOST}" "tmux send-keys -t '${TMUX_SESSION}' 'denizen reload' Enter"
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+SQLite index of Denizen analysis results
+Builds docs/analysis.db and answers reader/writer/caller/event lookups
+"""
+
+import sys
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+
+from analyze_denizen import load_analysis, key_access
+
+DB_FILE = "docs/analysis.db"
+
+SCHEMA = """
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE events (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    line INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    event TEXT NOT NULL,
+    indent INTEGER NOT NULL
+);
+CREATE TABLE keys (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    line INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    type TEXT NOT NULL,
+    access TEXT NOT NULL,
+    context TEXT NOT NULL
+);
+CREATE TABLE calls (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    line INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    target TEXT NOT NULL,
+    context TEXT NOT NULL
+);
+CREATE TABLE scripts (
+    name TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    type TEXT NOT NULL
+);
+CREATE INDEX idx_events_event ON events(event);
+CREATE INDEX idx_keys_key ON keys(key, access);
+CREATE INDEX idx_calls_target ON calls(target);
+CREATE INDEX idx_scripts_name ON scripts(name COLLATE NOCASE);
+"""
+
+def build_database(data, db_path=DB_FILE):
+    """Write analysis records to a fresh SQLite database in one transaction"""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    if db_path.exists():
+        db_path.unlink()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(SCHEMA)
+        file_ids = {}
+
+        def file_id(path):
+            fid = file_ids.get(path)
+            if fid is None:
+                fid = file_ids[path] = len(file_ids) + 1
+            return fid
+
+        events = [(file_id(e['file']), e['line'], e['type'], e['event'], e['indent'])
+                  for e in data['events']]
+        keys = [(file_id(k['file']), k['line'], k['key'], k['scope'], k['type'], key_access(k), k['context'])
+                for k in data['data_keys']]
+        calls = [(file_id(c['file']), c['line'], c['type'], c['target'], c['context'])
+                 for c in data['calls']]
+        scripts = [(s['name'], file_id(s['file']), s['line'], s['end_line'], s['type'])
+                   for s in data.get('scripts', [])]
+
+        with conn:
+            conn.executemany("INSERT INTO files (id, path) VALUES (?, ?)",
+                             [(fid, path) for path, fid in file_ids.items()])
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", events)
+            conn.executemany("INSERT INTO keys VALUES (?, ?, ?, ?, ?, ?, ?)", keys)
+            conn.executemany("INSERT INTO calls VALUES (?, ?, ?, ?, ?)", calls)
+            conn.executemany("INSERT INTO scripts VALUES (?, ?, ?, ?, ?)", scripts)
+    finally:
+        conn.close()
+
+    print(f"Saved analysis database to {db_path}")
+
+KEY_QUERY = (
+    "SELECT f.path, k.line, k.key, k.context FROM keys k JOIN files f ON f.id = k.file_id "
+    "WHERE k.key {op} ? AND k.access = ? ORDER BY f.path, k.line"
+)
+CALL_QUERY = (
+    "SELECT f.path, c.line, c.type, c.context FROM calls c JOIN files f ON f.id = c.file_id "
+    "WHERE c.target = ? ORDER BY f.path, c.line"
+)
+DEFINITION_QUERY = (
+    "SELECT f.path, s.line, s.end_line, s.type, s.name FROM scripts s JOIN files f ON f.id = s.file_id "
+    "WHERE s.name = ? COLLATE NOCASE ORDER BY f.path, s.line"
+)
+EVENT_QUERY = (
+    "SELECT f.path, e.line, e.type, e.event FROM events e JOIN files f ON f.id = e.file_id "
+    "WHERE e.event = ? ORDER BY f.path, e.line"
+)
+
+QUERY_KINDS = ['callers', 'definition', 'events', 'readers', 'writers']
+
+def glob_prefix(prefix):
+    """GLOB pattern matching keys that start with prefix, taken literally
+
+    Keys hold brackets (flag[a[b]]), which GLOB would read as a character
+    class, so every wildcard character is wrapped in brackets of its own.
+    """
+    return ''.join(f"[{c}]" if c in '[*?' else c for c in prefix) + '*'
+
+def build_query(kind, name):
+    """SQL and parameters for one lookup; key names ending in '*' match by prefix"""
+    if kind in ('readers', 'writers'):
+        access = 'read' if kind == 'readers' else 'write'
+        if name.endswith('*'):
+            return KEY_QUERY.format(op='GLOB'), (glob_prefix(name[:-1]), access)
+        return KEY_QUERY.format(op='='), (name, access)
+    if kind == 'callers':
+        return CALL_QUERY, (name,)
+    if kind == 'definition':
+        return DEFINITION_QUERY, (name,)
+    return EVENT_QUERY, (name,)
+
+def query(db_path, kind, name):
+    """Run one lookup and return its rows"""
+    sql, params = build_query(kind, name)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the SQLite analysis index")
+    parser.add_argument('--db', default=DB_FILE, help="database location")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help="build the database from docs/analysis.jsonl or docs/analysis.json")
+    q = sub.add_parser('query', help="look up key readers/writers, script callers/definitions or event handlers")
+    q.add_argument('kind', choices=QUERY_KINDS)
+    q.add_argument('name', help="key, script or event name (keys accept a trailing '*')")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        build_database(load_analysis(compact=True), args.db)
+        return 0
+
+    if not Path(args.db).exists():
+        print(f"❌ No database at {args.db} - run `build` first")
+        return 1
+
+    start = time.perf_counter()
+    rows = query(args.db, args.kind, args.name)
+    elapsed = (time.perf_counter() - start) * 1000
+    for path, line, *rest in rows:
+        print(f"{path}:{line}  " + "  ".join(str(r) for r in rest))
+    print(f"-- {len(rows)} {args.kind} of {args.name} ({elapsed:.1f} ms)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
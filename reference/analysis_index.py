@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Shared lookup index over analysis results
+Built once in a single pass and consumed by every doc generator
+"""
+
+from collections import defaultdict, Counter
+
+from analyze_denizen import key_access
+from call_graph import ScriptCallGraph
+from definitions import DefinitionIndex
+
+class AnalysisIndex:
+    """Precomputed maps over events, data keys and calls
+
+    Every map is filled during one walk of each record list, so generators
+    do dictionary lookups instead of rescanning the records.
+    """
+
+    def __init__(self, data, subsystems=None):
+        self.data = data
+        self.subsystems = subsystems or {}
+
+        # file -> subsystem name
+        self.file_subsystem = {}
+        for name, files in self.subsystems.items():
+            for f in files:
+                self.file_subsystem[f] = name
+
+        self.subsystem_events = defaultdict(list)
+        self.subsystem_calls = defaultdict(list)
+
+        # event name -> handler count / files
+        self.event_counts = Counter()
+        self.event_files = defaultdict(set)
+
+        # key -> type/scope/readers/writers/files/sample contexts
+        self.key_info = {}
+
+        # target -> callers, file -> outbound calls
+        self.call_types = Counter()
+        self.target_counts = Counter()
+        self.target_callers = defaultdict(set)
+        self.file_calls = defaultdict(list)
+        self.file_targets = defaultdict(set)
+
+        self.index_events(data['events'])
+        self.index_data_keys(data['data_keys'])
+        self.index_calls(data['calls'])
+
+        # script name -> definitions, and script -> script edges resolved through them
+        self.definitions = DefinitionIndex(data.get('scripts', []))
+        self.call_graph = ScriptCallGraph(data, self.definitions)
+
+    def index_events(self, events):
+        file_subsystem = self.file_subsystem
+        for e in events:
+            name = e['event']
+            self.event_counts[name] += 1
+            self.event_files[name].add(e['file'])
+            subsystem = file_subsystem.get(e['file'])
+            if subsystem is not None:
+                self.subsystem_events[subsystem].append(e)
+
+    def index_data_keys(self, data_keys):
+        key_info = self.key_info
+        for entry in data_keys:
+            key = entry['key']
+            info = key_info.get(key)
+            if info is None:
+                info = key_info[key] = {
+                    'type': set(),
+                    'scope': set(),
+                    'readers': set(),
+                    'writers': set(),
+                    'files': set(),
+                    'contexts': []
+                }
+            info['type'].add(entry['type'])
+            info['scope'].add(entry['scope'])
+            info['files'].add(entry['file'])
+            if key_access(entry) == 'write':
+                info['writers'].add(entry['file'])
+            else:
+                info['readers'].add(entry['file'])
+            if len(info['contexts']) < 3:
+                info['contexts'].append(entry['context'])
+
+    def index_calls(self, calls):
+        file_subsystem = self.file_subsystem
+        for c in calls:
+            caller = c['file']
+            target = c['target']
+            self.call_types[c['type']] += 1
+            self.target_counts[target] += 1
+            self.target_callers[target].add(caller)
+            self.file_calls[caller].append(c)
+            self.file_targets[caller].add(target)
+            subsystem = file_subsystem.get(caller)
+            if subsystem is not None:
+                self.subsystem_calls[subsystem].append(c)
@@ -6,136 +6,391 @@ Parses all .dsc files and extracts events, data keys, and call graphs
 
 import os
 import re
+import mmap
+import time
+import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from collections import defaultdict
 import json
 
+from dsc_tree import EVENT_KEY_PATTERN, parse_line, parse_lines, split_args, split_key_value
+from dsc_tags import flag_reads
+from record_store import RecordStore
+from file_inventory import FileInventory, INVENTORY_FILE, add_inventory_arguments
+from profiling import add_profile_arguments, profiler_for, stage, hot, finish
+
+# Line patterns, compiled once and shared by every parse
+# Flag reads on a tag's root object; the name may hold one level of [brackets]
+FLAG_READ = re.compile(
+    r'<(player|server|npc|\[[^\[\]<>]+\])\.(?:has_)?flag(?:_expiration)?\[((?:[^\[\]]|\[[^\[\]]*\])+)\]',
+    re.IGNORECASE)
+# A tag inside a flag key; the regex above misreads deeper nesting and flags
+# read inside another flag's key, so these lines go through dsc_tags
+NESTED_FLAG_KEY = re.compile(r'flag(?:_expiration)?\[[^\]]*<', re.IGNORECASE)
+# Flag targets held in definitions, e.g. <[player]>, <[caster]>
+DEF_TARGET = re.compile(r'^<?\[([^\[\]<>]+)\]>?$')
+PLAYER_DEFS = ('player', 'caster')
+
+YAML_PATTERNS = [
+    re.compile(r'<yaml\[([^\]]+)\]\.read\[([^\]]+)\]>', re.IGNORECASE),
+    re.compile(r'-\s+yaml\s+set\s+([^\s:]+):([^\s]+)', re.IGNORECASE),
+]
+
+CALL_COMMANDS = ('run', 'inject', 'task')
+
+# Command forms that write a key; anything else is a read
+FLAG_WRITE = re.compile(r'-\s+~?(?:flag|adjust)\s+\S+\s+(?:flag:)?([^\s:]+)', re.IGNORECASE)
+YAML_WRITE = re.compile(r'-\s+yaml\s+set\s+', re.IGNORECASE)
+
+# Top-level script container, e.g. "game_loop_world:" at column 0
+CONTAINER_PATTERN = re.compile(r'^([^\s:#][^\s:]*)\s*:\s*$')
+
+# Files this large are memory-mapped and scanned as bytes (see scan_buffer)
+MMAP_MIN_BYTES = 32 * 1024
+# Bytes where line handling differs between bytes and decoded text: anything
+# non-ASCII, a lone CR (a newline to readlines) and the controls str.strip() eats
+BYTE_SCAN_UNSAFE = re.compile(rb'[\x80-\xff\x0b\x0c\x1c-\x1f]|\r(?!\n)')
+# Line openings that can yield a record, matched in the mapped bytes:
+# a column-0 key, a type: key, an on/after key or a run/inject/task command.
+# Anchoring on the newline lets the regex engine skip straight between lines.
+RECORD_LINE_HEAD = rb'[^\s:#\-]|[ \t]*(?:type:|on[ \t]|after[ \t]|-[ \t]*~?(?:run|inject|task))'
+FIRST_LINE_HEAD = re.compile(RECORD_LINE_HEAD, re.IGNORECASE)
+NEXT_LINE_HEAD = re.compile(rb'\n(?:' + RECORD_LINE_HEAD + rb')', re.IGNORECASE)
+# Words that can yield a data key anywhere on a line; one pattern per word, as
+# an alternation would lose the regex engine's literal-prefix search
+RECORD_WORDS = (re.compile(rb'flag', re.IGNORECASE), re.compile(rb'yaml', re.IGNORECASE))
+# mmap has no count(); the regex counts newlines without copying the buffer
+NEWLINE = re.compile(rb'\n')
+
+KEY_PLAYER_TAG = re.compile(r'^<player\.')
+KEY_SERVER_TAG = re.compile(r'^<server\.')
+KEY_PLAYER_SHORT = re.compile(r'^p\.')
+KEY_SERVER_SHORT = re.compile(r'^s\.')
+KEY_CLOSING_TAG = re.compile(r'>$')
+
+# Bump whenever scan_lines changes what it extracts, so stale caches are dropped
+CACHE_VERSION = 4
+CACHE_FILE = "docs/analysis_cache.json"
+
+# Streaming record format: one JSON object per line, tagged with its kind
+RECORDS_FILE = "docs/analysis.jsonl"
+PROFILE_FILE = "docs/profile_analyze.json"
+RECORD_KINDS = {
+    'event': 'events',
+    'data_key': 'data_keys',
+    'call': 'calls',
+    'script': 'scripts',
+}
+
+def flag_scope(target):
+    """Scope of a flag target: player/server/npc, or entity for other objects
+
+    Accepts the command form (`player`, `<player>`, `<[caster]>`,
+    `<npc[<[pet]>]>`) and the tag root form (`player`, `[caster]`).
+    """
+    target = target.split('|', 1)[0].strip().lower()
+    if target in ('player', '<player>'):
+        return 'player'
+    if target in ('server', '<server>'):
+        return 'server'
+    if target in ('npc', '<npc>') or target.startswith('<npc['):
+        return 'npc'
+    match = DEF_TARGET.match(target)
+    if match:
+        name = match.group(1)
+        if name in PLAYER_DEFS or name.endswith('_player'):
+            return 'player'
+        if name == 'npc' or name.endswith('_npc'):
+            return 'npc'
+    return 'entity'
+
 class DenizenAnalyzer:
-    def __init__(self, root_dir):
+    def __init__(self, root_dir, compact=False, trees=None, include=None, exclude=(), disabled=False):
         self.root_dir = Path(root_dir)
-        self.events = []
-        self.data_keys = []
-        self.calls = []
-        self.scripts = []
+        # File selection for find_dsc_files; the last walk is kept in self.inventory
+        self.include = include
+        self.exclude = exclude
+        self.disabled = disabled
+        self.inventory = None
+        # Optional dsc_tree.TreeCache that receives every parsed file's tree
+        self.trees = trees
+        if compact:
+            # Columnar storage with interned strings; same list-like API
+            self.store = RecordStore()
+            self.events = self.store.events
+            self.data_keys = self.store.data_keys
+            self.calls = self.store.calls
+            self.scripts = self.store.scripts
+        else:
+            self.store = None
+            self.events = []
+            self.data_keys = []
+            self.calls = []
+            self.scripts = []
+        self.stream = None
+        self.streamed = (0, 0, 0, 0)
+        # Optional profiling.Profiler: per-stage and per-file timings
+        self.profiler = None
 
     def find_dsc_files(self):
-        """Find all .dsc files recursively"""
-        return list(self.root_dir.rglob("*.dsc"))
+        """Find all matching scripts recursively, in sorted path order
+
+        The walk's FileInventory (sizes, mtimes, subsystems) is kept for the
+        incremental cache and the doc stages.
+        """
+        self.inventory = FileInventory.scan(self.root_dir, self.include, self.exclude, self.disabled)
+        return self.inventory.paths()
 
     def normalize_key(self, key):
         """Normalize flag/data key names"""
         key = key.strip()
         # Normalize common prefixes
-        key = re.sub(r'^<player\.', 'player.', key)
-        key = re.sub(r'^<server\.', 'server.', key)
-        key = re.sub(r'^p\.', 'player.', key)
-        key = re.sub(r'^s\.', 'server.', key)
+        key = KEY_PLAYER_TAG.sub('player.', key)
+        key = KEY_SERVER_TAG.sub('server.', key)
+        key = KEY_PLAYER_SHORT.sub('player.', key)
+        key = KEY_SERVER_SHORT.sub('server.', key)
         # Remove closing tags
-        key = re.sub(r'>$', '', key)
+        key = KEY_CLOSING_TAG.sub('', key)
         return key
 
     def parse_file(self, filepath):
         """Parse a single .dsc file"""
         rel_path = filepath.relative_to(self.root_dir)
+        if self.profiler is not None:
+            started = time.perf_counter()
+            records = sum(self.record_counts())
 
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
+            buf = map_file(filepath)
+            if buf is None:
+                with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                    lines = f.readlines()
         except Exception as e:
             print(f"Error reading {rel_path}: {e}")
             return
 
-        for line_num, line in enumerate(lines, 1):
-            original_line = line
-            line = line.rstrip()
+        if buf is not None:
+            # No tree is built; a TreeCache parses the file itself if a later pass needs it
+            with buf:
+                self.scan_buffer(str(rel_path), buf)
+        else:
+            self.scan_lines(str(rel_path), lines)
+        if self.profiler is not None:
+            self.profiler.file(str(rel_path), time.perf_counter() - started,
+                               sum(self.record_counts()) - records)
+        self.flush_stream()
+
+    def scan_lines(self, file_str, lines):
+        """Parse a file's lines into a block tree and extract records from it"""
+        tree = parse_lines(lines)
+        if self.trees is not None:
+            self.trees.put(file_str, tree)
+        self.scan_tree(file_str, tree)
+
+    def scan_tree(self, file_str, tree):
+        """Single walk over a file's block tree, appending events/data_keys/calls/scripts
+
+        Nodes are visited in file order. Structure comes from the tree (event
+        keys, command names and arguments); tag regexes only run on lines that
+        contain their keyword.
+        """
+        scan_node = self.scan_node
+        container = None
+
+        nodes = tree.walk()
+        next(nodes)  # the root
+        for node in nodes:
+            # Script containers start at column 0 and run until the next one
+            if node.indent == 0 and node.kind != 'command':
+                container_match = CONTAINER_PATTERN.match(node.text)
+                if container_match:
+                    if container is not None:
+                        self.scripts.append(container)
+                    container = self.new_container(file_str, node.line, container_match)
+                    continue
+            if container is not None:
+                container['end_line'] = node.line
+                if not container['type'] and node.text[:5].lower() == 'type:':
+                    container['type'] = node.text[5:].strip()
+            scan_node(file_str, node)
+
+        if container is not None:
+            self.scripts.append(container)
 
-            # Skip empty lines and comments
-            if not line.strip() or line.strip().startswith('#'):
+    def scan_buffer(self, file_str, buf):
+        """Extract records from a whole file's bytes without splitting it into lines
+
+        The candidate lines (see RECORD_LINE_HEAD and RECORD_WORDS) are found
+        by case-insensitive regexes run on the buffer itself, so the file is
+        never copied; only those lines are decoded, and their line numbers
+        come from counting newlines between them. Container end lines are
+        found by stepping back over blank and comment lines. buf must pass
+        BYTE_SCAN_UNSAFE, so the result matches scan_lines exactly.
+        """
+        starts = {m.start() + 1 for m in NEXT_LINE_HEAD.finditer(buf)}
+        if FIRST_LINE_HEAD.match(buf):
+            starts.add(0)
+        for word in RECORD_WORDS:
+            found = word.search(buf)
+            while found is not None:
+                starts.add(buf.rfind(b'\n', 0, found.start()) + 1)
+                end = buf.find(b'\n', found.end())
+                if end < 0:
+                    break
+                found = word.search(buf, end)
+
+        scan_node = self.scan_node
+        container = None
+        line_num = 1
+        counted = 0
+        for start in sorted(starts):
+            end = buf.find(b'\n', start)
+            if end < 0:
+                end = len(buf)
+            line_num += len(NEWLINE.findall(buf, counted, start))
+            counted = start
+
+            node = parse_line(buf[start:end].decode('ascii'), line_num)
+            if node is None:
                 continue
+            if node.indent == 0 and node.kind != 'command':
+                container_match = CONTAINER_PATTERN.match(node.text)
+                if container_match:
+                    if container is not None:
+                        container['end_line'] = last_content_line(buf, start, line_num)
+                        self.scripts.append(container)
+                    container = self.new_container(file_str, line_num, container_match)
+                    continue
+            if container is not None and not container['type'] and node.text[:5].lower() == 'type:':
+                container['type'] = node.text[5:].strip()
+            scan_node(file_str, node)
+
+        if container is not None:
+            # The line after the last one, as if the file ended with a newline
+            line_num += len(NEWLINE.findall(buf, counted))
+            if buf[-1:] == b'\n':
+                container['end_line'] = last_content_line(buf, len(buf), line_num)
+            else:
+                container['end_line'] = last_content_line(buf, len(buf) + 1, line_num + 1)
+            self.scripts.append(container)
+
+    def new_container(self, file_str, line_num, container_match):
+        return {
+            'file': file_str,
+            'line': line_num,
+            'name': container_match.group(1),
+            'type': '',
+            'end_line': line_num
+        }
+
+    def scan_node(self, file_str, node):
+        """Events, data keys and calls on one non-container line"""
+        line_num = node.line
+        stripped = node.text
+        kind = node.kind
+
+        # Event handlers - "on <event>:" or "after <event>:" keys
+        if kind == 'event':
+            event_match = EVENT_KEY_PATTERN.match(node.name)
+            self.events.append({
+                'file': file_str,
+                'line': line_num,
+                'type': event_match.group(1),
+                'event': event_match.group(2).strip(),
+                'indent': node.indent
+            })
+            return
+
+        lowered = stripped.lower()
+        context = None
+        command = node.name if kind == 'command' else None
 
-            # Event handlers - looking for "on <event>:" or "after <event>:"
-            event_match = re.match(r'^(\s*)(on|after)\s+(.+):\s*$', line, re.IGNORECASE)
-            if event_match:
-                indent = len(event_match.group(1))
-                event_type = event_match.group(2)
-                event_name = event_match.group(3).strip()
-                self.events.append({
-                    'file': str(rel_path),
+        # Flag reads in tags: <player.flag[name]>, <[caster].has_flag[name]>, ...
+        if 'flag' in lowered:
+            data_keys = self.data_keys
+            if NESTED_FLAG_KEY.search(stripped):
+                # Keys built from tags need the bracket-balanced parser
+                reads = flag_reads(stripped)
+            else:
+                reads = (match.groups() for match in FLAG_READ.finditer(stripped))
+            for root, key in reads:
+                if context is None:
+                    context = stripped[:80]
+                scope = flag_scope(root)
+                data_keys.append({
+                    'file': file_str,
                     'line': line_num,
-                    'type': event_type,
-                    'event': event_name,
-                    'indent': indent
+                    'key': self.normalize_key(f"{scope}.flag.{key}"),
+                    'scope': scope,
+                    'type': 'flag',
+                    'context': context
                 })
 
-            # Flag operations - player.flag, server.flag, etc.
-            # Patterns: <player.flag[name]>, - flag player name, - adjust player flag:name
-            flag_patterns = [
-                r'<(player|server|npc)\.flag\[([^\]]+)\]>',
-                r'-\s+flag\s+(player|server|npc)\s+([^\s:]+)',
-                r'-\s+adjust\s+(player|server|npc)\s+flag:([^\s:]+)',
-            ]
-
-            for pattern in flag_patterns:
-                for match in re.finditer(pattern, line, re.IGNORECASE):
-                    scope = match.group(1).lower()
-                    key_name = match.group(2)
-                    full_key = f"{scope}.flag.{key_name}"
-                    self.data_keys.append({
-                        'file': str(rel_path),
+            # Flag writes: - flag <target> name[:value], - adjust <target> flag:name
+            if command == 'flag' or command == 'adjust':
+                args = split_args(node.args)
+                name = None
+                if len(args) >= 2:
+                    if command == 'flag':
+                        name = split_key_value(args[1])[0]
+                    elif args[1].lower().startswith('flag:'):
+                        name = split_key_value(args[1][5:])[0]
+                if name:
+                    if context is None:
+                        context = stripped[:80]
+                    scope = flag_scope(args[0])
+                    data_keys.append({
+                        'file': file_str,
                         'line': line_num,
-                        'key': self.normalize_key(full_key),
+                        'key': self.normalize_key(f"{scope}.flag.{name}"),
                         'scope': scope,
                         'type': 'flag',
-                        'context': line.strip()[:80]
+                        'context': context
                     })
 
-            # YAML data operations
-            yaml_patterns = [
-                r'<yaml\[([^\]]+)\]\.read\[([^\]]+)\]>',
-                r'-\s+yaml\s+set\s+([^\s:]+):([^\s]+)',
-            ]
-
-            for pattern in yaml_patterns:
-                for match in re.finditer(pattern, line, re.IGNORECASE):
-                    yaml_id = match.group(1)
-                    yaml_key = match.group(2)
-                    full_key = f"yaml.{yaml_id}.{yaml_key}"
+        # YAML data operations
+        if 'yaml' in lowered:
+            for pattern in YAML_PATTERNS:
+                for match in pattern.finditer(stripped):
+                    if context is None:
+                        context = stripped[:80]
                     self.data_keys.append({
-                        'file': str(rel_path),
+                        'file': file_str,
                         'line': line_num,
-                        'key': full_key,
+                        'key': f"yaml.{match.group(1)}.{match.group(2)}",
                         'scope': 'yaml',
                         'type': 'yaml',
-                        'context': line.strip()[:80]
+                        'context': context
                     })
 
-            # Run/inject/task calls
-            call_patterns = [
-                (r'-\s+run\s+([^\s]+)', 'run'),
-                (r'-\s+inject\s+([^\s]+)', 'inject'),
-                (r'-\s+task\s+([^\s]+)', 'task'),
-            ]
-
-            for pattern, call_type in call_patterns:
-                for match in re.finditer(pattern, line, re.IGNORECASE):
-                    target = match.group(1)
-                    self.calls.append({
-                        'file': str(rel_path),
-                        'line': line_num,
-                        'type': call_type,
-                        'target': target,
-                        'context': line.strip()[:80]
-                    })
+        # Run/inject/task calls (a leading ~ is stripped by the parser)
+        if command in CALL_COMMANDS and node.args:
+            if context is None:
+                context = stripped[:80]
+            self.calls.append({
+                'file': file_str,
+                'line': line_num,
+                'type': command,
+                'target': split_args(node.args)[0],
+                'context': context
+            })
 
-    def analyze_all(self):
-        """Analyze all .dsc files"""
-        files = self.find_dsc_files()
-        print(f"Found {len(files)} .dsc files")
+    def analyze_all(self, jobs=1, cache=None):
+        """Analyze all .dsc files, optionally across a pool of worker processes
 
-        for i, filepath in enumerate(files, 1):
-            if i % 50 == 0:
-                print(f"  Processed {i}/{len(files)} files...")
-            self.parse_file(filepath)
+        With an AnalysisCache only new or changed files are parsed; everything
+        else is spliced in from the cache.
+        """
+        with stage(self.profiler, 'walk') as walk:
+            files = self.find_dsc_files()
+            walk['counts']['files'] = len(files)
+        print(f"Found {len(files)} .dsc files{self.disabled_note()}")
+
+        with stage(self.profiler, 'parse') as parse:
+            self.parse_files(files, jobs, cache)
+            parse['counts'].update(zip(RECORD_KINDS.values(), self.record_counts()))
 
         print(f"Extraction complete:")
         print(f"  - {len(self.events)} event handlers")
@@ -149,18 +404,424 @@ class DenizenAnalyzer:
             'file_count': len(files)
         }
 
+    def disabled_note(self):
+        disabled = self.inventory.disabled_count() if self.inventory is not None else 0
+        return f" ({disabled} disabled)" if disabled else ""
+
+    def parse_files(self, files, jobs, cache):
+        """The hot loop: serial, parallel or incremental parse of files"""
+        with hot(self.profiler, 'parse'):
+            if cache is not None:
+                self.analyze_incremental(files, jobs, cache)
+            elif jobs > 1 and len(files) > 1:
+                self.parse_parallel(files, jobs)
+            else:
+                for i, filepath in enumerate(files, 1):
+                    if i % 50 == 0:
+                        print(f"  Processed {i}/{len(files)} files...")
+                    self.parse_file(filepath)
+
+    def parse_parallel(self, files, jobs):
+        """Fan parse_file out over a process pool and merge in file order"""
+        for i, result in enumerate(self.parse_compact_many(files, jobs), 1):
+            if i % 50 == 0:
+                print(f"  Processed {i}/{len(files)} files...")
+            self.merge_compact(result)
+
+    def parse_compact_many(self, files, jobs=1):
+        """Yield parse_file_compact results for files, in the order given
+
+        Workers send back compact tuples (see parse_file_compact); executor.map
+        yields them in submission order, so the merged records match a serial
+        run exactly.
+        """
+        root = str(self.root_dir)
+        if jobs <= 1 or len(files) <= 1:
+            for filepath in files:
+                started = time.perf_counter()
+                result = parse_file_compact(root, str(filepath))
+                if self.profiler is not None:
+                    self.profiler.file(result[0], time.perf_counter() - started,
+                                       sum(len(records) for records in result[1:]))
+                yield result
+            return
+
+        chunksize = max(1, len(files) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            yield from pool.map(parse_file_compact, [root] * len(files),
+                                [str(f) for f in files], chunksize=chunksize)
+
+    def analyze_incremental(self, files, jobs, cache):
+        """Re-parse only dirty files and splice them into the cached results"""
+        for result in self.collect_incremental(files, jobs, cache).values():
+            self.merge_compact(result)
+        cache.save()
+
+    def collect_incremental(self, files, jobs, cache):
+        """Compact results for files keyed by relative path, in file order
+
+        Only files the cache can't vouch for are re-parsed.
+        """
+        rel_paths = [str(f.relative_to(self.root_dir)) for f in files]
+        cache.begin(rel_paths)
+
+        known = self.inventory.by_rel if self.inventory is not None else {}
+        results = {}
+        dirty = []
+        for filepath, rel in zip(files, rel_paths):
+            cached = cache.lookup(filepath, rel, known.get(rel))
+            if cached is None:
+                dirty.append(filepath)
+            else:
+                results[rel] = cached
+
+        for result in self.parse_compact_many(dirty, jobs):
+            cache.store(result)
+            results[result[0]] = result
+
+        cache.finish()
+        print(f"  Cache: {cache.reused} reused, {cache.renamed} renamed, "
+              f"{len(dirty)} re-parsed, {cache.removed} removed")
+        return {rel: results[rel] for rel in rel_paths}
+
+    def merge_compact(self, result):
+        """Expand one file's compact tuples back into record dicts"""
+        file_str, events, data_keys, calls, scripts = result
+        for line, event_type, event, indent in events:
+            self.events.append({
+                'file': file_str,
+                'line': line,
+                'type': event_type,
+                'event': event,
+                'indent': indent
+            })
+        for line, key, scope, key_type, context in data_keys:
+            self.data_keys.append({
+                'file': file_str,
+                'line': line,
+                'key': key,
+                'scope': scope,
+                'type': key_type,
+                'context': context
+            })
+        for line, call_type, target, context in calls:
+            self.calls.append({
+                'file': file_str,
+                'line': line,
+                'type': call_type,
+                'target': target,
+                'context': context
+            })
+        for line, name, script_type, end_line in scripts:
+            self.scripts.append({
+                'file': file_str,
+                'line': line,
+                'name': name,
+                'type': script_type,
+                'end_line': end_line
+            })
+        self.flush_stream()
+
+    def open_stream(self, output_file):
+        """Stream records to a JSONL file as each file's records are produced"""
+        self.stream = RecordWriter(output_file)
+        self.streamed = self.record_counts()
+
+    def record_counts(self):
+        return (len(self.events), len(self.data_keys), len(self.calls), len(self.scripts))
+
+    def flush_stream(self):
+        """Write any records produced since the last flush"""
+        if self.stream is None:
+            return
+        events_done, keys_done, calls_done, scripts_done = self.streamed
+        self.stream.write_many('script', self.scripts[scripts_done:])
+        self.stream.write_many('event', self.events[events_done:])
+        self.stream.write_many('data_key', self.data_keys[keys_done:])
+        self.stream.write_many('call', self.calls[calls_done:])
+        self.streamed = self.record_counts()
+
+    def close_stream(self):
+        if self.stream is None:
+            return
+        self.flush_stream()
+        self.stream.close()
+        print(f"Streamed records to {self.stream.path}")
+        self.stream = None
+
     def save_json(self, output_file):
         """Save analysis results to JSON"""
-        data = {
-            'events': self.events,
-            'data_keys': self.data_keys,
-            'calls': self.calls
-        }
+        if self.store is not None:
+            data = self.store.to_dicts()
+        else:
+            data = {
+                'events': self.events,
+                'data_keys': self.data_keys,
+                'calls': self.calls,
+                'scripts': self.scripts
+            }
         with open(output_file, 'w') as f:
             json.dump(data, f, indent=2)
         print(f"Saved analysis to {output_file}")
 
+class AnalysisCache:
+    """Per-file extraction results persisted between runs
+
+    Entries are keyed by relative path and validated by size + mtime, falling
+    back to a SHA-1 of the contents when the stat changed (e.g. after a
+    checkout that touched the file without editing it). A file that vanished
+    and reappears elsewhere with the same contents is treated as a rename and
+    reuses its old records.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.files = {}
+        self.orphans = {}
+        self.pending = {}
+        self.reused = 0
+        self.renamed = 0
+        self.removed = 0
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable cache {self.path}: {e}")
+                return
+            if data.get('version') == CACHE_VERSION:
+                self.files = data['files']
+
+    def begin(self, rel_paths):
+        """Note which cached files no longer exist, so renames can be matched"""
+        current = set(rel_paths)
+        self.orphans = {}
+        for rel, entry in self.files.items():
+            if rel not in current:
+                self.orphans[entry['sha1']] = rel
+
+    def lookup(self, filepath, rel, known=None):
+        """Return the cached compact result for a file, or None if it is dirty
+
+        known is the file's FileInventory entry, whose size and mtime save a stat.
+        """
+        if known is not None:
+            size, mtime = known.size, known.mtime
+        else:
+            st = filepath.stat()
+            size, mtime = st.st_size, st.st_mtime_ns
+        entry = self.files.get(rel)
+        if entry and entry['size'] == size and entry['mtime'] == mtime:
+            self.reused += 1
+            return self.result(rel, entry)
+
+        digest = file_digest(filepath)
+        if entry and entry['sha1'] == digest:
+            entry['size'] = size
+            entry['mtime'] = mtime
+            self.reused += 1
+            return self.result(rel, entry)
+
+        old_rel = self.orphans.pop(digest, None)
+        if old_rel is not None:
+            entry = self.files.pop(old_rel)
+            entry['size'] = size
+            entry['mtime'] = mtime
+            self.files[rel] = entry
+            self.renamed += 1
+            return self.result(rel, entry)
+
+        self.pending[rel] = (size, mtime, digest)
+        return None
+
+    def store(self, result):
+        """Record a freshly parsed file"""
+        rel, events, data_keys, calls, scripts = result
+        size, mtime, digest = self.pending.pop(rel)
+        self.files[rel] = {
+            'size': size,
+            'mtime': mtime,
+            'sha1': digest,
+            'events': events,
+            'data_keys': data_keys,
+            'calls': calls,
+            'scripts': scripts
+        }
+
+    def finish(self):
+        """Drop entries for files that were deleted"""
+        for rel in self.orphans.values():
+            if self.files.pop(rel, None) is not None:
+                self.removed += 1
+        self.orphans = {}
+
+    def discard(self, rel):
+        """Forget a single file that was deleted"""
+        if self.files.pop(rel, None) is not None:
+            self.removed += 1
+
+    def result(self, rel, entry):
+        return (rel, entry['events'], entry['data_keys'], entry['calls'], entry['scripts'])
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.files}, f)
+
+class RecordWriter:
+    """Append-only writer for the JSONL record stream"""
+
+    def __init__(self, output_file):
+        self.path = output_file
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(output_file, 'w')
+
+    def write_many(self, kind, records):
+        self.f.writelines(json.dumps({'kind': kind, **record}) + '\n' for record in records)
+
+    def close(self):
+        self.f.close()
+
+def iter_records(path=RECORDS_FILE, kind=None):
+    """Lazily yield (kind, record) pairs from a JSONL record stream
+
+    Passing kind ('event', 'data_key', 'call' or 'script') skips other lines before they
+    are decoded, so a consumer that only wants calls never parses the rest.
+    """
+    prefix = json.dumps({'kind': kind})[:-1] if kind else None
+    with open(path, 'r') as f:
+        for line in f:
+            if prefix and not line.startswith(prefix):
+                continue
+            record = json.loads(line)
+            yield record.pop('kind'), record
+
+def load_records(path=RECORDS_FILE):
+    """Materialize a JSONL record stream in the analysis.json layout"""
+    data = {name: [] for name in RECORD_KINDS.values()}
+    for kind, record in iter_records(path):
+        data[RECORD_KINDS[kind]].append(record)
+    return data
+
+def load_analysis(json_file="docs/analysis.json", records_file=RECORDS_FILE, compact=False):
+    """Load analysis results, preferring the JSONL stream when it exists
+
+    With compact=True the records land in a RecordStore instead of a list of
+    dicts; from the JSONL stream they are interned one line at a time, so the
+    full dict form is never held in memory.
+    """
+    if compact:
+        store = RecordStore()
+        if os.path.exists(records_file):
+            for kind, record in iter_records(records_file):
+                store[RECORD_KINDS[kind]].append(record)
+            return store
+        with open(json_file, 'r') as f:
+            return RecordStore.from_analysis(json.load(f))
+
+    if os.path.exists(records_file):
+        return load_records(records_file)
+    with open(json_file, 'r') as f:
+        return json.load(f)
+
+def key_access(entry):
+    """Classify a data_key record as 'write' or 'read'
+
+    A line like `- flag player a:<player.flag[b]>` yields records for both a
+    and b, so the written name is matched against the record's own key.
+    """
+    context = entry['context']
+    if entry['type'] == 'yaml':
+        return 'write' if YAML_WRITE.search(context) else 'read'
+    match = FLAG_WRITE.search(context)
+    if match and entry['key'].endswith('.flag.' + match.group(1).rstrip('>')):
+        return 'write'
+    return 'read'
+
+def map_file(filepath):
+    """Read-only mmap of a large file that scan_buffer can handle, else None"""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_MIN_BYTES:
+            return None
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if BYTE_SCAN_UNSAFE.search(buf):
+        buf.close()
+        return None
+    return buf
+
+def last_content_line(buf, end, line_num):
+    """Number of the last non-blank, non-comment line before offset end
+
+    end is where line line_num starts; everything before it is newline-terminated.
+    """
+    while end > 0:
+        start = buf.rfind(b'\n', 0, end - 1) + 1
+        line_num -= 1
+        text = buf[start:end - 1].strip()
+        if text and text[:1] != b'#':
+            return line_num
+        end = start
+    return None
+
+def file_digest(filepath):
+    """SHA-1 of a file's contents"""
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def parse_file_compact(root_dir, filepath):
+    """Worker entry point: parse one file and return its records as tuples
+
+    The file path is sent once per result instead of once per record, which
+    keeps the pickled payload between processes small.
+    """
+    analyzer = DenizenAnalyzer(root_dir)
+    filepath = Path(filepath)
+    analyzer.parse_file(filepath)
+    return (
+        str(filepath.relative_to(analyzer.root_dir)),
+        [(e['line'], e['type'], e['event'], e['indent']) for e in analyzer.events],
+        [(k['line'], k['key'], k['scope'], k['type'], k['context']) for k in analyzer.data_keys],
+        [(c['line'], c['type'], c['target'], c['context']) for c in analyzer.calls],
+        [(s['line'], s['name'], s['type'], s['end_line']) for s in analyzer.scripts],
+    )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract events, data keys and calls from .dsc files")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="parse files across N worker processes (0 = one per CPU)")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"only re-parse files changed since the last run (cache in {CACHE_FILE})")
+    parser.add_argument('--cache-file', default=CACHE_FILE,
+                        help="location of the incremental cache")
+    parser.add_argument('--format', choices=['both', 'jsonl', 'json'], default='both',
+                        help=f"write the {RECORDS_FILE} record stream, the pretty-printed "
+                             "docs/analysis.json export, or both")
+    parser.add_argument('--sqlite', metavar='PATH', nargs='?', const="docs/analysis.db",
+                        help="also build an indexed SQLite database (default docs/analysis.db)")
+    add_inventory_arguments(parser)
+    add_profile_arguments(parser, PROFILE_FILE)
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    analyzer = DenizenAnalyzer(".")
-    results = analyzer.analyze_all()
-    analyzer.save_json("docs/analysis.json")
+    args = parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
+    cache = AnalysisCache(args.cache_file) if args.incremental else None
+    analyzer = DenizenAnalyzer(".", compact=True, include=args.include, exclude=args.exclude,
+                               disabled=args.disabled)
+    analyzer.profiler = profiler_for(args, 'analyze_denizen', PROFILE_FILE)
+    if analyzer.profiler is not None and jobs > 1:
+        print("Per-file parse times are only recorded with --jobs 1")
+    if args.format in ('both', 'jsonl'):
+        analyzer.open_stream(RECORDS_FILE)
+    results = analyzer.analyze_all(jobs=jobs, cache=cache)
+    with stage(analyzer.profiler, 'save'):
+        analyzer.close_stream()
+        if args.format in ('both', 'json'):
+            analyzer.save_json("docs/analysis.json")
+        analyzer.inventory.save(INVENTORY_FILE)
+    if args.sqlite:
+        from analysis_db import build_database
+        with stage(analyzer.profiler, 'sqlite'):
+            build_database(analyzer.store, args.sqlite)
+    finish(analyzer.profiler, args)
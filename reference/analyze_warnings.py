@@ -4,13 +4,18 @@ Analyze the Denizen codebase for warnings and potential issues
 """
 
 import json
+import argparse
 from collections import defaultdict, Counter
 
-def load_analysis():
-    with open('docs/analysis.json', 'r') as f:
-        return json.load(f)
+from analyze_denizen import load_analysis, key_access, RECORD_KINDS
+from call_graph import ScriptCallGraph
+from definitions import DefinitionIndex
+from wait_loops import WaitLoopDetector
+from profiling import add_profile_arguments, profiler_for, stage, hot, finish
 
-def find_warnings(data):
+PROFILE_FILE = "docs/profile_warnings.json"
+
+def find_warnings(data, root_dir=".", trees=None):
     warnings = []
 
     # 1. Duplicate key names (case-insensitive collisions)
@@ -43,14 +48,31 @@ def find_warnings(data):
             'details': [f"{e['event']} at line {e['line']}" for e in critical_events]
         })
 
-    # 3. Blocking operations (wait commands in high-frequency handlers)
-    # This would require parsing file contents, so we'll note it as a recommendation
-    warnings.append({
-        'type': 'manual_review_needed',
-        'severity': 'medium',
-        'message': 'Manual review recommended: Check for "wait" or "waituntil" commands in game_loop.dsc',
-        'reason': 'Blocking operations in 5Hz loop will cause server lag'
-    })
+    # 3. Blocking operations (wait/waituntil inside loops on high-frequency paths)
+    waits = WaitLoopDetector(data, root_dir, trees).report()
+    if waits['findings']:
+        warnings.append({
+            'type': 'blocking_waits_in_loops',
+            'severity': 'high',
+            'count': len(waits['findings']),
+            'message': f"Found {len(waits['findings'])} wait/waituntil commands inside loops on high-frequency paths",
+            'details': [f"{f['file']}:{f['line']} `{f['command']}` in {f['loops'][-1]} ← "
+                        f"{f['handler']['event']} ({f['handler']['file']}:{f['handler']['line']})"
+                        for f in waits['findings']]
+        })
+
+    overlapping = [h for h in waits['handlers'] if h['overlaps']]
+    if overlapping:
+        warnings.append({
+            'type': 'overlapping_queues',
+            'severity': 'high',
+            'count': len(overlapping),
+            'message': f"Found {len(overlapping)} high-frequency handlers whose queues outlive their firing interval",
+            'details': [f"{h['event']} ({h['file']}:{h['line']}): "
+                        f"~{h['projection'][50]['live_queues']:,.0f} live queues at 50 players "
+                        f"({h['projection'][50]['per_player']:.2f} per player)"
+                        for h in overlapping]
+        })
 
     # 4. Deep call chains
     call_targets = Counter([c['target'] for c in data['calls']])
@@ -65,10 +87,10 @@ def find_warnings(data):
             'examples': [f"{target} ({count} calls)" for target, count in sorted(heavily_called, key=lambda x: -x[1])[:5]]
         })
 
-    # 5. Keys with many writers (potential race conditions)
+    # 5. Keys with many writers (potential race conditions), classified as in DATA_KEYS.md
     key_writers = defaultdict(set)
     for key_entry in data['data_keys']:
-        if 'flag' in key_entry['context'].lower() or 'set' in key_entry['context'].lower():
+        if key_access(key_entry) == 'write':
             key_writers[key_entry['key']].add(key_entry['file'])
 
     multi_writer = [(k, len(v)) for k, v in key_writers.items() if len(v) > 5]
@@ -81,26 +103,54 @@ def find_warnings(data):
             'examples': [f"{k} ({count} writers)" for k, count in sorted(multi_writer, key=lambda x: -x[1])[:5]]
         })
 
-    # 6. Circular call patterns
-    call_graph = defaultdict(set)
-    for call in data['calls']:
-        call_graph[call['file']].add(call['target'])
-
-    # Simple circular detection (A calls B, B calls A)
-    circular = []
-    for script_a, targets in call_graph.items():
-        for target in targets:
-            if script_a in call_graph.get(target, set()):
-                if script_a < target:  # Avoid duplicates
-                    circular.append((script_a, target))
+    # 6. Circular call patterns (script-level cycles of any length)
+    definitions = DefinitionIndex(data.get('scripts', []))
+    call_graph = ScriptCallGraph(data, definitions)
+    cycles = call_graph.cycles()
 
-    if circular:
+    if cycles:
         warnings.append({
             'type': 'circular_calls',
             'severity': 'medium',
-            'count': len(circular),
-            'message': f"Found {len(circular)} circular call patterns (A↔B)",
-            'examples': [f"{a} ↔ {b}" for a, b in circular[:5]]
+            'count': len(cycles),
+            'message': f"Found {len(cycles)} call cycles between scripts (possible infinite loops)",
+            'examples': [" → ".join(cycle + [cycle[0]]) for cycle in cycles[:5]]
+        })
+
+    # 7. Deep call chains from event handlers
+    deep_chains = [c for c in call_graph.event_chains() if c['depth'] > 5]
+    if deep_chains:
+        warnings.append({
+            'type': 'deep_call_chains',
+            'severity': 'low',
+            'count': len(deep_chains),
+            'message': f"Found {len(deep_chains)} event handlers with call chains deeper than 5 levels",
+            'details': [f"{c['event']} ({c['file']}:{c['line']}) → {' → '.join(c['chain'])} [{c['depth']} levels]"
+                        for c in deep_chains[:5]]
+        })
+
+    # 8. Calls to scripts that are never defined
+    report = definitions.resolution_report(data['calls'])
+    if report['unresolved']:
+        warnings.append({
+            'type': 'unresolved_calls',
+            'severity': 'medium',
+            'count': len(report['unresolved']),
+            'message': f"Found {len(report['unresolved'])} run/inject targets with no script definition",
+            'examples': [f"{name} ({calls[0]['file']}:{calls[0]['line']}, {len(calls)} calls)"
+                         for name, calls in list(report['unresolved'].items())[:5]]
+        })
+
+    # 9. Script names defined more than once (the last one loaded wins)
+    duplicates = definitions.duplicates()
+    if duplicates:
+        warnings.append({
+            'type': 'duplicate_definitions',
+            'severity': 'high',
+            'count': len(duplicates),
+            'message': f"Found {len(duplicates)} script names defined more than once",
+            'examples': [f"{name}: " + ", ".join(f"{d['file']}:{d['line']}" for d in defs)
+                         for name, defs in list(duplicates.items())[:5]]
         })
 
     return warnings
@@ -166,7 +216,7 @@ def generate_summary(data, warnings):
     print("🔄 NEXT STEPS")
     print("-" * 70)
     print("  1. Review high-frequency events in game_loop.dsc for optimization")
-    print("  2. Check for blocking operations (wait/waituntil) in performance-critical paths")
+    print("  2. Move waits out of loops in handlers listed under blocking_waits_in_loops")
     print("  3. Audit keys with multiple writers for race conditions")
     print("  4. Plan modular refactor based on subsystem groupings in SYSTEM_MAP.md")
     print()
@@ -181,15 +231,30 @@ def generate_summary(data, warnings):
     print("="*70)
     print()
 
-def main():
-    data = load_analysis()
-    warnings = find_warnings(data)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Report warnings and hazards from the analysis results")
+    add_profile_arguments(parser, PROFILE_FILE)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = profiler_for(args, 'analyze_warnings', PROFILE_FILE)
+
+    with stage(profiler, 'load') as load:
+        data = load_analysis(compact=True)
+        load['counts'].update((name, len(data.get(name, []))) for name in RECORD_KINDS.values())
+
+    with stage(profiler, 'warnings') as check, hot(profiler, 'warnings'):
+        warnings = find_warnings(data)
+        check['counts']['warnings'] = len(warnings)
 
     # Save warnings to JSON
-    with open('docs/warnings.json', 'w') as f:
-        json.dump(warnings, f, indent=2)
+    with stage(profiler, 'save'):
+        with open('docs/warnings.json', 'w') as f:
+            json.dump(warnings, f, indent=2)
 
     generate_summary(data, warnings)
+    finish(profiler, args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Benchmark the analysis pipeline on synthetic corpora
+Generates .dsc corpora at multiples of reference/ and times and memory-profiles
+each stage: walk, parse, save, load, warnings and every doc generator
+"""
+
+import io
+import os
+import re
+import gc
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+from pathlib import Path
+from statistics import median
+
+from analyze_denizen import (DenizenAnalyzer, RecordWriter, CONTAINER_PATTERN, RECORDS_FILE,
+                             RECORD_KINDS, load_analysis)
+from analyze_warnings import find_warnings
+from analysis_index import AnalysisIndex
+import generate_docs
+from file_inventory import FileInventory, INVENTORY_FILE
+from profiling import Profiler
+
+REFERENCE_DIR = Path(__file__).resolve().parent
+# The reference scripts are kept disabled; the .OLD copy duplicates a live file
+SOURCE_GLOBS = ('*.dsc', '*.dsc.OFF')
+DEFAULT_SCALES = (1, 10, 100)
+RESULTS_VERSION = 1
+
+WORD = re.compile(r'[A-Za-z0-9_]+')
+
+DOC_GENERATORS = (
+    ('docs.system_map', generate_docs.generate_system_map),
+    ('docs.data_keys', generate_docs.generate_data_keys),
+    ('docs.event_index', generate_docs.generate_event_index),
+    ('docs.call_graph', generate_docs.generate_call_graph),
+)
+
+class CorpusGenerator:
+    """Builds corpora from whole copies of the reference scripts
+
+    Copy N of every file lands under copy_NNN/ with each script container
+    renamed to <name>_xN, so definitions never collide and run/inject/proc
+    references stay inside their copy. Event names, flag keys, yaml keys
+    and call shapes are untouched, so their distributions are the real ones
+    by construction. A fractional scale adds a seeded sample of files.
+
+    Plain-word container names (armor, water, target) are only renamed on
+    their definition line, since the same word appears as materials and
+    definitions elsewhere; references to them resolve to copy 0.
+    """
+
+    def __init__(self, source, seed=1):
+        self.seed = seed
+        self.files = []
+        names = set()
+        texts = []
+        for path in FileInventory.scan(source, SOURCE_GLOBS).paths():
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+            rel = path.relative_to(source).as_posix()
+            if rel.endswith('.OFF'):
+                rel = rel[:-4]
+            texts.append((rel, text))
+            for line in text.splitlines():
+                match = CONTAINER_PATTERN.match(line)
+                if match:
+                    names.add(match.group(1).lower())
+
+        renamed = {name for name in names if '_' in name}
+        for rel, text in texts:
+            # Offsets of every name to suffix, found once and reused for each copy
+            spans = []
+            offset = 0
+            for line in text.splitlines(keepends=True):
+                match = CONTAINER_PATTERN.match(line.rstrip('\r\n'))
+                if match and match.group(1).lower() in names and match.group(1).lower() not in renamed:
+                    spans.append(offset + match.end(1))
+                offset += len(line)
+            spans.extend(m.end() for m in WORD.finditer(text) if m.group(0).lower() in renamed)
+            self.files.append((rel, text, sorted(spans)))
+
+    def render(self, text, spans, copy):
+        if not copy:
+            return text
+        suffix = f"_x{copy}"
+        pieces = []
+        last = 0
+        for end in spans:
+            pieces.append(text[last:end])
+            pieces.append(suffix)
+            last = end
+        pieces.append(text[last:])
+        return ''.join(pieces)
+
+    def generate(self, dest, scale):
+        """Write a corpus of scale x the reference files into dest; returns its stats"""
+        dest = Path(dest)
+        if dest.exists():
+            shutil.rmtree(dest)
+        whole = int(scale)
+        extra = random.Random(self.seed).sample(range(len(self.files)),
+                                                round((scale - whole) * len(self.files)))
+        plan = [(copy, i) for copy in range(whole) for i in range(len(self.files))]
+        plan.extend((whole, i) for i in sorted(extra))
+
+        stats = {'files': 0, 'lines': 0, 'bytes': 0}
+        for copy, i in plan:
+            rel, text, spans = self.files[i]
+            out = self.render(text, spans, copy)
+            path = dest / f"copy_{copy:03d}" / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(out)
+            stats['files'] += 1
+            stats['lines'] += out.count('\n')
+            stats['bytes'] += len(out.encode('utf-8'))
+        (dest / 'docs').mkdir(exist_ok=True)
+        return stats
+
+class StageRecorder:
+    """Runs stages quietly under a Profiler; trace=True adds tracemalloc peaks"""
+
+    def __init__(self, trace=False):
+        self.profiler = Profiler('benchmark', memory=trace)
+
+    def run(self, name, fn, *args):
+        with self.profiler.stage(name), contextlib.redirect_stdout(io.StringIO()):
+            return fn(*args)
+
+    def close(self):
+        self.profiler.close()
+        return {s['name']: s for s in self.profiler.stages}
+
+def walk_stage(analyzer):
+    return analyzer.find_dsc_files()
+
+def parse_stage(analyzer, files, jobs):
+    if jobs > 1:
+        analyzer.parse_parallel(files, jobs)
+    else:
+        for filepath in files:
+            analyzer.parse_file(filepath)
+
+def save_stage(analyzer):
+    writer = RecordWriter(RECORDS_FILE)
+    for kind, name in RECORD_KINDS.items():
+        writer.write_many(kind, getattr(analyzer, name))
+    writer.close()
+    analyzer.save_json("docs/analysis.json")
+    analyzer.inventory.save(INVENTORY_FILE)
+
+def warnings_stage(data):
+    warnings = find_warnings(data)
+    with open('docs/warnings.json', 'w') as f:
+        json.dump(warnings, f, indent=2)
+    return warnings
+
+def run_pipeline(recorder, jobs):
+    """One pass over every stage in the current directory; returns record counts"""
+    analyzer = DenizenAnalyzer(".", compact=True)
+    files = recorder.run('walk', walk_stage, analyzer)
+    recorder.run('parse', parse_stage, analyzer, files, jobs)
+    recorder.run('save', save_stage, analyzer)
+    counts = {name: len(getattr(analyzer, name)) for name in RECORD_KINDS.values()}
+    del analyzer
+
+    data = recorder.run('load', load_analysis, "docs/analysis.json", RECORDS_FILE, True)
+    recorder.run('warnings', warnings_stage, data)
+    subsystems = recorder.run('categorize', generate_docs.categorize_files)
+    index = recorder.run('index', AnalysisIndex, data, subsystems)
+    for name, generator in DOC_GENERATORS:
+        recorder.run(name, generator, index)
+    return counts
+
+def benchmark_corpus(corpus_dir, repeat, jobs, trace=True):
+    """Median/min timings over repeat passes, plus one traced pass for memory"""
+    previous = os.getcwd()
+    os.chdir(corpus_dir)
+    try:
+        passes = []
+        for _ in range(repeat):
+            gc.collect()
+            recorder = StageRecorder()
+            counts = run_pipeline(recorder, jobs)
+            passes.append(recorder.close())
+
+        stages = {}
+        for name in passes[0]:
+            walls = [p[name]['wall_s'] for p in passes]
+            stages[name] = {
+                'wall_s': median(walls),
+                'wall_min_s': min(walls),
+                'cpu_s': median(p[name]['cpu_s'] for p in passes),
+            }
+
+        if trace:
+            gc.collect()
+            recorder = StageRecorder(trace=True)
+            try:
+                run_pipeline(recorder, jobs)
+            finally:
+                traced = recorder.close()
+            for name, entry in traced.items():
+                stages[name]['peak_kib'] = entry['peak_kib']
+                stages[name]['retained_kib'] = entry['retained_kib']
+        return stages, counts
+    finally:
+        os.chdir(previous)
+
+def format_results(results, baseline=None):
+    old = {}
+    if baseline:
+        for corpus in baseline.get('corpora', []):
+            old[corpus['scale']] = corpus['stages']
+    lines = []
+    for corpus in results['corpora']:
+        scale = corpus['scale']
+        lines.append(f"📏 {scale:g}x: {corpus['files']:,} files, {corpus['lines']:,} lines, "
+                     f"{corpus['records']['data_keys']:,} data keys")
+        for name, s in corpus['stages'].items():
+            line = f"  {name:<18} {s['wall_s'] * 1000:>10,.1f} ms"
+            if 'peak_kib' in s:
+                line += f" {s['peak_kib'] / 1024:>9,.1f} MiB peak"
+            before = old.get(scale, {}).get(name)
+            if before and before['wall_s']:
+                line += f"   {(s['wall_s'] / before['wall_s'] - 1) * 100:+6.1f}% time"
+                if 'peak_kib' in s and before.get('peak_kib'):
+                    line += f" {(s['peak_kib'] / before['peak_kib'] - 1) * 100:+6.1f}% memory"
+            lines.append(line)
+        total = sum(s['wall_s'] for s in corpus['stages'].values())
+        lines.append(f"  {'total':<18} {total * 1000:>10,.1f} ms")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory-profile the analysis pipeline on synthetic corpora")
+    parser.add_argument('--scales', type=float, nargs='+', default=list(DEFAULT_SCALES),
+                        help="corpus sizes as multiples of reference/ (default 1 10 100)")
+    parser.add_argument('--source', default=str(REFERENCE_DIR),
+                        help="scripts to replicate (default reference/)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timed passes per corpus; the median is reported (default 3)")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="parse with N worker processes, as analyze_denizen.py --jobs")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip the tracemalloc pass")
+    parser.add_argument('--seed', type=int, default=1, help="sampling seed for fractional scales")
+    parser.add_argument('--work-dir', help="where to generate corpora (default: a temporary directory)")
+    parser.add_argument('--keep', action='store_true', help="keep the generated corpora")
+    parser.add_argument('--output', default='docs/benchmarks.json', help="results file")
+    parser.add_argument('--compare', metavar='RESULTS',
+                        help="print the change against earlier results")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = Path(args.output).resolve()
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+    generator = CorpusGenerator(Path(args.source), seed=args.seed)
+    if not generator.files:
+        print(f"No .dsc files under {args.source}")
+        return 1
+    work = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix='denizen_bench_'))
+
+    results = {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'source_files': len(generator.files),
+        'repeat': args.repeat,
+        'jobs': args.jobs,
+        'corpora': [],
+    }
+    try:
+        for scale in args.scales:
+            corpus_dir = work / f"corpus_{scale:g}x"
+            started = time.perf_counter()
+            stats = generator.generate(corpus_dir, scale)
+            print(f"✓ Generated {scale:g}x corpus: {stats['files']:,} files "
+                  f"({time.perf_counter() - started:.1f}s)")
+            stages, counts = benchmark_corpus(corpus_dir, args.repeat, args.jobs, trace=not args.no_memory)
+            results['corpora'].append(dict(stats, scale=scale, records=counts, stages=stages))
+            if not args.keep:
+                shutil.rmtree(corpus_dir)
+    finally:
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(format_results(results, baseline))
+    print(f"✓ Saved results to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
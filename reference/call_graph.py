@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Script-level call graph for Denizen analysis results
+Resolves run/inject targets through script containers, finds cycles and chain depths
+"""
+
+from bisect import bisect_right
+from collections import defaultdict, Counter
+
+from definitions import DefinitionIndex
+
+def strongly_connected_components(nodes, edges):
+    """Tarjan's algorithm, iterative so deep graphs don't hit the recursion limit
+
+    Components come out in reverse topological order: every component appears
+    after all components it can reach.
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    counter = 0
+
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges.get(root, ())))]
+
+        while work:
+            node, successors = work[-1]
+            descended = False
+            for succ in successors:
+                if succ not in index:
+                    index[succ] = low[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(edges.get(succ, ()))))
+                    descended = True
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(sorted(component))
+
+    return components
+
+class ScriptCallGraph:
+    """Script -> script call edges, with cycles and longest call chains
+
+    Each call is attributed to the container it appears in and, inside world
+    scripts, to the event handler above it. Everything is linear in the
+    number of scripts + call edges.
+    """
+
+    def __init__(self, data, definitions=None):
+        if definitions is None:
+            definitions = DefinitionIndex(data.get('scripts', []))
+        self.definitions = definitions
+
+        self.file_events = defaultdict(list)
+        for e in data['events']:
+            self.file_events[e['file']].append((e['line'], e['event']))
+        for events in self.file_events.values():
+            events.sort()
+        self.event_lines = {f: [e[0] for e in es] for f, es in self.file_events.items()}
+
+        self.edges = defaultdict(set)
+        self.event_targets = defaultdict(set)
+        self.unresolved = Counter()
+        self.dynamic_calls = 0
+        for call in data['calls']:
+            self.add_call(call)
+
+        nodes = sorted(set(self.edges) | {t for ts in self.edges.values() for t in ts})
+        sorted_edges = {node: sorted(targets) for node, targets in self.edges.items()}
+        self.components = strongly_connected_components(nodes, sorted_edges)
+        self.compute_depths(sorted_edges)
+
+    def event_at(self, file, line, container):
+        """(line, event) of the handler a line belongs to, within its container"""
+        lines = self.event_lines.get(file)
+        if not lines:
+            return None
+        i = bisect_right(lines, line) - 1
+        if i < 0:
+            return None
+        event = self.file_events[file][i]
+        if container is not None and event[0] < container[0]:
+            return None
+        return event
+
+    def add_call(self, call):
+        status, detail = self.definitions.resolve(call)
+        if status == 'dynamic':
+            self.dynamic_calls += 1
+            return
+        if status == 'unresolved':
+            self.unresolved[detail] += 1
+            return
+        target = detail['name'].lower()
+
+        container = self.definitions.container_at(call['file'], call['line'])
+        if container is None:
+            return
+        event = self.event_at(call['file'], call['line'], container)
+        if event is not None:
+            self.event_targets[(call['file'], event[0], event[1], container[2])].add(target)
+        else:
+            self.edges[container[2]].add(target)
+
+    def compute_depths(self, edges):
+        """Longest path (in calls) from every script, memoized per component
+
+        Components arrive sinks-first, so each one's successors are already
+        done. A cycle counts as a single level.
+        """
+        self.component_of = {}
+        for cid, component in enumerate(self.components):
+            for node in component:
+                self.component_of[node] = cid
+
+        self.depth = {}
+        self.next_hop = {}
+        for cid, component in enumerate(self.components):
+            best, best_next = 0, None
+            for node in component:
+                for succ in edges.get(node, ()):
+                    if self.component_of[succ] == cid:
+                        continue
+                    d = 1 + self.depth[succ]
+                    if d > best:
+                        best, best_next = d, succ
+            for node in component:
+                self.depth[node] = best
+                self.next_hop[node] = best_next
+
+    def cycles(self):
+        """Components that call back into themselves, largest first"""
+        found = []
+        for component in self.components:
+            if len(component) > 1 or component[0] in self.edges.get(component[0], ()):
+                found.append(component)
+        return sorted(found, key=lambda c: (-len(c), c))
+
+    def chain(self, script):
+        """Longest call chain starting at a script"""
+        chain = [script]
+        node = self.next_hop.get(script)
+        while node is not None:
+            chain.append(node)
+            node = self.next_hop.get(node)
+        return chain
+
+    def event_chains(self):
+        """Every event handler with its deepest call chain, deepest first"""
+        chains = []
+        for (file, line, event, container), targets in self.event_targets.items():
+            head = max(sorted(targets), key=lambda t: self.depth.get(t, 0))
+            chains.append({
+                'file': file,
+                'line': line,
+                'event': event,
+                'script': container,
+                'depth': 1 + self.depth.get(head, 0),
+                'chain': self.chain(head)
+            })
+        return sorted(chains, key=lambda c: (-c['depth'], c['file'], c['line']))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Script definition index for Denizen analysis results
+Maps container names to where they are defined and resolves run/inject targets
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+
+def target_script(target):
+    """Script name a run/inject target refers to, or None if it is built at runtime
+
+    `stronghold_manage_members.invite.extend` runs a path inside the
+    stronghold_manage_members container; names are case-insensitive.
+    """
+    if '<' in target:
+        return None
+    name = target.split('.', 1)[0].strip('"\'').rstrip(':')
+    return name.lower() or None
+
+class DefinitionIndex:
+    """Every script container by name, plus per-file line ranges
+
+    Name lookups are a single dict access. Positional lookups (which container
+    encloses file:line) bisect that file's sorted container starts.
+    """
+
+    def __init__(self, scripts):
+        self.by_name = defaultdict(list)
+        self.file_containers = defaultdict(list)
+        for script in scripts:
+            name = script['name'].lower()
+            self.by_name[name].append(script)
+            self.file_containers[script['file']].append((script['line'], script['end_line'], name))
+        for containers in self.file_containers.values():
+            containers.sort()
+        self.container_starts = {f: [c[0] for c in cs] for f, cs in self.file_containers.items()}
+
+    def __contains__(self, name):
+        return name.lower() in self.by_name
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def lookup(self, name):
+        """First definition of a script name, or None"""
+        definitions = self.by_name.get(name.lower())
+        return definitions[0] if definitions else None
+
+    def container_at(self, file, line):
+        """(start, end, name) of the container enclosing file:line, or None"""
+        starts = self.container_starts.get(file)
+        if not starts:
+            return None
+        i = bisect_right(starts, line) - 1
+        if i < 0:
+            return None
+        container = self.file_containers[file][i]
+        return container if line <= container[1] else None
+
+    def resolve(self, call):
+        """('resolved', definition), ('dynamic', None) or ('unresolved', name)"""
+        name = target_script(call['target'])
+        if name is None:
+            return 'dynamic', None
+        definitions = self.by_name.get(name)
+        if not definitions:
+            return 'unresolved', name
+        return 'resolved', definitions[0]
+
+    def duplicates(self):
+        """Names defined more than once, with every definition"""
+        return {name: defs for name, defs in sorted(self.by_name.items()) if len(defs) > 1}
+
+    def resolution_report(self, calls):
+        """Counts of resolved/dynamic calls and the unresolved names with their call sites"""
+        resolved = dynamic = 0
+        unresolved = defaultdict(list)
+        for call in calls:
+            status, detail = self.resolve(call)
+            if status == 'resolved':
+                resolved += 1
+            elif status == 'dynamic':
+                dynamic += 1
+            else:
+                unresolved[detail].append(call)
+        return {
+            'resolved': resolved,
+            'dynamic': dynamic,
+            'unresolved': dict(sorted(unresolved.items(), key=lambda x: (-len(x[1]), x[0])))
+        }
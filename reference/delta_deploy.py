@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Manifest-based delta deploy for scripts/ and data/
+Transfers only files whose content changed since the last deploy and reports
+which script containers changed, so a reload is only issued when needed
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+
+from dsc_tree import parse_lines
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DIRS = ('scripts', 'data')
+DEFAULT_TARGET = "_server_local/plugins/Denizen"
+MANIFEST_NAME = ".deploy_manifest.json"
+MANIFEST_VERSION = 1
+
+# Never shipped (deploy.sh excludes disabled scripts too)
+EXCLUDED_SUFFIXES = ('.dsc.OFF', '.dsc.OLD', '.sync')
+MAX_LISTED = 40
+RELOAD_EXIT_STATUS = 10
+
+def container_hashes(text):
+    """SHA-1 per script container, ignoring blank lines and comments
+
+    A file whose edits only touch comments or spacing keeps the same hashes,
+    so it can be shipped without a reload.
+    """
+    lines = text.splitlines()
+    tree = parse_lines(lines)
+    containers = [node for node in tree.children if node.kind == 'container' and not node.args]
+    hashes = {}
+    for i, node in enumerate(containers):
+        end = containers[i + 1].line - 1 if i + 1 < len(containers) else len(lines)
+        digest = hashlib.sha1()
+        for line in lines[node.line - 1:end]:
+            stripped = line.strip()
+            if stripped and stripped[0] != '#':
+                digest.update(line.rstrip().encode('utf-8', 'replace') + b'\n')
+        hashes[node.name] = digest.hexdigest()
+    return hashes
+
+class Manifest:
+    """What was last deployed: path -> size, mtime, sha1 and container hashes
+
+    Like the analysis cache, an unchanged size + mtime skips hashing; a
+    changed stat falls back to comparing the SHA-1.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.files = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {self.path}: {e}")
+                return
+            if data.get('version') == MANIFEST_VERSION:
+                self.files = data['files']
+
+    def save(self, files):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': files}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+class DeltaDeploy:
+    """Diffs the source trees against the manifest and applies the delta"""
+
+    def __init__(self, repo_root, target, manifest_path, remote=None):
+        self.repo_root = Path(repo_root)
+        self.sources = [self.repo_root / d for d in SOURCE_DIRS if (self.repo_root / d).is_dir()]
+        self.target = Path(target) if remote is None else None
+        self.remote = remote
+        self.manifest = Manifest(manifest_path)
+
+    def scan(self):
+        """Current state of every deployable file: rel path -> entry"""
+        files = {}
+        for source in self.sources:
+            for dirpath, dirnames, filenames in os.walk(source):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+                for name in sorted(filenames):
+                    if name.startswith('.') or name.endswith(EXCLUDED_SUFFIXES):
+                        continue
+                    path = Path(dirpath) / name
+                    rel = path.relative_to(self.repo_root).as_posix()
+                    files[rel] = self.entry(path, rel)
+        return files
+
+    def entry(self, path, rel):
+        st = path.stat()
+        old = self.manifest.files.get(rel)
+        if old and old['size'] == st.st_size and old['mtime'] == st.st_mtime_ns:
+            return old
+        data = path.read_bytes()
+        digest = hashlib.sha1(data).hexdigest()
+        if old and old['sha1'] == digest:
+            return dict(old, mtime=st.st_mtime_ns)
+        entry = {'size': st.st_size, 'mtime': st.st_mtime_ns, 'sha1': digest}
+        if rel.endswith('.dsc'):
+            entry['containers'] = container_hashes(data.decode('utf-8', 'ignore'))
+        return entry
+
+    def missing_on_target(self, rel):
+        """A local target that lost a deployed file needs it again"""
+        return self.target is not None and not (self.target / rel).exists()
+
+    def diff(self, files):
+        old = self.manifest.files
+        added = sorted(rel for rel in files if rel not in old)
+        removed = sorted(rel for rel in old if rel not in files)
+        changed = sorted(rel for rel in files if rel in old and
+                         (files[rel]['sha1'] != old[rel]['sha1'] or self.missing_on_target(rel)))
+
+        containers = {'added': [], 'changed': [], 'removed': []}
+        for rel in added + changed + removed:
+            before = old.get(rel, {}).get('containers', {})
+            after = files.get(rel, {}).get('containers', {})
+            for name in sorted(set(before) | set(after)):
+                if name not in before:
+                    containers['added'].append((rel, name))
+                elif name not in after:
+                    containers['removed'].append((rel, name))
+                elif before[name] != after[name]:
+                    containers['changed'].append((rel, name))
+
+        return {
+            'added': added,
+            'changed': changed,
+            'removed': removed,
+            'containers': containers,
+            'reload_needed': any(containers.values()),
+        }
+
+    def apply(self, delta):
+        """Transfer added/changed files and delete removed ones"""
+        upload = delta['added'] + delta['changed']
+        if self.remote is not None:
+            self.apply_remote(upload, delta['removed'])
+            return
+        for rel in upload:
+            target = self.target / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f".{target.name}.sync")
+            shutil.copy2(self.repo_root / rel, tmp)
+            os.replace(tmp, target)
+        for rel in delta['removed']:
+            try:
+                (self.target / rel).unlink()
+            except FileNotFoundError:
+                pass
+
+    def apply_remote(self, upload, removed):
+        host, path = self.remote.split(':', 1)
+        if upload:
+            subprocess.run(['rsync', '-az', '--chmod=Du=rwx,Fu=rw,Do=rx,Fo=r', '--files-from=-',
+                            f"{self.repo_root}/", f"{host}:{path}/"],
+                           input='\n'.join(upload) + '\n', text=True, check=True)
+        if removed:
+            quoted = ' '.join("'" + f"{path}/{rel}".replace("'", "'\\''") + "'" for rel in removed)
+            subprocess.run(['ssh', host, f"rm -f {quoted}"], check=True)
+
+def format_report(delta):
+    lines = []
+    for label in ('added', 'changed', 'removed'):
+        for rel in delta[label]:
+            lines.append(f"  {label[0].upper()} {rel}")
+    files = len(delta['added']) + len(delta['changed']) + len(delta['removed'])
+    if not files:
+        return "✓ Target is up to date; nothing to deploy"
+    lines.insert(0, f"📦 {len(delta['added'])} added, {len(delta['changed'])} changed, "
+                    f"{len(delta['removed'])} removed")
+
+    containers = delta['containers']
+    if delta['reload_needed']:
+        lines.append("")
+        lines.append(f"🔁 Reload needed — {len(containers['added'])} added, "
+                     f"{len(containers['changed'])} changed, {len(containers['removed'])} removed "
+                     f"script containers:")
+        listed = [(label, rel, name) for label in ('added', 'changed', 'removed')
+                  for rel, name in containers[label]]
+        for label, rel, name in listed[:MAX_LISTED]:
+            lines.append(f"  {label:<8} {name} ({rel})")
+        if len(listed) > MAX_LISTED:
+            lines.append(f"  ... and {len(listed) - MAX_LISTED} more (--json for the full list)")
+    else:
+        lines.append("")
+        lines.append("ℹ️  No script container changed (comments/whitespace or data files only); "
+                     "reload not needed")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Deploy only what changed since the last deploy")
+    parser.add_argument('--target', default=str(REPO_ROOT / DEFAULT_TARGET),
+                        help=f"local Denizen plugin directory (default {DEFAULT_TARGET})")
+    parser.add_argument('--remote', metavar='HOST:PATH',
+                        help="deploy over rsync/ssh instead, e.g. stormroot:/home/minecraft/server/plugins/Denizen")
+    parser.add_argument('--manifest',
+                        help=f"manifest location (default {MANIFEST_NAME} in the local target, "
+                             "or docs/deploy_manifest_<host>.json for --remote)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="report the delta without transferring anything")
+    parser.add_argument('--json', action='store_true',
+                        help="print the delta as JSON")
+    parser.add_argument('--exit-status', action='store_true',
+                        help=f"exit with {RELOAD_EXIT_STATUS} when script containers changed (a reload is needed)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.manifest:
+        manifest = args.manifest
+    elif args.remote:
+        manifest = REPO_ROOT / "docs" / f"deploy_manifest_{args.remote.split(':', 1)[0]}.json"
+    else:
+        manifest = Path(args.target) / MANIFEST_NAME
+
+    deploy = DeltaDeploy(REPO_ROOT, args.target, manifest, remote=args.remote)
+    files = deploy.scan()
+    delta = deploy.diff(files)
+
+    if args.json:
+        print(json.dumps(delta, indent=2))
+    else:
+        print(format_report(delta))
+
+    status = RELOAD_EXIT_STATUS if args.exit_status and delta['reload_needed'] else 0
+    if args.dry_run:
+        print("🔎 Dry run: nothing transferred.")
+        return status
+    if delta['added'] or delta['changed'] or delta['removed']:
+        deploy.apply(delta)
+        print("✅ Deployed.")
+    deploy.manifest.save(files)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
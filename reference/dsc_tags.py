@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Bracket-balanced parser for Denizen tag expressions
+Splits <base.attribute[param]...> chains, nested tags included, so keys built
+from <[definitions]> and multi-level parameters come through intact
+"""
+
+import re
+
+# Opening of a tag: <player...>, <[def]>, <&color>; "a < b" comparisons have a space
+TAG_START = re.compile(r'<(?=[\w\[&])')
+# Characters that can change the parser's state inside a tag
+SPECIAL = re.compile(r'[<>\[\].|]')
+FLAG_ATTRIBUTES = ('flag', 'has_flag', 'flag_expiration')
+# Flag lookups the analyzer indexes: on the player, server, npc or a definition
+FLAG_ROOT = re.compile(r'^(?:player|server|npc|\[[^\[\]<>]+\])$', re.IGNORECASE)
+
+class Tag:
+    """One <...> expression
+
+    segments are (name, param) pairs in chain order; a definition root
+    <[name]> has name '' and the definition as its param. children are the
+    tags nested directly inside this one, which Denizen evaluates first.
+    level is 1 for a top-level tag, 2 for a tag inside it, and so on.
+    fallback is the text after a top-level ||, or None.
+    """
+    __slots__ = ('text', 'start', 'end', 'level', 'segments', 'fallback', 'children')
+
+    def __init__(self, text, start, end, level, segments, children, fallback=None):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.level = level
+        self.segments = segments
+        self.children = children
+        self.fallback = fallback
+
+    @property
+    def chain_length(self):
+        return len(self.segments)
+
+    @property
+    def depth(self):
+        """Nesting depth of the expression: 1 with no tags inside"""
+        return 1 + max((child.depth for child in self.children), default=0)
+
+    @property
+    def root(self):
+        """player, server, [caster], util, ... as written"""
+        name, param = self.segments[0]
+        if not name:
+            return f"[{param}]"
+        return name if param is None else f"{name}[{param}]"
+
+    def walk(self):
+        """Every tag in this expression, innermost first (evaluation order)"""
+        for child in self.children:
+            yield from child.walk()
+        yield self
+
+    def flag_keys(self):
+        """(root, key) for every flag attribute in the chain
+
+        The root is the chain up to the flag attribute, so
+        <player.flag[a].flag[b]> yields ('player', 'a') only: the second
+        lookup is on the flag's value, not a flaggable object.
+        """
+        for i, (name, param) in enumerate(self.segments):
+            if name.lower() in FLAG_ATTRIBUTES and param:
+                if i == 1:
+                    yield self.root, param
+                return
+
+    def dynamic_keys(self):
+        """Parameters built at runtime from nested tags, e.g. flag[stat.<[key]>.level]"""
+        return [(name, param) for name, param in self.segments if param and '<' in param]
+
+    def __repr__(self):
+        return f"<Tag {self.text!r} level {self.level}>"
+
+def is_tag_start(text, i):
+    return TAG_START.match(text, i) is not None
+
+def parse_tag(text, start, level=1):
+    """Parse the tag opening at text[start]; returns (Tag, end) or (None, start + 1)
+
+    Brackets are balanced inside a tag, so a '>' in a parameter such as
+    .is[>].to[3] does not close it. Escape tags like <&[> and <&gt> never nest.
+    A top-level || starts the fallback, which is not part of the chain.
+    """
+    if text.startswith('<&', start):
+        end = text.find('>', start + 2)
+        if end < 0:
+            return None, start + 1
+        return Tag(text[start:end + 1], start, end + 1, level, [(text[start + 1:end], None)], []), end + 1
+
+    children = []
+    segments = []
+    # Current segment: where it starts, and its first [param] once closed
+    left = start + 1
+    param = None
+    opened = None
+    fallback = None
+    brackets = 0
+    i = start + 1
+    while True:
+        special = SPECIAL.search(text, i)
+        if special is None:
+            return None, start + 1
+        i = special.start()
+        ch = text[i]
+        if ch == '<':
+            if is_tag_start(text, i):
+                child, i = parse_tag(text, i, level + 1)
+                if child is not None:
+                    children.append(child)
+                continue
+        elif ch == '[':
+            if brackets == 0 and param is None and fallback is None:
+                opened = i
+            brackets += 1
+        elif ch == ']':
+            if brackets:
+                brackets -= 1
+                if brackets == 0 and opened is not None:
+                    param = (opened, i)
+                    opened = None
+        elif brackets == 0:
+            if ch == '>':
+                if fallback is None:
+                    segments.append(segment(text, left, i, param))
+                    return Tag(text[start:i + 1], start, i + 1, level, segments, children), i + 1
+                return Tag(text[start:i + 1], start, i + 1, level, segments, children,
+                           text[fallback + 2:i]), i + 1
+            if fallback is None:
+                if ch == '.':
+                    segments.append(segment(text, left, i, param))
+                    left = i + 1
+                    param = None
+                elif ch == '|' and text.startswith('||', i):
+                    segments.append(segment(text, left, i, param))
+                    fallback = i
+                    i += 1
+        i += 1
+
+def segment(text, left, right, param):
+    """(name, param) for text[left:right]; param is the span of its first [...]"""
+    if param is None:
+        return text[left:right], None
+    return text[left:param[0]], text[param[0] + 1:param[1]]
+
+def parse_tags(text):
+    """Top-level tags in a line, in order, each holding its nested tags"""
+    tags = []
+    i = text.find('<')
+    while i >= 0:
+        if is_tag_start(text, i):
+            tag, end = parse_tag(text, i)
+            if tag is not None:
+                tags.append(tag)
+                i = text.find('<', end)
+                continue
+        i = text.find('<', i + 1)
+    return tags
+
+def iter_tags(text):
+    """Every tag in a line, nested ones included, in evaluation order"""
+    for tag in parse_tags(text):
+        yield from tag.walk()
+
+def flag_reads(text):
+    """(root, key) for every flag lookup on a FLAG_ROOT in a line, in line order
+
+    Keys may contain nested tags at any depth, and flags read inside another
+    flag's key are found too.
+    """
+    found = []
+    for tag in iter_tags(text):
+        for root, key in tag.flag_keys():
+            if FLAG_ROOT.match(root):
+                found.append((tag.start, root, key))
+    found.sort(key=lambda f: f[0])
+    return [(root, key) for _start, root, key in found]
+
+def line_metrics(text):
+    """Tag work for running one line once
+
+    evaluations counts every tag, nested ones included; attributes counts
+    every chain segment resolved; dynamic counts tags with a parameter built
+    from another tag; depth is the deepest nesting and chain the longest
+    chain on the line.
+    """
+    metrics = {'evaluations': 0, 'attributes': 0, 'dynamic': 0, 'depth': 0, 'chain': 0}
+    if '<' not in text:
+        return metrics
+    for top in parse_tags(text):
+        metrics['depth'] = max(metrics['depth'], top.depth)
+        for tag in top.walk():
+            metrics['evaluations'] += 1
+            metrics['attributes'] += len(tag.segments)
+            metrics['chain'] = max(metrics['chain'], len(tag.segments))
+            if tag.dynamic_keys():
+                metrics['dynamic'] += 1
+    return metrics
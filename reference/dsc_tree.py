@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Indentation-aware block parser for .dsc files
+Builds a lightweight tree: containers -> keys -> events -> command lists -> nested blocks
+"""
+
+import re
+from pathlib import Path
+
+# "- ~run foo" -> command name "run"; a leading ~ marks a waitable command
+COMMAND_PATTERN = re.compile(r'^-\s*~?([^\s:]+)(.*)$')
+# "key: value"; a line ending in ':' is an open key (event lines contain colons)
+KEY_VALUE_PATTERN = re.compile(r'^([^:]+?)\s*:\s+(.*)$')
+# "on player joins:" / "after delta time secondly:"
+EVENT_KEY_PATTERN = re.compile(r'^(on|after)\s+(.+)$', re.IGNORECASE)
+LOOP_COMMANDS = ('repeat', 'foreach', 'while')
+
+# Constant folding for the handful of tag forms scripts use to size loops and waits
+DEF_TAG = re.compile(r'<\[([^\[\]<>]+)\]>')
+ELEMENT_MATH = re.compile(r'^<element\[([^\[\]<>]+)\]((?:\.(?:add|sub|mul|div)\[[^\[\]<>]+\])*)>$')
+MATH_STEP = re.compile(r'\.(add|sub|mul|div)\[([^\[\]<>]+)\]')
+DURATION = re.compile(r'^(\d+(?:\.\d+)?|\.\d+)([tsmhd]?)$')
+DURATION_UNITS = {'': 1, 's': 1, 't': 0.05, 'm': 60, 'h': 3600, 'd': 86400}
+
+class Node:
+    """One line of a .dsc file and the lines nested under it
+
+    kind is 'root', 'container' (column-0 key), 'key', 'event' (an on/after
+    key) or 'command'. For keys, name is the key and args its inline value;
+    for commands, name is the lower-cased command and args the rest of the line.
+    """
+    __slots__ = ('kind', 'name', 'args', 'text', 'line', 'indent', 'children', 'parent')
+
+    def __init__(self, kind, name, args, text, line, indent, parent=None):
+        self.kind = kind
+        self.name = name
+        self.args = args
+        self.text = text
+        self.line = line
+        self.indent = indent
+        self.children = []
+        self.parent = parent
+
+    def is_open_key(self):
+        """A key with no inline value, so a list can follow at the same indent"""
+        return self.kind in ('container', 'key', 'event') and not self.args
+
+    def key(self, name):
+        """Child key by name (case-insensitive), or None"""
+        name = name.lower()
+        for child in self.children:
+            if child.kind in ('key', 'container', 'event') and child.name.lower() == name:
+                return child
+        return None
+
+    def enclosing(self, kind):
+        """Nearest ancestor of a kind ('container', 'event', ...), or None"""
+        node = self.parent
+        while node is not None and node.kind != kind:
+            node = node.parent
+        return node
+
+    def loops(self):
+        """repeat/foreach/while commands this node is nested in, outermost first"""
+        found = []
+        node = self.parent
+        while node is not None:
+            if node.kind == 'command' and node.name in LOOP_COMMANDS:
+                found.append(node)
+            node = node.parent
+        return found[::-1]
+
+    def commands(self):
+        """Direct child commands, in order"""
+        return [child for child in self.children if child.kind == 'command']
+
+    def walk(self):
+        """This node and every descendant, depth-first in file order"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def __repr__(self):
+        return f"<{self.kind} {self.name!r} line {self.line}>"
+
+def parse_line(raw, line_num):
+    """Node for one line, not yet attached to a parent; None for blank and comment lines"""
+    line = raw.rstrip()
+    stripped = line.lstrip()
+    if not stripped or stripped[0] == '#':
+        return None
+    indent = len(line) - len(stripped)
+
+    if stripped[0] == '-':
+        match = COMMAND_PATTERN.match(stripped)
+        if match:
+            name, args = match.group(1).lower(), match.group(2).strip()
+        else:
+            name, args = '', stripped[1:].strip()
+        return Node('command', name, args, stripped, line_num, indent)
+
+    kind = 'container' if indent == 0 else 'key'
+    if stripped[-1] == ':':
+        name, args = stripped[:-1].rstrip(), ''
+        if EVENT_KEY_PATTERN.match(name):
+            kind = 'event'
+    else:
+        match = KEY_VALUE_PATTERN.match(stripped)
+        if match:
+            name, args = match.group(1), match.group(2).strip()
+        else:
+            # Plain continuation text (multi-line values, stray lines)
+            kind, name, args = 'key', '', stripped
+    return Node(kind, name, args, stripped, line_num, indent)
+
+def parse_lines(lines):
+    """Build the block tree for a file's lines"""
+    root = Node('root', '', '', '', 0, -1)
+    stack = [root]
+
+    for line_num, raw in enumerate(lines, 1):
+        node = parse_line(raw, line_num)
+        if node is None:
+            continue
+        indent = node.indent
+        is_command = node.kind == 'command'
+
+        # A list may sit at the same indent as the key that owns it
+        while len(stack) > 1:
+            top = stack[-1]
+            if top.indent < indent:
+                break
+            if is_command and top.indent == indent and top.is_open_key():
+                break
+            stack.pop()
+        parent = stack[-1]
+
+        node.parent = parent
+        parent.children.append(node)
+        stack.append(node)
+
+    return root
+
+def split_args(args):
+    """Split command arguments on spaces outside <tags>, [brackets] and quotes"""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, ch in enumerate(args):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in '<[':
+            depth += 1
+        elif ch in '>]':
+            depth = max(depth - 1, 0)
+        elif ch in '"\'' and depth == 0:
+            quote = ch
+        elif ch == ' ' and depth == 0:
+            if i > start:
+                parts.append(args[start:i])
+            start = i + 1
+    if start < len(args):
+        parts.append(args[start:])
+    return parts
+
+def split_key_value(token):
+    """('name', 'value') for a name:value argument, splitting at the first top-level colon"""
+    depth = 0
+    for i, ch in enumerate(token):
+        if ch in '<[':
+            depth += 1
+        elif ch in '>]':
+            depth = max(depth - 1, 0)
+        elif ch == ':' and depth == 0:
+            return token[:i], token[i + 1:]
+    return token, None
+
+def evaluate_number(expr, env=None):
+    """Value of a numeric literal, <[def]> or <element[..].add/sub/mul/div[..]> chain
+
+    env maps definition names to numbers already known. Returns None for
+    anything that needs runtime state.
+    """
+    env = env or {}
+    expr = expr.strip()
+
+    def substitute(match):
+        value = env.get(match.group(1))
+        return match.group(0) if value is None else f"{value:g}"
+
+    expr = DEF_TAG.sub(substitute, expr)
+    try:
+        return float(expr)
+    except ValueError:
+        pass
+
+    match = ELEMENT_MATH.match(expr)
+    if not match:
+        return None
+    try:
+        value = float(match.group(1))
+        for op, operand in MATH_STEP.findall(match.group(2)):
+            operand = float(operand)
+            if op == 'add':
+                value += operand
+            elif op == 'sub':
+                value -= operand
+            elif op == 'mul':
+                value *= operand
+            elif operand:
+                value /= operand
+            else:
+                return None
+    except ValueError:
+        return None
+    return value
+
+def parse_duration(expr, env=None):
+    """Seconds for a Denizen duration (0.2, 5t, 2s, 1m, <[wait_time]>), or None"""
+    expr = expr.strip()
+    match = DURATION.match(expr)
+    if match:
+        return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+    return evaluate_number(expr, env)
+
+def parse_file(filepath):
+    """Block tree for a .dsc file on disk"""
+    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+        return parse_lines(f.readlines())
+
+class TreeCache:
+    """Parses each file at most once, relative to a root directory
+
+    The analyzer can hand over trees it already built with put(), so later
+    passes in the same process never re-read the files.
+    """
+
+    def __init__(self, root_dir="."):
+        self.root_dir = Path(root_dir)
+        self.trees = {}
+
+    def put(self, rel_path, tree):
+        self.trees[rel_path] = tree
+
+    def get(self, rel_path):
+        tree = self.trees.get(rel_path)
+        if tree is None:
+            tree = self.trees[rel_path] = parse_file(self.root_dir / rel_path)
+        return tree
+
+    def container(self, rel_path, name):
+        """Container node for a script defined in a file"""
+        return self.get(rel_path).key(name)
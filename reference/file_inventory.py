@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+One os.scandir walk over the analysis root
+Produces the file inventory (path, size, mtime, subsystem) that the parse,
+incremental cache, categorize and doc stages all reuse
+"""
+
+import os
+import json
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+INVENTORY_FILE = "docs/inventory.json"
+
+DEFAULT_INCLUDE = ('*.dsc',)
+# Scripts switched off by renaming; --disabled analyzes them too
+DISABLED_SUFFIXES = ('.OFF', '.OLD')
+DISABLED_INCLUDE = ('*.dsc.OFF', '*.dsc.OLD')
+
+def subsystem_for(rel_path):
+    """Subsystem name for a .dsc path relative to the analysis root"""
+    for suffix in DISABLED_SUFFIXES:
+        if rel_path.endswith(suffix):
+            rel_path = rel_path[:-len(suffix)]
+            break
+
+    if 'skill_mechanics' in rel_path:
+        if 'mage_spells' in rel_path:
+            return 'Skills - Mage Spells'
+        elif 'prayer_spells' in rel_path:
+            return 'Skills - Prayer Spells'
+        elif 'song_spells' in rel_path:
+            return 'Skills - Song Spells'
+        elif 'specializations' in rel_path:
+            return 'Skills - Specializations'
+        elif 'natural_skills' in rel_path:
+            return 'Skills - Natural Skills'
+        elif 'debuffs' in rel_path or 'buffs' in rel_path:
+            return 'Skills - Status Effects'
+        else:
+            return 'Skills - Core Mechanics'
+    elif 'npc' in rel_path:
+        return 'NPCs & Dialogue'
+    elif 'creatures' in rel_path:
+        return 'Creatures & Mobs'
+    elif 'items' in rel_path:
+        if 'weapon' in rel_path:
+            return 'Items - Weapons'
+        elif 'armor' in rel_path:
+            return 'Items - Armor'
+        elif 'currency' in rel_path:
+            return 'Economy - Currency Items'
+        else:
+            return 'Items - General'
+    elif 'quest' in rel_path:
+        return 'Quests'
+    elif 'region_specific' in rel_path:
+        return 'World & Regions'
+    elif 'strongholds' in rel_path:
+        return 'Strongholds'
+    elif 'dmodels' in rel_path:
+        return 'DModels (Visual)'
+    elif rel_path in ['currency.dsc', 'equipment_handler.dsc']:
+        return 'Economy & Equipment'
+    elif rel_path in ['reputation.dsc']:
+        return 'Reputation System'
+    elif rel_path in ['first_spawn.dsc', 'general/world_loads.dsc']:
+        return 'Core - Server Lifecycle'
+    elif rel_path in ['combat.dsc']:
+        return 'Combat System'
+    else:
+        return 'Utilities & Misc'
+
+def glob_match(rel_path, name, patterns):
+    """Patterns containing '/' match the relative path, others just the name"""
+    for pattern in patterns:
+        if fnmatchcase(rel_path if '/' in pattern else name, pattern):
+            return True
+    return False
+
+class FileEntry:
+    __slots__ = ('path', 'rel', 'size', 'mtime', 'disabled', 'subsystem')
+
+    def __init__(self, path, rel, size, mtime):
+        self.path = path
+        self.rel = rel
+        self.size = size
+        # st_mtime_ns, as in the incremental cache
+        self.mtime = mtime
+        self.disabled = rel.endswith(DISABLED_SUFFIXES)
+        self.subsystem = subsystem_for(rel)
+
+    def to_dict(self):
+        return {'file': self.rel, 'size': self.size, 'mtime': self.mtime,
+                'subsystem': self.subsystem, 'disabled': self.disabled}
+
+class FileInventory:
+    """Every matching script under a root, in sorted path order
+
+    Directories and files matching an exclude glob are pruned during the walk.
+    Symlinked directories are not followed, as with Path.rglob.
+    """
+
+    def __init__(self, root_dir, entries):
+        self.root_dir = Path(root_dir)
+        self.entries = entries
+        self.by_rel = {e.rel: e for e in entries}
+
+    @classmethod
+    def scan(cls, root_dir=".", include=None, exclude=(), disabled=False):
+        root_dir = Path(root_dir)
+        include = tuple(include or DEFAULT_INCLUDE)
+        if disabled:
+            include += DISABLED_INCLUDE
+        exclude = tuple(exclude)
+
+        entries = []
+        pending = [(root_dir, '')]
+        while pending:
+            directory, prefix = pending.pop()
+            try:
+                scan = os.scandir(directory)
+            except OSError as e:
+                print(f"Error reading {directory}: {e}")
+                continue
+            with scan:
+                for entry in scan:
+                    rel = prefix + entry.name
+                    if exclude and glob_match(rel, entry.name, exclude):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((directory / entry.name, rel + '/'))
+                    elif glob_match(rel, entry.name, include) and entry.is_file():
+                        st = entry.stat()
+                        entries.append(FileEntry(directory / entry.name, rel, st.st_size, st.st_mtime_ns))
+        entries.sort(key=lambda e: e.path)
+        return cls(root_dir, entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def paths(self):
+        return [e.path for e in self.entries]
+
+    def disabled_count(self):
+        return sum(1 for e in self.entries if e.disabled)
+
+    def subsystems(self):
+        """Subsystem -> relative paths, as generate_docs.categorize_files"""
+        subsystems = {}
+        for e in self.entries:
+            subsystems.setdefault(e.subsystem, []).append(e.rel)
+        return dict(sorted(subsystems.items()))
+
+    def save(self, output_file=INVENTORY_FILE):
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'w') as f:
+            json.dump({'root': str(self.root_dir), 'files': [e.to_dict() for e in self.entries]}, f, indent=2)
+        print(f"Saved file inventory to {output_file}")
+
+    @classmethod
+    def load(cls, input_file=INVENTORY_FILE):
+        with open(input_file, 'r') as f:
+            data = json.load(f)
+        root_dir = Path(data['root'])
+        entries = [FileEntry(root_dir / e['file'], e['file'], e['size'], e['mtime']) for e in data['files']]
+        return cls(root_dir, entries)
+
+def add_inventory_arguments(parser):
+    """--include/--exclude globs and --disabled, shared by the analysis CLIs"""
+    parser.add_argument('--include', metavar='GLOB', action='append',
+                        help=f"scripts to analyze; repeatable (default {' '.join(DEFAULT_INCLUDE)})")
+    parser.add_argument('--exclude', metavar='GLOB', action='append', default=[],
+                        help="skip files and directories matching GLOB; repeatable")
+    parser.add_argument('--disabled', action='store_true',
+                        help=f"also analyze disabled scripts ({', '.join(DISABLED_INCLUDE)})")
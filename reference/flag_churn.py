@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Flag write amplification for high-frequency handlers
+Joins the data key index with handler frequency to estimate flag reads and
+writes per player per second, and flags writes that store an unchanged value
+"""
+
+import json
+import argparse
+from collections import defaultdict
+
+from analyze_denizen import load_analysis, key_access
+from dsc_tree import LOOP_COMMANDS, split_args, split_key_value
+from tick_budget import HandlerWalker, PLAYER_COUNTS, poly_mul, poly_add_into, poly_eval
+from wait_loops import handler_frequency
+
+# Flag values that modify rather than overwrite, e.g. score:++ or list:->:item
+MUTATING_PREFIXES = ('++', '--', '+:', '-:', '*:', '/:', '->:', '<-:', '!', '|:')
+BRANCH_COMMANDS = ('if', 'else', 'while', 'waituntil')
+
+UNCHANGED_REASONS = {
+    'constant': "writes the only value the key ever holds, every firing, without checking it first",
+    'identity': "writes back the value it just read from the same flag",
+    'compare': "the new value is compared with the stored one, but the write is not inside that check",
+}
+
+def guard_conditions(node):
+    """Condition text of every branch a command only runs under
+
+    An `else` also depends on the if/else-if lines that precede it in the
+    same chain, so their conditions count as well.
+    """
+    parent = node.parent
+    while parent is not None:
+        if parent.kind == 'command' and parent.name in BRANCH_COMMANDS:
+            yield parent.args
+            if parent.name == 'else' and parent.parent is not None:
+                siblings = parent.parent.children
+                for sibling in reversed(siblings[:siblings.index(parent)]):
+                    if sibling.kind != 'command' or sibling.name not in ('if', 'else'):
+                        break
+                    yield sibling.args
+                    if sibling.name == 'if':
+                        break
+        parent = parent.parent
+
+class FlagChurn(HandlerWalker):
+    """Per-key flag read/write rates from every timer and movement handler
+
+    Rates start at the handler's firings per second and are multiplied by
+    loop counts exactly as in TickBudget, so a write inside
+    `foreach <server.online_players>` under a secondly timer costs P writes/s.
+    Every branch is counted, so rates are upper bounds.
+    """
+
+    def __init__(self, data, root_dir=".", trees=None):
+        super().__init__(data, root_dir, trees)
+        # (file, line) -> [(key, 'read'|'write')] from the analysis records
+        self.line_keys = defaultdict(list)
+        # key -> every line in the tree that writes it, reachable from a handler or not
+        self.writers = defaultdict(set)
+        for entry in data['data_keys']:
+            if entry['type'] == 'flag':
+                access = key_access(entry)
+                self.line_keys[(entry['file'], entry['line'])].append((entry['key'], access))
+                if access == 'write':
+                    self.writers[entry['key']].add((entry['file'], entry['line']))
+        self.keys = defaultdict(lambda: {'reads': [0], 'writes': [0], 'unchanged': [0]})
+        self.sites = {}
+
+    def walk_handler(self, event, frequency):
+        try:
+            node = self.event_node(event)
+        except OSError:
+            self.assumptions[event['file']].add("source not available")
+            return
+        if node is None:
+            return
+        label = self.definitions.container_at(event['file'], event['line'])[2]
+        self.walk(node.children, frequency, event['file'], label, {}, (label,), self.new_scope(), event)
+
+    def new_scope(self):
+        """Per-queue facts: definition -> flag keys it was read from, and every condition seen"""
+        return {'defs': {}, 'conditions': []}
+
+    def walk(self, nodes, mult, file, script, env, stack, scope, event):
+        for node in nodes:
+            if node.kind != 'command':
+                continue
+            name = node.name
+            args = node.args.rstrip(':').strip()
+
+            if name in BRANCH_COMMANDS:
+                scope['conditions'].append(node)
+
+            for key, access in self.line_keys.get((file, node.line), ()):
+                rates = self.keys[key]
+                if access == 'read':
+                    poly_add_into(rates['reads'], mult)
+                    continue
+                poly_add_into(rates['writes'], mult)
+                reason = self.unchanged_reason(node, key, scope)
+                if reason:
+                    poly_add_into(rates['unchanged'], mult)
+                site = self.sites.setdefault((key, file, node.line), {
+                    'key': key, 'file': file, 'line': node.line, 'script': script,
+                    'command': node.text, 'reason': reason, 'writes': [0],
+                    'handlers': set(),
+                })
+                poly_add_into(site['writes'], mult)
+                site['handlers'].add(f"{event['event']} ({event['file']}:{event['line']})")
+
+            if name == 'define':
+                self.track_define(args, env)
+                parts = args.split(None, 1)
+                if len(parts) == 2:
+                    scope['defs'][parts[0]] = {key for key, access in self.line_keys.get((file, node.line), ())
+                                               if access == 'read'}
+
+            if node.children:
+                child_mult = mult
+                if name in LOOP_COMMANDS:
+                    child_mult = poly_mul(mult, self.loop_multiplier(name, args, env, script))
+                self.walk(node.children, child_mult, file, script, env, stack, scope, event)
+
+            if name in ('run', 'inject') and args:
+                target = args.split()[0]
+                body, target_name = self.script_body(target)
+                if body is None:
+                    if target_name:
+                        self.assumptions[script].add(f"{name} {target} not resolved")
+                    continue
+                if target_name in stack:
+                    continue
+                target_file = self.definitions.lookup(target_name)['file']
+                if name == 'inject':
+                    self.walk(body.children, mult, target_file, target_name, env,
+                              stack + (target_name,), scope, event)
+                else:
+                    self.walk(body.children, mult, target_file, target_name, {},
+                              stack + (target_name,), self.new_scope(), event)
+
+    def unchanged_reason(self, node, key, scope):
+        """Why a flag write likely stores the value already there, or None"""
+        if node.name != 'flag':
+            return None
+        args = split_args(node.args)
+        if len(args) < 2:
+            return None
+        _name, value = split_key_value(args[1])
+        if value is not None and value.startswith(MUTATING_PREFIXES):
+            return None
+
+        flag_name = key.split('.flag.', 1)[-1]
+        # Checking the parent flag (has_flag[skill.x] before writing skill.x.level) guards too
+        guards = [flag_name]
+        if '.' in flag_name:
+            guards.append(flag_name.rsplit('.', 1)[0])
+        derived = {f"<[{d}]>" for d, keys in scope['defs'].items() if key in keys}
+
+        # A write nested under a check of the same flag only runs when needed
+        for text in guard_conditions(node):
+            if any(g in text for g in guards) or any(d in text for d in derived):
+                return None
+
+        # A literal is only unchanged if nothing else ever writes the key
+        if value is None or '<' not in value:
+            return 'constant' if len(self.writers[key]) == 1 else None
+        if value in derived:
+            return 'identity'
+        if value.startswith('<[') and value.endswith(']>'):
+            for condition in scope['conditions']:
+                text = condition.args
+                if '==' in text and value in text and (flag_name in text or any(d in text for d in derived)):
+                    return 'compare'
+        return None
+
+    def report(self):
+        for event in self.data['events']:
+            frequency = handler_frequency(event['event'])
+            if frequency is not None:
+                self.walk_handler(event, frequency)
+
+        keys = []
+        for key, rates in self.keys.items():
+            if not any(rates['writes']) and not any(rates['reads']):
+                continue
+            keys.append({
+                'key': key,
+                'per_second': rates,
+                'projection': {p: {metric: poly_eval(poly, p) for metric, poly in rates.items()}
+                               for p in PLAYER_COUNTS},
+            })
+        keys.sort(key=lambda k: (-k['projection'][200]['writes'], k['key']))
+
+        sites = []
+        for site in self.sites.values():
+            sites.append(dict(site, handlers=sorted(site['handlers']),
+                              projection={p: poly_eval(site['writes'], p) for p in PLAYER_COUNTS}))
+        sites.sort(key=lambda s: (-s['projection'][200], s['file'], s['line']))
+
+        return {
+            'player_counts': list(PLAYER_COUNTS),
+            'keys': keys,
+            'write_sites': sites,
+            'assumptions': {k: sorted(v) for k, v in sorted(self.assumptions.items())},
+        }
+
+def per_player(projection, players, metric):
+    return projection[players][metric] / players
+
+def generate_markdown(report):
+    total = {m: sum(k['projection'][200][m] for k in report['keys']) for m in ('reads', 'writes', 'unchanged')}
+    lines = [
+        "# Flag Churn",
+        "",
+        "**Purpose:** Flag reads and writes per second driven by timer and movement handlers.",
+        "",
+        "Every flag write is persisted state. Rates follow run/inject calls from each handler and count",
+        "every if/else branch, so they are upper bounds. \"Per player\" divides the total at 50 players by 50.",
+        "",
+        f"At 200 players: **{total['writes']:,.0f} writes/s** "
+        f"({total['unchanged']:,.0f} likely unchanged) and {total['reads']:,.0f} reads/s.",
+        "",
+        "---",
+        "",
+        "## Keys by Persistence Churn",
+        "",
+        "| Key | Writes/s per player | Reads/s per player | Writes/s @200 | Unchanged writes/s @200 |",
+        "|-----|---------------------|--------------------|---------------|-------------------------|",
+    ]
+    for k in report['keys'][:40]:
+        if not k['projection'][200]['writes']:
+            continue
+        p = k['projection']
+        lines.append(f"| `{k['key']}` | {per_player(p, 50, 'writes'):,.2f} | {per_player(p, 50, 'reads'):,.2f} | "
+                     f"{p[200]['writes']:,.0f} | {p[200]['unchanged']:,.0f} |")
+
+    unchanged = [s for s in report['write_sites'] if s['reason']]
+    lines.extend(["", "---", "", "## Unchanged Rewrites", ""])
+    if unchanged:
+        lines.extend([
+            "| Location | Script | Command | Writes/s @200 | Why |",
+            "|----------|--------|---------|---------------|-----|",
+        ])
+        for s in unchanged:
+            command = s['command'].replace('|', '\\|')
+            lines.append(f"| [{s['file']}:{s['line']}]({s['file']}#L{s['line']}) | `{s['script']}` | "
+                         f"`{command[:60]}` | {s['projection'][200]:,.0f} | {UNCHANGED_REASONS[s['reason']]} |")
+    else:
+        lines.append("No unguarded rewrites of unchanged values found.")
+
+    if report['assumptions']:
+        lines.extend(["", "---", "", "## Assumptions", ""])
+        for script, notes in report['assumptions'].items():
+            lines.append(f"- `{script}`: " + "; ".join(notes))
+
+    lines.append("")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate flag write amplification on high-frequency paths")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    parse_args(argv)
+    data = load_analysis(compact=True)
+    report = FlagChurn(data).report()
+
+    with open('docs/flag_churn.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    with open('docs/FLAG_CHURN.md', 'w') as f:
+        f.write(generate_markdown(report))
+
+    print(f"✓ Estimated churn for {len(report['keys'])} flag keys")
+    for k in report['keys'][:5]:
+        print(f"  {k['key']}: {per_player(k['projection'], 50, 'writes'):,.2f} writes/s per player")
+    unchanged = sum(1 for s in report['write_sites'] if s['reason'])
+    print(f"✓ {unchanged} write sites likely rewrite an unchanged value")
+    print("✓ Generated docs/FLAG_CHURN.md and docs/flag_churn.json")
+
+if __name__ == "__main__":
+    main()
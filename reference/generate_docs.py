@@ -3,77 +3,30 @@
 Generate comprehensive documentation for the Denizen scripting system
 """
 
-import json
 import os
-from pathlib import Path
-from collections import defaultdict, Counter
+import argparse
+from collections import defaultdict
 
-def load_analysis():
-    """Load the analysis JSON file"""
-    with open('docs/analysis.json', 'r') as f:
-        return json.load(f)
+from analyze_denizen import load_analysis, RECORD_KINDS
+from analysis_index import AnalysisIndex
+from file_inventory import FileInventory, INVENTORY_FILE
+from profiling import add_profile_arguments, profiler_for, stage, hot, finish
+
+PROFILE_FILE = "docs/profile_docs.json"
 
 def categorize_files():
-    """Categorize all .dsc files by subsystem"""
-    subsystems = defaultdict(list)
-
-    for root, dirs, files in os.walk('.'):
-        for file in files:
-            if file.endswith('.dsc'):
-                rel_path = os.path.relpath(os.path.join(root, file), '.')
-
-                # Categorize based on path
-                if 'skill_mechanics' in rel_path:
-                    if 'mage_spells' in rel_path:
-                        subsystems['Skills - Mage Spells'].append(rel_path)
-                    elif 'prayer_spells' in rel_path:
-                        subsystems['Skills - Prayer Spells'].append(rel_path)
-                    elif 'song_spells' in rel_path:
-                        subsystems['Skills - Song Spells'].append(rel_path)
-                    elif 'specializations' in rel_path:
-                        subsystems['Skills - Specializations'].append(rel_path)
-                    elif 'natural_skills' in rel_path:
-                        subsystems['Skills - Natural Skills'].append(rel_path)
-                    elif 'debuffs' in rel_path or 'buffs' in rel_path:
-                        subsystems['Skills - Status Effects'].append(rel_path)
-                    else:
-                        subsystems['Skills - Core Mechanics'].append(rel_path)
-                elif 'npc' in rel_path:
-                    subsystems['NPCs & Dialogue'].append(rel_path)
-                elif 'creatures' in rel_path:
-                    subsystems['Creatures & Mobs'].append(rel_path)
-                elif 'items' in rel_path:
-                    if 'weapon' in rel_path:
-                        subsystems['Items - Weapons'].append(rel_path)
-                    elif 'armor' in rel_path:
-                        subsystems['Items - Armor'].append(rel_path)
-                    elif 'currency' in rel_path:
-                        subsystems['Economy - Currency Items'].append(rel_path)
-                    else:
-                        subsystems['Items - General'].append(rel_path)
-                elif 'quest' in rel_path:
-                    subsystems['Quests'].append(rel_path)
-                elif 'region_specific' in rel_path:
-                    subsystems['World & Regions'].append(rel_path)
-                elif 'strongholds' in rel_path:
-                    subsystems['Strongholds'].append(rel_path)
-                elif 'dmodels' in rel_path:
-                    subsystems['DModels (Visual)'].append(rel_path)
-                elif rel_path in ['currency.dsc', 'equipment_handler.dsc']:
-                    subsystems['Economy & Equipment'].append(rel_path)
-                elif rel_path in ['reputation.dsc']:
-                    subsystems['Reputation System'].append(rel_path)
-                elif rel_path in ['first_spawn.dsc', 'general/world_loads.dsc']:
-                    subsystems['Core - Server Lifecycle'].append(rel_path)
-                elif rel_path in ['combat.dsc']:
-                    subsystems['Combat System'].append(rel_path)
-                else:
-                    subsystems['Utilities & Misc'].append(rel_path)
-
-    return dict(sorted(subsystems.items()))
-
-def generate_system_map(data, subsystems):
+    """Categorize .dsc files by subsystem
+
+    Uses the file inventory saved by analyze_denizen.py, so the categories
+    match the analyzed files; the tree is only walked when there is none.
+    """
+    if os.path.exists(INVENTORY_FILE):
+        return FileInventory.load(INVENTORY_FILE).subsystems()
+    return FileInventory.scan('.').subsystems()
+
+def generate_system_map(index):
     """Generate SYSTEM_MAP.md"""
+    subsystems = index.subsystems
 
     lines = [
         "# Denizen Scripting System Map",
@@ -108,11 +61,9 @@ def generate_system_map(data, subsystems):
         lines.append(f"**Files:** {len(files)}")
         lines.append("")
 
-        # Find events related to this subsystem
-        subsystem_events = [e for e in data['events'] if any(f in e['file'] for f in files)]
-
-        # Find calls
-        subsystem_calls = [c for c in data['calls'] if any(f in c['file'] for f in files)]
+        # Events and calls related to this subsystem
+        subsystem_events = index.subsystem_events.get(subsystem_name, [])
+        subsystem_calls = index.subsystem_calls.get(subsystem_name, [])
 
         lines.append(f"**Event Handlers:** {len(subsystem_events)}")
         lines.append(f"**Script Calls:** {len(subsystem_calls)}")
@@ -237,34 +188,10 @@ def generate_system_map(data, subsystems):
 
     print("✓ Generated docs/SYSTEM_MAP.md")
 
-def generate_data_keys(data):
+def generate_data_keys(index):
     """Generate DATA_KEYS.md"""
 
-    # Normalize and deduplicate keys
-    key_info = defaultdict(lambda: {
-        'type': set(),
-        'scope': set(),
-        'readers': set(),
-        'writers': set(),
-        'files': set(),
-        'contexts': []
-    })
-
-    for entry in data['data_keys']:
-        key = entry['key']
-        key_info[key]['type'].add(entry['type'])
-        key_info[key]['scope'].add(entry['scope'])
-        key_info[key]['files'].add(entry['file'])
-
-        # Determine if read or write
-        context = entry['context'].lower()
-        if 'read' in context or '<' in entry['context']:
-            key_info[key]['readers'].add(entry['file'])
-        if 'flag' in context or 'set' in context or 'yaml set' in context:
-            key_info[key]['writers'].add(entry['file'])
-
-        if len(key_info[key]['contexts']) < 3:
-            key_info[key]['contexts'].append(entry['context'])
+    key_info = index.key_info
 
     lines = [
         "# Data Keys Index",
@@ -387,8 +314,9 @@ def generate_data_keys(data):
 
     print("✓ Generated docs/DATA_KEYS.md")
 
-def generate_event_index(data):
+def generate_event_index(index):
     """Generate EVENT_INDEX.md"""
+    data = index.data
 
     lines = [
         "# Event Handler Index",
@@ -402,12 +330,11 @@ def generate_event_index(data):
     ]
 
     # Count event types
-    event_types = Counter([e['event'] for e in data['events']])
     lines.append("| Event | Count | Files |")
     lines.append("|-------|-------|-------|")
 
-    for event, count in event_types.most_common(20):
-        files = len(set(e['file'] for e in data['events'] if e['event'] == event))
+    for event, count in index.event_counts.most_common(20):
+        files = len(index.event_files[event])
         lines.append(f"| `{event}` | {count} | {files} |")
 
     lines.extend([
@@ -465,8 +392,9 @@ def generate_event_index(data):
 
     print("✓ Generated docs/EVENT_INDEX.md")
 
-def generate_call_graph(data):
+def generate_call_graph(index):
     """Generate CALL_GRAPH.md"""
+    data = index.data
 
     lines = [
         "# Call Graph & Script Dependencies",
@@ -480,33 +408,13 @@ def generate_call_graph(data):
     ]
 
     # Count call types
-    call_types = Counter([c['type'] for c in data['calls']])
     lines.append("| Call Type | Count |")
     lines.append("|-----------|-------|")
-    for call_type, count in call_types.items():
+    for call_type, count in index.call_types.items():
         lines.append(f"| `{call_type}` | {count} |")
 
     lines.append("")
 
-    # Build call graph
-    call_graph = defaultdict(lambda: {'calls': [], 'called_by': []})
-
-    for call in data['calls']:
-        caller = call['file']
-        target = call['target']
-        call_type = call['type']
-
-        call_graph[caller]['calls'].append({
-            'target': target,
-            'type': call_type,
-            'line': call['line']
-        })
-        call_graph[target]['called_by'].append({
-            'caller': caller,
-            'type': call_type,
-            'line': call['line']
-        })
-
     lines.extend([
         "---",
         "",
@@ -514,20 +422,18 @@ def generate_call_graph(data):
         "",
         "Scripts that are frequently called by others:",
         "",
-        "| Target Script | Times Called | Unique Callers |",
-        "|---------------|--------------|----------------|"
+        "| Target Script | Times Called | Unique Callers | Defined In |",
+        "|---------------|--------------|----------------|------------|"
     ])
 
-    target_counts = defaultdict(int)
-    target_callers = defaultdict(set)
-
-    for call in data['calls']:
-        target_counts[call['target']] += 1
-        target_callers[call['target']].add(call['file'])
-
-    for target, count in sorted(target_counts.items(), key=lambda x: -x[1])[:20]:
-        unique_callers = len(target_callers[target])
-        lines.append(f"| `{target}` | {count} | {unique_callers} |")
+    for target, count in sorted(index.target_counts.items(), key=lambda x: -x[1])[:20]:
+        unique_callers = len(index.target_callers[target])
+        status, definition = index.definitions.resolve({'target': target})
+        if status == 'resolved':
+            defined_in = f"[{definition['file']}:{definition['line']}]({definition['file']}#L{definition['line']})"
+        else:
+            defined_in = '_dynamic_' if status == 'dynamic' else '_undefined_'
+        lines.append(f"| `{target}` | {count} | {unique_callers} | {defined_in} |")
 
     lines.extend([
         "",
@@ -541,15 +447,10 @@ def generate_call_graph(data):
         "|--------|----------------|----------------|"
     ])
 
-    caller_counts = defaultdict(int)
-    caller_targets = defaultdict(set)
-
-    for call in data['calls']:
-        caller_counts[call['file']] += 1
-        caller_targets[call['file']].add(call['target'])
+    caller_counts = {caller: len(calls) for caller, calls in index.file_calls.items()}
 
     for caller, count in sorted(caller_counts.items(), key=lambda x: -x[1])[:20]:
-        unique_targets = len(caller_targets[caller])
+        unique_targets = len(index.file_targets[caller])
         lines.append(f"| [{caller}]({caller}) | {count} | {unique_targets} |")
 
     lines.extend([
@@ -570,7 +471,7 @@ def generate_call_graph(data):
     ]
 
     for script_file, subsystem_name in subsystems_of_interest:
-        calls_from = [c for c in data['calls'] if c['file'] == script_file]
+        calls_from = index.file_calls.get(script_file, [])
 
         if calls_from:
             lines.append(f"### {subsystem_name}")
@@ -594,35 +495,73 @@ def generate_call_graph(data):
         "",
         "### Circular Dependencies",
         "",
-        "Scripts that call each other (potential infinite loops):",
+        "Scripts that call each other, directly or through a longer loop (potential infinite loops):",
         ""
     ])
 
-    # Find circular calls
-    circular = []
-    for script_a in call_graph:
-        for call in call_graph[script_a]['calls']:
-            target = call['target']
-            # Check if target calls back to script_a
-            if any(c['target'] == script_a for c in call_graph.get(target, {}).get('calls', [])):
-                if script_a < target:  # Avoid duplicates
-                    circular.append((script_a, target))
-
-    if circular:
-        for a, b in circular[:10]:
-            lines.append(f"- `{a}` ↔ `{b}`")
+    call_graph = index.call_graph
+    cycles = call_graph.cycles()
+    if cycles:
+        for cycle in cycles[:10]:
+            lines.append("- " + " → ".join(f"`{name}`" for name in cycle + [cycle[0]]))
+        if len(cycles) > 10:
+            lines.append(f"- _{len(cycles) - 10} more cycles..._")
     else:
-        lines.append("_No obvious circular dependencies detected (direct calls only)_")
+        lines.append("_No circular dependencies detected_")
 
     lines.append("")
 
     lines.extend([
         "### Deep Call Chains",
         "",
-        "_Manual review recommended for:_",
-        "- game_loop.dsc → game_loop_task → (multiple subsystems)",
-        "- Any call chains deeper than 5 levels",
-        "- Calls within high-frequency event handlers",
+        "Longest run/inject chain reachable from each event handler (cycles count as one level):",
+        "",
+        "| Event | Handler | Depth | Chain |",
+        "|-------|---------|-------|-------|"
+    ])
+
+    chains = call_graph.event_chains()
+    for c in chains[:20]:
+        chain = " → ".join(c['chain'])
+        lines.append(f"| `{c['event'][:50]}` | [{c['file']}:{c['line']}]({c['file']}#L{c['line']}) | {c['depth']} | {chain} |")
+    if len(chains) > 20:
+        lines.append(f"| ... | ... | ... | _{len(chains) - 20} more handlers_ |")
+
+    lines.extend([
+        "",
+        f"**Resolved script edges:** {sum(len(t) for t in call_graph.edges.values())}  ",
+        f"**Dynamic targets:** {call_graph.dynamic_calls}  ",
+        f"**Unresolved targets:** {len(call_graph.unresolved)}",
+        "",
+        "### Unresolved Targets",
+        "",
+        "Run/inject targets with no matching script container:",
+        ""
+    ])
+
+    report = index.definitions.resolution_report(data['calls'])
+    if report['unresolved']:
+        for name, calls in list(report['unresolved'].items())[:20]:
+            first = calls[0]
+            lines.append(f"- `{name}` ({len(calls)} calls, first at [{first['file']}:{first['line']}]({first['file']}#L{first['line']}))")
+    else:
+        lines.append("_Every static target resolves to a definition_")
+
+    lines.extend([
+        "",
+        "### Duplicate Definitions",
+        "",
+    ])
+
+    duplicates = index.definitions.duplicates()
+    if duplicates:
+        for name, defs in list(duplicates.items())[:20]:
+            where = ", ".join(f"[{d['file']}:{d['line']}]({d['file']}#L{d['line']})" for d in defs)
+            lines.append(f"- `{name}`: {where}")
+    else:
+        lines.append("_No script name is defined twice_")
+
+    lines.extend([
         "",
         "---",
         "",
@@ -639,18 +578,34 @@ def generate_call_graph(data):
 
     print("✓ Generated docs/CALL_GRAPH.md")
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the Markdown documentation from the analysis results")
+    add_profile_arguments(parser, PROFILE_FILE)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = profiler_for(args, 'generate_docs', PROFILE_FILE)
+
     print("Loading analysis data...")
-    data = load_analysis()
+    with stage(profiler, 'load') as load:
+        data = load_analysis(compact=True)
+        load['counts'].update((name, len(data.get(name, []))) for name in RECORD_KINDS.values())
 
     print("Categorizing files by subsystem...")
-    subsystems = categorize_files()
+    with stage(profiler, 'categorize') as categorize:
+        subsystems = categorize_files()
+        categorize['counts']['files'] = sum(len(files) for files in subsystems.values())
+
+    print("Indexing analysis records...")
+    with hot(profiler, 'index + generators'):
+        with stage(profiler, 'index'):
+            index = AnalysisIndex(data, subsystems)
 
-    print("Generating documentation...")
-    generate_system_map(data, subsystems)
-    generate_data_keys(data)
-    generate_event_index(data)
-    generate_call_graph(data)
+        print("Generating documentation...")
+        for generator in (generate_system_map, generate_data_keys, generate_event_index, generate_call_graph):
+            with stage(profiler, generator.__name__):
+                generator(index)
 
     print("\n" + "="*60)
     print("DOCUMENTATION GENERATION COMPLETE")
@@ -665,6 +620,7 @@ def main():
     print("  - docs/EVENT_INDEX.md")
     print("  - docs/CALL_GRAPH.md")
     print("\nReady for Stormroot mythic framework redesign!")
+    finish(profiler, args)
 
 if __name__ == "__main__":
     main()
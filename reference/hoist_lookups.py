@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Repeated tag lookups worth hoisting into a define
+Finds identical or prefix-sharing lookups evaluated more than once in one
+queue, weights them by how often the queue runs, and suggests the define
+"""
+
+import re
+import json
+import argparse
+from collections import defaultdict, Counter
+
+from analyze_denizen import load_analysis
+from dsc_tags import TAG_START, parse_tags
+from dsc_tree import LOOP_COMMANDS, split_args, split_key_value
+from tick_budget import HandlerWalker, PLAYER_COUNTS, poly_mul, poly_add_into, poly_eval
+from tick_sim import CLICK_EVENTS, CLICK_RATE
+from wait_loops import handler_frequency
+
+# Bodies that are alternatives: lookups under an if and its else never both run
+BRANCH_COMMANDS = ('if', 'else', 'case', 'default')
+# After these, entity, inventory and world tags may read differently
+MUTATING_COMMANDS = ('adjust', 'give', 'take', 'inventory', 'equip', 'teleport', 'heal', 'hurt',
+                     'feed', 'spawn', 'remove', 'modifyblock', 'money', 'cast', 'wait', 'waituntil')
+# Roots whose lookups do not depend on world state
+STATIC_ROOTS = ('script', 'element', 'list', 'map')
+# Attributes that return something new on every evaluation
+VOLATILE = re.compile(r'random|time_now|current_tick|current_time|uuid', re.IGNORECASE)
+# Attributes taking a dotted path into a map, so data_key[a] holds data_key[a.b]
+PATH_ATTRIBUTES = ('data_key', 'flag', 'deep_get')
+# Definitions set by loops on every iteration
+LOOP_DEFINITIONS = ('value', 'key', 'loop_index')
+DEF_REF = re.compile(r'<\[([^\[\]<>]+)\]')
+# First piece of a flag key; empty when the key starts with a tag
+FLAG_PARAM = re.compile(r'flag(?:_expiration)?\[([^\[\]<>.]*)', re.IGNORECASE)
+
+def path_parts(param):
+    """Split a dotted key on the dots outside nested tags and brackets"""
+    parts = []
+    depth = 0
+    start = 0
+    for i, ch in enumerate(param):
+        if ch in '<[':
+            depth += 1
+        elif ch in '>]':
+            depth = max(depth - 1, 0)
+        elif ch == '.' and depth == 0:
+            parts.append(param[start:i])
+            start = i + 1
+    parts.append(param[start:])
+    return parts
+
+def format_segment(name, param):
+    if not name:
+        return f"[{param}]"
+    return name if param is None else f"{name}[{param}]"
+
+def nested_count(text):
+    return len(TAG_START.findall(text))
+
+def lookup_keys(tag):
+    """Lookups a tag performs that another tag could share, longest first
+
+    Each is (text, remainder, cost, hint, added): the chain without the <>
+    and fallback, what a use of the hoisted definition still looks up, the
+    attribute lookups plus nested tags the shared part costs, the word the
+    definition is named after, and the lookups a use adds that the tag did
+    not do (the deep_get into a path prefix). <[def]>, <player> and escapes
+    have nothing to share.
+    """
+    segments = tag.segments
+    if len(segments) < 2 or tag.text.startswith('<&'):
+        return []
+    if any(VOLATILE.search(name) for name, _param in segments):
+        return []
+    formatted = [format_segment(name, param) for name, param in segments]
+    keys = []
+    for k in range(len(segments), 1, -1):
+        name, param = segments[k - 1]
+        rest = '.'.join(formatted[k:])
+        text = '.'.join(formatted[:k])
+        keys.append((text, rest, k + nested_count(text), path_parts(param)[-1] if param else name, 0))
+        if name.lower() not in PATH_ATTRIBUTES or not param:
+            continue
+        parts = path_parts(param)
+        for j in range(len(parts) - 1, 0, -1):
+            partial = '.'.join(formatted[:k - 1] + [f"{name}[{'.'.join(parts[:j])}]"])
+            remainder = f"deep_get[{'.'.join(parts[j:])}]" + (f".{rest}" if rest else '')
+            keys.append((partial, remainder, k + nested_count(partial), parts[j - 1], 1))
+    return keys
+
+def define_name(text, hint):
+    """Definition name for a hoisted lookup, from the last key piece it reads"""
+    if hint.startswith('<[') and hint.endswith(']>'):
+        word = hint[2:-2]
+    else:
+        word = re.sub(r'<[^<>]*>', '', hint)
+    word = re.sub(r'\W+', '_', word).strip('_').lower() or 'lookup'
+    # <[spell]> keyed lookups become spell_data rather than shadowing spell
+    if word in DEF_REF.findall(text):
+        word += '_data'
+    return word
+
+class HoistLookups(HandlerWalker):
+    """Repeated lookups per queue on timer, movement and right-click paths
+
+    A handler firing and everything it injects is one queue; each `run`
+    starts another. Within a queue, tags are grouped by the longest lookup
+    they share with other tags that saves the most, so five
+    data_key[spells.<[x]>.*] reads share data_key[spells.<[x]>]. A define of a definition the lookup uses,
+    a flag write to its key, or a command that changes the world (for
+    non-script roots) ends the group. Lookups under an if and its else are
+    never counted together. Rates follow run/inject calls and loop counts as
+    in TickBudget.
+    """
+
+    def __init__(self, data, root_dir=".", trees=None, click_rate=CLICK_RATE):
+        super().__init__(data, root_dir, trees)
+        self.click_rate = click_rate
+        self.lines = {}
+        self.findings = {}
+
+    def frequency(self, event):
+        """Firings per second as a polynomial in P; right clicks at click_rate per player"""
+        frequency = handler_frequency(event)
+        if frequency is None and event.lower().startswith(CLICK_EVENTS):
+            return [0, self.click_rate]
+        return frequency
+
+    def tags(self, file, node):
+        """Top-level tags of a command line, parsed once"""
+        tags = self.lines.get((file, node.line))
+        if tags is None:
+            tags = self.lines[(file, node.line)] = parse_tags(node.text) if '<' in node.text else []
+        return tags
+
+    def new_scope(self, script):
+        """Per-queue lookups and the epochs that invalidate them"""
+        return {'script': script, 'lookups': [], 'epochs': Counter()}
+
+    def walk_handler(self, event, frequency):
+        try:
+            node = self.event_node(event)
+        except OSError:
+            self.assumptions[event['file']].add("source not available")
+            return
+        if node is None:
+            return
+        label = self.definitions.container_at(event['file'], event['line'])[2]
+        handler = f"{event['event']} ({event['file']}:{event['line']})"
+        scope = self.new_scope(label)
+        self.walk(node.children, frequency, event['file'], label, {}, (label,), scope, (), handler)
+        self.close_scope(scope, handler)
+
+    def signature(self, text, root, scope):
+        """Epochs of everything the lookup text depends on"""
+        epochs = scope['epochs']
+        signature = [epochs['def:' + d] for d in sorted(set(DEF_REF.findall(text)))]
+        pieces = set(FLAG_PARAM.findall(text))
+        if pieces:
+            signature.append(epochs['flag:*'])
+            signature.extend(epochs['flag:' + p] if p else epochs['flag:any'] for p in sorted(pieces))
+        if root not in STATIC_ROOTS:
+            signature.append(epochs['world'])
+        return tuple(signature)
+
+    def record(self, tag, parent, node, file, script, mult, scope, path):
+        index = parent
+        keys = lookup_keys(tag)
+        if keys:
+            root = tag.segments[0][0].lower()
+            index = len(scope['lookups'])
+            scope['lookups'].append({
+                'file': file, 'line': node.line, 'script': script, 'tag': tag,
+                'keys': keys, 'ids': [(k[0], self.signature(k[0], root, scope)) for k in keys],
+                'rate': mult, 'path': path, 'parent': parent,
+            })
+        for child in tag.children:
+            self.record(child, index, node, file, script, mult, scope, path)
+
+    def invalidate(self, name, args, scope):
+        """Bump the epochs a command changes"""
+        epochs = scope['epochs']
+        if name == 'define' and args:
+            epochs['def:' + split_key_value(split_args(args)[0])[0]] += 1
+        elif name == 'flag':
+            parts = split_args(args)
+            if len(parts) >= 2:
+                piece = path_parts(split_key_value(parts[1])[0])[0]
+                epochs['flag:*' if '<' in piece else 'flag:' + piece] += 1
+                # Keys built at runtime may be any flag
+                epochs['flag:any'] += 1
+        elif name in LOOP_COMMANDS:
+            for definition in LOOP_DEFINITIONS:
+                epochs['def:' + definition] += 1
+            if ' as:' in args:
+                epochs['def:' + args.split(' as:', 1)[1].split()[0]] += 1
+        # save:name also replaces what <entry[name]> returns
+        if name in MUTATING_COMMANDS or ' save:' in args:
+            epochs['world'] += 1
+
+    def walk(self, nodes, mult, file, script, env, stack, scope, path, handler):
+        for node in nodes:
+            if node.kind != 'command':
+                continue
+            name = node.name
+            args = node.args.rstrip(':').strip()
+
+            # Tags on the line are evaluated before the command changes anything
+            for tag in self.tags(file, node):
+                self.record(tag, None, node, file, script, mult, scope, path)
+
+            if name == 'define':
+                self.track_define(args, env)
+            self.invalidate(name, args, scope)
+
+            if node.children:
+                child_mult = mult
+                child_path = path + (id(node),) if name in BRANCH_COMMANDS else path
+                if name in LOOP_COMMANDS:
+                    child_mult = poly_mul(mult, self.loop_multiplier(name, args, env, script))
+                self.walk(node.children, child_mult, file, script, env, stack, scope, child_path, handler)
+
+            if name in ('run', 'inject') and args:
+                target = args.split()[0]
+                body, target_name = self.script_body(target)
+                if body is None:
+                    if target_name:
+                        self.assumptions[script].add(f"{name} {target} not resolved")
+                    continue
+                if target_name in stack:
+                    continue
+                target_file = self.definitions.lookup(target_name)['file']
+                if name == 'inject':
+                    self.walk(body.children, mult, target_file, target_name, env,
+                              stack + (target_name,), scope, path, handler)
+                else:
+                    queue = self.new_scope(target_name)
+                    self.walk(body.children, mult, target_file, target_name, {},
+                              stack + (target_name,), queue, (), handler)
+                    self.close_scope(queue, handler)
+
+    def close_scope(self, scope, handler):
+        """Group a finished queue's lookups and merge the groups into the findings"""
+        lookups = scope['lookups']
+        counts = Counter(key_id for lookup in lookups for key_id in lookup['ids'])
+        groups = defaultdict(list)
+        for i, lookup in enumerate(lookups):
+            # The shared lookup saving the most in this queue; the longer one on a tie
+            shared = [((counts[key_id] - 1) * key[2] - counts[key_id] * key[4], -choice)
+                      for choice, (key, key_id) in enumerate(zip(lookup['keys'], lookup['ids']))
+                      if counts[key_id] > 1]
+            if shared:
+                lookup['choice'] = -max(shared)[1]
+                groups[lookup['ids'][lookup['choice']]].append(i)
+
+        chains = []
+        for key_id, members in groups.items():
+            chain = self.best_chain(members, lookups)
+            if len(chain) > 1:
+                chains.append(chain)
+        # A repeat nested in a hoisted repeat goes away with it
+        hoisted = {i for chain in chains if all(lookups[i]['choice'] == 0 for i in chain) for i in chain}
+
+        for chain in chains:
+            if all(lookups[i]['parent'] in hoisted for i in chain):
+                continue
+            members = [lookups[i] for i in chain]
+            first = members[0]
+            text, _rest, cost, hint, _added = first['keys'][first['choice']]
+            sites = tuple((m['file'], m['line']) for m in members)
+            finding = self.findings.get((text, sites))
+            if finding is None:
+                finding = self.findings[(text, sites)] = {
+                    'file': first['file'],
+                    'line': first['line'],
+                    'script': scope['script'],
+                    'lookup': f"<{text}>",
+                    'kind': 'identical' if all(not m['keys'][m['choice']][1] for m in members) else 'prefix',
+                    'repeats': len(members),
+                    'cost': cost,
+                    'define': f"- define {define_name(text, hint)} <{text}>",
+                    'uses': [self.use(m, define_name(text, hint)) for m in members],
+                    'runs': [0],
+                    'saved': [0],
+                    'handlers': set(),
+                }
+            # The define runs once, where the least frequent repeat does
+            rates = [m['rate'] for m in members]
+            runs = min(rates, key=lambda r: poly_eval(r, PLAYER_COUNTS[2]))
+            poly_add_into(finding['runs'], runs)
+            # Each use saves the shared part but pays for any deep_get it adds
+            for m in members:
+                poly_add_into(finding['saved'], m['rate'], cost - m['keys'][m['choice']][4])
+            poly_add_into(finding['saved'], runs, -cost)
+            finding['handlers'].add(handler)
+
+    @staticmethod
+    def best_chain(members, lookups):
+        """Largest set of members that all run together: branch paths nested in one another"""
+        best = []
+        for m in members:
+            path = lookups[m]['path']
+            chain = [i for i in members if path[:len(lookups[i]['path'])] == lookups[i]['path']]
+            if len(chain) > len(best):
+                best = chain
+        return best
+
+    @staticmethod
+    def use(lookup, name):
+        tag = lookup['tag']
+        rest = lookup['keys'][lookup['choice']][1]
+        replacement = f"<[{name}]" + (f".{rest}" if rest else '')
+        if tag.fallback is not None:
+            replacement += f"||{tag.fallback}"
+        return {'file': lookup['file'], 'line': lookup['line'], 'tag': tag.text,
+                'replacement': replacement + '>'}
+
+    def report(self):
+        handlers = 0
+        for event in self.data['events']:
+            frequency = self.frequency(event['event'])
+            if frequency is None:
+                continue
+            handlers += 1
+            self.walk_handler(event, frequency)
+
+        findings = []
+        scripts = defaultdict(lambda: [0])
+        for finding in self.findings.values():
+            projection = {p: {'runs': poly_eval(finding['runs'], p), 'saved': poly_eval(finding['saved'], p)}
+                          for p in PLAYER_COUNTS}
+            if projection[PLAYER_COUNTS[-1]]['saved'] <= 0:
+                continue
+            findings.append(dict(finding, handlers=sorted(finding['handlers']), projection=projection))
+            poly_add_into(scripts[finding['script']], finding['saved'])
+        findings.sort(key=lambda f: (-f['projection'][200]['saved'], f['file'], f['line'], f['lookup']))
+
+        return {
+            'player_counts': list(PLAYER_COUNTS),
+            'click_rate': self.click_rate,
+            'handlers': handlers,
+            'findings': findings,
+            'scripts': sorted(({'script': name, 'saved': saved,
+                                'projection': {p: poly_eval(saved, p) for p in PLAYER_COUNTS}}
+                               for name, saved in scripts.items()),
+                              key=lambda s: (-s['projection'][200], s['script'])),
+            'assumptions': {k: sorted(v) for k, v in sorted(self.assumptions.items())},
+        }
+
+def generate_markdown(report):
+    total = sum(f['projection'][200]['saved'] for f in report['findings'])
+    lines = [
+        "# Hoistable Lookups",
+        "",
+        "**Purpose:** Tag lookups a queue evaluates more than once, and the define that would evaluate them once.",
+        "",
+        f"Covers {report['handlers']} timer, movement and right-click handlers "
+        f"(right clicks at {report['click_rate']:g}/player/s) and the tasks they run or inject.",
+        "Savings count the attribute lookups and nested tags of the shared part, per repeat after the first,",
+        "less the deep_get a prefix use adds; reading the definition back is treated as free. Lookups under an if and its else are never counted",
+        "together, and a define, flag write or world-changing command between two lookups keeps them apart.",
+        "",
+        f"At 200 players: **{total:,.0f} evaluations/s** could be saved across {len(report['findings'])} findings.",
+        "",
+        "---",
+        "",
+        "## Findings by Evaluations Saved (200 players)",
+        "",
+        "| Location | Script | Lookup | Kind | Repeats | Saved/s @50 | Saved/s @200 |",
+        "|----------|--------|--------|------|---------|-------------|--------------|",
+    ]
+    for f in report['findings'][:40]:
+        p = f['projection']
+        lookup = f['lookup'][:70].replace('|', '\\|')
+        lines.append(f"| [{f['file']}:{f['line']}]({f['file']}#L{f['line']}) | `{f['script']}` | `{lookup}` | "
+                     f"{f['kind']} | {f['repeats']} | {p[50]['saved']:,.0f} | {p[200]['saved']:,.0f} |")
+
+    lines.extend([
+        "",
+        "---",
+        "",
+        "## Scripts",
+        "",
+        "| Script | Saved/s @200 |",
+        "|--------|--------------|",
+    ])
+    for s in report['scripts'][:25]:
+        lines.append(f"| `{s['script']}` | {s['projection'][200]:,.0f} |")
+
+    lines.extend(["", "---", "", "## Suggested Defines", ""])
+    for f in report['findings'][:15]:
+        lines.append(f"### `{f['script']}` ([{f['file']}:{f['line']}]({f['file']}#L{f['line']}))")
+        lines.append("")
+        lines.append(f"{f['repeats']} {f['kind']} lookups, "
+                     f"{f['projection'][200]['saved']:,.0f} evaluations/s saved at 200 players. Before line {f['line']}:")
+        lines.append("")
+        lines.append("```")
+        lines.append(f['define'])
+        lines.append("```")
+        lines.append("")
+        lines.append("| Line | Tag | Becomes |")
+        lines.append("|------|-----|---------|")
+        for use in f['uses']:
+            tag = use['tag'].replace('|', '\\|')
+            replacement = use['replacement'].replace('|', '\\|')
+            lines.append(f"| {use['file']}:{use['line']} | `{tag}` | `{replacement}` |")
+        lines.append("")
+
+    if report['assumptions']:
+        lines.extend(["---", "", "## Assumptions", ""])
+        for script, notes in report['assumptions'].items():
+            lines.append(f"- `{script}`: " + "; ".join(notes))
+        lines.append("")
+
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find repeated tag lookups worth hoisting into a define")
+    parser.add_argument('--click-rate', type=float, default=CLICK_RATE,
+                        help=f"right clicks per player per second (default {CLICK_RATE:g})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    data = load_analysis(compact=True)
+    report = HoistLookups(data, click_rate=args.click_rate).report()
+
+    with open('docs/hoist_lookups.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    with open('docs/HOIST_LOOKUPS.md', 'w') as f:
+        f.write(generate_markdown(report))
+
+    print(f"✓ Found {len(report['findings'])} repeated lookups in {report['handlers']} handlers")
+    for f in report['findings'][:5]:
+        print(f"  {f['file']}:{f['line']} {f['lookup'][:60]} x{f['repeats']}: "
+              f"{f['projection'][200]['saved']:,.0f} evaluations/s saved at 200 players")
+    print("✓ Generated docs/HOIST_LOOKUPS.md and docs/hoist_lookups.json")
+
+if __name__ == "__main__":
+    main()
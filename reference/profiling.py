@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Per-stage instrumentation for the analysis tools
+Records wall/CPU time, tracemalloc peaks and record counts per stage, per-file
+parse times, and optional cProfile dumps of the hot loop
+"""
+
+import io
+import json
+import time
+import pstats
+import cProfile
+import platform
+import tracemalloc
+import contextlib
+from pathlib import Path
+
+SLOWEST_FILES = 10
+HOT_FUNCTIONS = 15
+
+class Profiler:
+    """Collects a JSON trace for one tool run
+
+    Stages are timed with `with profiler.stage('parse') as stage:` and may
+    attach counts via stage['counts']. Stages must not nest, since each one
+    resets the tracemalloc peak.
+    """
+
+    def __init__(self, tool, memory=True, cprofile=None):
+        self.tool = tool
+        self.memory = memory
+        self.cprofile_path = cprofile
+        self.stages = []
+        self.files = []
+        self.hot_loop = None
+        self.started = time.perf_counter()
+        self.owns_tracing = memory and not tracemalloc.is_tracing()
+        if self.owns_tracing:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        entry = {'name': name, 'counts': {}}
+        if self.memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield entry
+        finally:
+            entry['wall_s'] = time.perf_counter() - wall
+            entry['cpu_s'] = time.process_time() - cpu
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                entry['peak_kib'] = (peak - before) / 1024
+                entry['retained_kib'] = (current - before) / 1024
+            self.stages.append(entry)
+
+    def file(self, rel_path, seconds, records):
+        """Parse time and record count for one file"""
+        self.files.append({'file': rel_path, 'seconds': seconds, 'records': records})
+
+    @contextlib.contextmanager
+    def hot(self, name):
+        """Run the block under cProfile when a dump path was given"""
+        if not self.cprofile_path:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            Path(self.cprofile_path).parent.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(self.cprofile_path)
+            self.hot_loop = {'stage': name, 'dump': str(self.cprofile_path)}
+
+    def close(self):
+        if self.owns_tracing:
+            tracemalloc.stop()
+            self.owns_tracing = False
+
+    def report(self):
+        files = sorted(self.files, key=lambda f: -f['seconds'])
+        total = sum(f['seconds'] for f in files)
+        return {
+            'tool': self.tool,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'wall_s': time.perf_counter() - self.started,
+            'stages': self.stages,
+            'files': {
+                'count': len(files),
+                'parse_s': total,
+                'slowest': files[:SLOWEST_FILES],
+                'all': files,
+            },
+            'cprofile': self.hot_loop,
+        }
+
+    def save(self, path):
+        report = self.report()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def summary(self, report=None):
+        report = report or self.report()
+        lines = ["", "⏱️  PROFILE", "-" * 70]
+        for s in report['stages']:
+            line = f"  {s['name']:<18} {s['wall_s'] * 1000:>10,.1f} ms wall {s['cpu_s'] * 1000:>10,.1f} ms cpu"
+            if 'peak_kib' in s:
+                line += f" {s['peak_kib'] / 1024:>8,.1f} MiB peak"
+            if s['counts']:
+                line += "  " + ", ".join(f"{k}={v:,}" for k, v in s['counts'].items())
+            lines.append(line)
+
+        files = report['files']
+        if files['count']:
+            lines.append("")
+            lines.append(f"  Slowest files ({files['count']} parsed in {files['parse_s'] * 1000:,.0f} ms):")
+            for f in files['slowest']:
+                share = f['seconds'] / files['parse_s'] * 100 if files['parse_s'] else 0
+                lines.append(f"    {f['seconds'] * 1000:>8,.1f} ms {share:5.1f}%  {f['file']} ({f['records']:,} records)")
+
+        if report['cprofile']:
+            lines.append("")
+            lines.append(f"  cProfile of {report['cprofile']['stage']} saved to {report['cprofile']['dump']}")
+            stream = io.StringIO()
+            stats = pstats.Stats(report['cprofile']['dump'], stream=stream)
+            stats.sort_stats('tottime').print_stats(HOT_FUNCTIONS)
+            lines.extend("    " + line for line in stream.getvalue().splitlines() if line.strip())
+        return "\n".join(lines)
+
+def add_profile_arguments(parser, default_path):
+    """--profile [PATH] and --cprofile PATH, shared by the analysis CLIs"""
+    parser.add_argument('--profile', metavar='PATH', nargs='?', const=default_path,
+                        help=f"write a per-stage timing/memory trace (default {default_path})")
+    parser.add_argument('--cprofile', metavar='PATH',
+                        help="dump cProfile stats for the hot loop (implies --profile)")
+
+def profiler_for(args, tool, default_path):
+    """Profiler for parsed CLI args, or None when profiling is off"""
+    if args.cprofile and not args.profile:
+        args.profile = default_path
+    if not args.profile:
+        return None
+    return Profiler(tool, cprofile=args.cprofile)
+
+def stage(profiler, name):
+    """profiler.stage(name), or a no-op when profiler is None"""
+    if profiler is None:
+        return contextlib.nullcontext({'counts': {}})
+    return profiler.stage(name)
+
+def hot(profiler, name):
+    """profiler.hot(name), or a no-op when profiler is None"""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.hot(name)
+
+def finish(profiler, args):
+    """Save the trace and print the summary"""
+    if profiler is None:
+        return
+    profiler.close()
+    report = profiler.save(args.profile)
+    print(profiler.summary(report))
+    print(f"✓ Saved profile to {args.profile}")
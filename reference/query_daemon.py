@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Long-running query daemon over the analysis records
+Loads every file's records once, keeps them fresh from inotify events, and
+answers key, definition, caller and event lookups over a Unix socket or
+localhost HTTP
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+from analyze_denizen import (DenizenAnalyzer, AnalysisCache, CACHE_FILE, key_access,
+                             parse_file_compact)
+from analysis_db import QUERY_KINDS
+from file_inventory import (FileInventory, DEFAULT_INCLUDE, DISABLED_INCLUDE, glob_match,
+                            add_inventory_arguments)
+from watch_sync import (Inotify, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE,
+                        IN_DELETE_SELF, IN_MOVE_SELF, IN_ISDIR)
+
+SOCKET_FILE = "docs/query.sock"
+HTTP_HOST = "127.0.0.1"
+# Bursts of saves are coalesced as in watch_sync.py
+DEBOUNCE = 0.02
+MAX_DELAY = 0.08
+# Re-scan interval where inotify is not available
+POLL_INTERVAL = 1.0
+MAX_REQUEST = 64 * 1024
+
+class QueryIndex:
+    """Every file's records, indexed for the lookups `analysis_db.py query` runs
+
+    Each map is name -> {file: [(position, row)]}, so replacing one file's
+    records only touches the names that file mentions. Rows and their order
+    match the SQLite queries: (path, line, ...) by path and line, then by
+    name (the key index order) and record order.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.maps = {kind: defaultdict(dict) for kind in QUERY_KINDS}
+        self.records = 0
+        self.generation = 0
+
+    @staticmethod
+    def entries(result):
+        """(kind, name, position, row) for every lookup one file's compact result answers"""
+        rel, events, data_keys, calls, scripts = result
+        for i, (line, event_type, event, _indent) in enumerate(events):
+            yield 'events', event, i, (rel, line, event_type, event)
+        for i, (line, key, _scope, key_type, context) in enumerate(data_keys):
+            access = key_access({'key': key, 'type': key_type, 'context': context})
+            yield 'writers' if access == 'write' else 'readers', key, i, (rel, line, key, context)
+        for i, (line, call_type, target, context) in enumerate(calls):
+            yield 'callers', target, i, (rel, line, call_type, context)
+        for i, (line, name, script_type, end_line) in enumerate(scripts):
+            yield 'definition', name.lower(), i, (rel, line, end_line, script_type, name)
+
+    def replace(self, rel, result):
+        """Swap in a file's records; result None drops the file"""
+        old = self.files.pop(rel, None)
+        if old is not None:
+            for kind, name, _position, _row in self.entries(old):
+                by_file = self.maps[kind].get(name)
+                if by_file is None:
+                    continue
+                rows = by_file.pop(rel, None)
+                if rows is not None:
+                    self.records -= len(rows)
+                    if not by_file:
+                        del self.maps[kind][name]
+        if result is not None:
+            self.files[rel] = result
+            for kind, name, position, row in self.entries(result):
+                self.maps[kind][name].setdefault(rel, []).append((position, row))
+                self.records += 1
+        self.generation += 1
+
+    def query(self, kind, name):
+        """Rows for one lookup; key names ending in '*' match by literal prefix"""
+        names = self.maps[kind]
+        if kind == 'definition':
+            name = name.lower()
+        if kind in ('readers', 'writers') and name.endswith('*'):
+            prefix = name[:-1]
+            matched = [n for n in names if n.startswith(prefix)]
+        else:
+            matched = [name]
+        found = [(row[0], row[1], n, position, row) for n in matched
+                 for rows in names.get(n, {}).values() for position, row in rows]
+        found.sort(key=lambda entry: entry[:4])
+        return [entry[4] for entry in found]
+
+class QueryDaemon:
+    """Serves a QueryIndex and re-parses scripts as they change
+
+    Startup goes through the incremental cache like `--incremental`. After
+    that, inotify events (or a stat poll where inotify is missing) are
+    debounced, and only the changed files are re-parsed and swapped into the
+    index. Queries are answered from memory on the event loop, so a lookup
+    never waits on disk.
+    """
+
+    def __init__(self, root_dir=".", cache_file=CACHE_FILE, jobs=1, include=None, exclude=(),
+                 disabled=False, debounce=DEBOUNCE, max_delay=MAX_DELAY, poll=POLL_INTERVAL):
+        # Absolute, so inotify paths and relative keys always line up
+        self.root_dir = Path(root_dir).resolve()
+        self.cache = AnalysisCache(cache_file)
+        self.jobs = jobs
+        self.include = tuple(include or DEFAULT_INCLUDE) + (DISABLED_INCLUDE if disabled else ())
+        self.exclude = tuple(exclude)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll = poll
+        self.index = QueryIndex()
+        self.inotify = None
+        self.pending = {}
+        self.first_event = None
+        self.flush_handle = None
+        self.started = time.time()
+        self.updated = None
+        self.queries = 0
+
+    def load(self):
+        analyzer = DenizenAnalyzer(self.root_dir, include=self.include, exclude=self.exclude)
+        results = analyzer.collect_incremental(analyzer.find_dsc_files(), self.jobs, self.cache)
+        for rel, result in results.items():
+            self.index.replace(rel, result)
+        self.cache.save()
+        self.updated = time.time()
+        print(f"✓ Indexed {self.index.records:,} records from {len(self.index.files)} files")
+
+    def wanted(self, rel):
+        """Whether a path relative to the root is a script the inventory would include"""
+        parts = rel.split('/')
+        for i in range(1, len(parts) + 1):
+            if self.exclude and glob_match('/'.join(parts[:i]), parts[i - 1], self.exclude):
+                return False
+        return glob_match(rel, parts[-1], self.include)
+
+    def refresh(self, changes):
+        """Re-parse changed scripts and drop deleted ones: {path: 'changed'|'deleted'|'deleted_dir'}"""
+        started = time.perf_counter()
+        parsed = 0
+        for path, change in sorted(changes.items()):
+            try:
+                rel = path.relative_to(self.root_dir).as_posix()
+            except ValueError:
+                continue
+            if change == 'deleted_dir':
+                for gone in [r for r in self.index.files if r.startswith(rel + '/')]:
+                    self.index.replace(gone, None)
+                    self.cache.discard(gone)
+                continue
+            if not self.wanted(rel):
+                continue
+            result = None
+            if change == 'changed' and path.is_file():
+                try:
+                    result = self.cache.lookup(path, rel)
+                    if result is None:
+                        result = parse_file_compact(str(self.root_dir), str(path))
+                        self.cache.store(result)
+                        parsed += 1
+                except FileNotFoundError:
+                    result = None
+            if result is None:
+                self.cache.discard(rel)
+            self.index.replace(rel, result)
+        self.updated = time.time()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"↻ Re-indexed {len(changes)} path(s), {parsed} parsed, in {elapsed:.0f} ms")
+
+    def rescan(self):
+        """Changes between the index and a fresh inventory walk"""
+        inventory = FileInventory.scan(self.root_dir, self.include, self.exclude)
+        changes = {entry.path: 'changed' for entry in inventory}
+        for rel in self.index.files:
+            if rel not in inventory.by_rel:
+                changes[self.root_dir / rel] = 'deleted'
+        return changes
+
+    def answer(self, request):
+        """Response for one decoded request"""
+        kind = request.get('kind')
+        if kind == 'status':
+            return self.status()
+        name = request.get('name')
+        if kind not in QUERY_KINDS or not isinstance(name, str) or not name:
+            return {'ok': False, 'error': f"expected kind in {', '.join(QUERY_KINDS)} and a name"}
+        started = time.perf_counter()
+        rows = self.index.query(kind, name)
+        self.queries += 1
+        return {'ok': True, 'kind': kind, 'name': name, 'rows': rows,
+                'ms': (time.perf_counter() - started) * 1000, 'generation': self.index.generation}
+
+    def status(self):
+        return {
+            'ok': True,
+            'root': str(self.root_dir),
+            'files': len(self.index.files),
+            'records': self.index.records,
+            'generation': self.index.generation,
+            'queries': self.queries,
+            'watching': 'inotify' if self.inotify is not None else f"poll every {self.poll:g}s",
+            'started': self.started,
+            'updated': self.updated,
+            'pending': len(self.pending),
+        }
+
+    async def handle_socket(self, reader, writer):
+        """Newline-delimited JSON: one request object per line, one response per line"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    response = self.answer(request) if isinstance(request, dict) else \
+                        {'ok': False, 'error': "request must be a JSON object"}
+                except ValueError as e:
+                    response = {'ok': False, 'error': f"bad JSON: {e}"}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_http(self, reader, writer):
+        """GET /query?kind=...&name=... and GET /status, one request per connection"""
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            status, body = '400 Bad Request', {'ok': False, 'error': "bad request"}
+            if len(parts) == 3:
+                method, target, _version = parts
+                url = urlsplit(target)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if method != 'GET':
+                    status, body = '405 Method Not Allowed', {'ok': False, 'error': "GET only"}
+                elif url.path == '/status':
+                    status, body = '200 OK', self.status()
+                elif url.path == '/query':
+                    body = self.answer(params)
+                    status = '200 OK' if body['ok'] else '400 Bad Request'
+                else:
+                    status, body = '404 Not Found', {'ok': False, 'error': "use /query or /status"}
+            payload = json.dumps(body).encode()
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def watch(self, loop):
+        """Subscribe to inotify on the root; False when it is not available"""
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError):
+            return False
+        self.inotify.add_tree(self.root_dir)
+        loop.add_reader(self.inotify.fd, self.collect, loop)
+        return True
+
+    def collect(self, loop):
+        """Coalesce queued inotify events into pending path -> change, as WatchSync does"""
+        for mask, path in self.inotify.read():
+            if path is None:
+                print("⚠️  inotify queue overflowed; re-scanning")
+                self.pending.update(self.rescan())
+            elif mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    for path_in_dir in self.inotify.add_tree(path):
+                        self.pending[path_in_dir] = 'changed'
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.pending[path] = 'deleted_dir'
+                continue
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                continue
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.pending[path] = 'deleted'
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self.pending[path] = 'changed'
+            else:
+                continue
+        if self.pending:
+            self.schedule(loop)
+
+    def schedule(self, loop):
+        now = loop.time()
+        if self.first_event is None:
+            self.first_event = now
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        due = min(now + self.debounce, self.first_event + self.max_delay)
+        self.flush_handle = loop.call_later(max(0.0, due - now), self.flush)
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        self.first_event = None
+        self.flush_handle = None
+        if pending:
+            self.refresh(pending)
+
+    async def poll_changes(self):
+        """Stat-based fallback: re-walk the root and refresh what moved"""
+        stamps = {}
+        for entry in FileInventory.scan(self.root_dir, self.include, self.exclude):
+            stamps[entry.rel] = (entry.size, entry.mtime)
+        while True:
+            await asyncio.sleep(self.poll)
+            inventory = FileInventory.scan(self.root_dir, self.include, self.exclude)
+            current = {entry.rel: (entry.size, entry.mtime) for entry in inventory}
+            changes = {self.root_dir / rel: 'changed' for rel, stamp in current.items()
+                       if stamps.get(rel) != stamp}
+            changes.update({self.root_dir / rel: 'deleted' for rel in stamps if rel not in current})
+            stamps = current
+            if changes:
+                self.refresh(changes)
+
+    async def serve(self, socket_path=None, port=None):
+        loop = asyncio.get_running_loop()
+        servers = []
+        if socket_path:
+            claim_socket(socket_path)
+            servers.append(await asyncio.start_unix_server(self.handle_socket, path=socket_path,
+                                                           limit=MAX_REQUEST))
+            print(f"👂 Listening on {socket_path}")
+        if port is not None:
+            servers.append(await asyncio.start_server(self.handle_http, HTTP_HOST, port, limit=MAX_REQUEST))
+            print(f"👂 Listening on http://{HTTP_HOST}:{port}/")
+
+        poller = None
+        if self.watch(loop):
+            print(f"👀 Watching {self.root_dir} with inotify")
+        else:
+            print(f"👀 inotify not available; polling {self.root_dir} every {self.poll:g}s")
+            poller = asyncio.ensure_future(self.poll_changes())
+
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        print("   Press Ctrl+C to stop")
+        try:
+            await stop.wait()
+        finally:
+            for server in servers:
+                server.close()
+                await server.wait_closed()
+            if poller is not None:
+                poller.cancel()
+            if self.inotify is not None:
+                loop.remove_reader(self.inotify.fd)
+                self.inotify.close()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.cache.save()
+            print("\n👋 Stopped query daemon")
+
+def claim_socket(socket_path):
+    """Remove a stale socket file; refuse to start over a live daemon"""
+    if not os.path.exists(socket_path):
+        Path(socket_path).parent.mkdir(parents=True, exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise SystemExit(f"❌ A query daemon is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+def request(payload, socket_path=SOCKET_FILE, port=None, timeout=5.0):
+    """Send one request to a running daemon and return the decoded response"""
+    if port is not None:
+        path = '/status' if payload.get('kind') == 'status' else '/query?' + urlencode(payload)
+        try:
+            with urllib.request.urlopen(f"http://{HTTP_HOST}:{port}{path}", timeout=timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            return json.load(e)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        conn.sendall(json.dumps(payload).encode() + b'\n')
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+def add_endpoint_arguments(parser):
+    parser.add_argument('--socket', default=SOCKET_FILE, help=f"Unix socket path (default {SOCKET_FILE})")
+    parser.add_argument('--http', type=int, metavar='PORT',
+                        help=f"use localhost HTTP on PORT ({HTTP_HOST} only)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve (or query) the analysis records from a long-running daemon")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help="load the analysis once and answer lookups until stopped")
+    add_endpoint_arguments(serve)
+    serve.add_argument('--no-socket', action='store_true', help="only listen on --http")
+    serve.add_argument('--jobs', '-j', type=int, default=1,
+                       help="parse files across N worker processes at startup (0 = one per CPU)")
+    serve.add_argument('--cache-file', default=CACHE_FILE, help="location of the incremental cache")
+    serve.add_argument('--debounce', type=float, default=DEBOUNCE * 1000,
+                       help="quiet period in ms before a burst of saves is re-indexed")
+    serve.add_argument('--max-delay', type=float, default=MAX_DELAY * 1000,
+                       help="re-index at most this many ms after the first change of a burst")
+    serve.add_argument('--poll', type=float, default=POLL_INTERVAL,
+                       help=f"re-scan interval in seconds without inotify (default {POLL_INTERVAL:g})")
+    add_inventory_arguments(serve)
+
+    q = sub.add_parser('query', help="look up key readers/writers, script callers/definitions or event handlers")
+    q.add_argument('kind', choices=QUERY_KINDS)
+    q.add_argument('name', help="key, script or event name (keys accept a trailing '*' for a prefix)")
+    add_endpoint_arguments(q)
+
+    status = sub.add_parser('status', help="show what a running daemon has indexed")
+    add_endpoint_arguments(status)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve' and args.no_socket and args.http is None:
+        parser.error("--no-socket needs --http")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == 'serve':
+        socket_path = None if args.no_socket or not hasattr(socket, 'AF_UNIX') else args.socket
+        if socket_path is None and args.http is None:
+            print("❌ Unix sockets are not available here; pass --http PORT")
+            return 1
+        daemon = QueryDaemon(".", cache_file=args.cache_file, jobs=args.jobs or os.cpu_count() or 1,
+                             include=args.include, exclude=args.exclude, disabled=args.disabled,
+                             debounce=args.debounce / 1000, max_delay=args.max_delay / 1000, poll=args.poll)
+        daemon.load()
+        asyncio.run(daemon.serve(socket_path, args.http))
+        return 0
+
+    payload = {'kind': 'status'} if args.command == 'status' else {'kind': args.kind, 'name': args.name}
+    start = time.perf_counter()
+    try:
+        response = request(payload, args.socket, args.http)
+    except (OSError, ValueError) as e:
+        where = f"http://{HTTP_HOST}:{args.http}/" if args.http is not None else args.socket
+        print(f"❌ No query daemon at {where} ({e}) - start one with `query_daemon.py serve`")
+        return 1
+    elapsed = (time.perf_counter() - start) * 1000
+    if not response.get('ok'):
+        print(f"❌ {response.get('error')}")
+        return 1
+
+    if args.command == 'status':
+        for field, value in response.items():
+            if field != 'ok':
+                print(f"{field}: {value}")
+        return 0
+    for path, line, *rest in response['rows']:
+        print(f"{path}:{line}  " + "  ".join(str(r) for r in rest))
+    print(f"-- {len(response['rows'])} {args.kind} of {args.name} "
+          f"({response['ms']:.2f} ms in daemon, {elapsed:.1f} ms round trip)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
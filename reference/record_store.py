@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Compact columnar storage for analysis records
+Every string (paths, keys, targets, context lines) is interned once
+"""
+
+from array import array
+from collections.abc import Mapping
+
+# Field layouts per record kind: 'str' fields are stored as interned string ids,
+# 'int' fields directly. Both live in 32-bit array columns.
+EVENT_FIELDS = (('file', 'str'), ('line', 'int'), ('type', 'str'), ('event', 'str'), ('indent', 'int'))
+DATA_KEY_FIELDS = (('file', 'str'), ('line', 'int'), ('key', 'str'), ('scope', 'str'),
+                   ('type', 'str'), ('context', 'str'))
+CALL_FIELDS = (('file', 'str'), ('line', 'int'), ('type', 'str'), ('target', 'str'), ('context', 'str'))
+SCRIPT_FIELDS = (('file', 'str'), ('line', 'int'), ('name', 'str'), ('type', 'str'), ('end_line', 'int'))
+
+RECORD_LISTS = ('events', 'data_keys', 'calls', 'scripts')
+
+class StringTable:
+    """Maps strings to small integer ids and back"""
+    __slots__ = ('ids', 'strings')
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+    def __len__(self):
+        return len(self.strings)
+
+class Record(Mapping):
+    """Read-only dict-like view of one row in a RecordView"""
+    __slots__ = ('view', 'index')
+
+    def __init__(self, view, index):
+        self.view = view
+        self.index = index
+
+    def __getitem__(self, field):
+        try:
+            getter = self.view.getters[field]
+        except KeyError:
+            raise KeyError(field) from None
+        return getter(self.index)
+
+    def __iter__(self):
+        return iter(self.view.fields)
+
+    def __len__(self):
+        return len(self.view.fields)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class RecordView:
+    """One record kind stored as parallel integer arrays
+
+    Behaves like the list of dicts it replaces: len(), iteration, indexing,
+    slicing and append() of a mapping all work.
+    """
+    __slots__ = ('store', 'fields', 'columns', 'getters', 'stored', 'file_column')
+
+    def __init__(self, store, layout):
+        self.store = store
+        self.fields = tuple(name for name, _ in layout)
+        self.columns = {name: array('i') for name, _ in layout}
+        self.file_column = self.columns['file']
+        self.stored = [(name, self.columns[name], kind == 'str') for name, kind in layout]
+        self.getters = {}
+        for name, kind in layout:
+            self.getters[name] = self.make_getter(name, kind)
+
+    def make_getter(self, name, kind):
+        column = self.columns[name]
+        if kind == 'str':
+            strings = self.store.strings.strings
+            return lambda i: strings[column[i]]
+        return column.__getitem__
+
+    def append(self, record):
+        intern = self.store.strings.intern
+        for name, column, interned in self.stored:
+            value = record[name]
+            column.append(intern(value) if interned else value)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self.file_column)
+
+    def __iter__(self):
+        for i in range(len(self.file_column)):
+            yield Record(self, i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Record(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return Record(self, index)
+
+    def to_dicts(self):
+        return [dict(record) for record in self]
+
+class RecordStore:
+    """Events, data keys, calls and script definitions sharing one string table
+
+    Indexing by name mirrors the analysis.json layout, so code written against
+    data['events'] / data['data_keys'] / data['calls'] runs unchanged.
+    """
+    __slots__ = ('strings', 'events', 'data_keys', 'calls', 'scripts')
+
+    def __init__(self):
+        self.strings = StringTable()
+        self.events = RecordView(self, EVENT_FIELDS)
+        self.data_keys = RecordView(self, DATA_KEY_FIELDS)
+        self.calls = RecordView(self, CALL_FIELDS)
+        self.scripts = RecordView(self, SCRIPT_FIELDS)
+
+    def __getitem__(self, name):
+        if name not in RECORD_LISTS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __contains__(self, name):
+        return name in RECORD_LISTS
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def to_dicts(self):
+        """Plain analysis.json layout, for json.dump"""
+        return {name: self[name].to_dicts() for name in RECORD_LISTS}
+
+    @classmethod
+    def from_analysis(cls, data):
+        store = cls()
+        for name in RECORD_LISTS:
+            store[name].extend(data.get(name, []))
+        return store
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Run the analysis pipeline in one process
+walk -> parse -> save -> index -> warnings -> docs share one record store and
+tree cache instead of round-tripping through docs/analysis.json; the JSON
+artifacts are still written for the standalone tools
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from analyze_denizen import (DenizenAnalyzer, AnalysisCache, CACHE_FILE, RECORDS_FILE,
+                             RECORD_KINDS, load_analysis)
+from analyze_warnings import find_warnings, generate_summary
+from analysis_index import AnalysisIndex
+from dsc_tree import TreeCache
+from file_inventory import INVENTORY_FILE, add_inventory_arguments
+import generate_docs
+from profiling import add_profile_arguments, profiler_for, stage, hot, finish
+
+PROFILE_FILE = "docs/profile_pipeline.json"
+
+STAGES = ('walk', 'parse', 'save', 'index', 'warnings', 'docs')
+# Stages that cannot run without the output of another in the same process
+REQUIRES = {'parse': 'walk', 'docs': 'index'}
+
+DOC_GENERATORS = (
+    generate_docs.generate_system_map,
+    generate_docs.generate_data_keys,
+    generate_docs.generate_event_index,
+    generate_docs.generate_call_graph,
+)
+
+def resolve_stages(names):
+    """Selected stages plus their prerequisites, in pipeline order"""
+    selected = set(STAGES if not names or 'all' in names else names)
+    for name in list(selected):
+        while name in REQUIRES:
+            name = REQUIRES[name]
+            selected.add(name)
+    return [name for name in STAGES if name in selected]
+
+class Pipeline:
+    """Shared state for one pipeline run
+
+    The walk's FileInventory supplies the subsystems, the analyzer's
+    RecordStore is handed straight to the warnings pass and the doc index,
+    and the TreeCache filled while parsing is reused by the wait-loop
+    checks. A stage whose input was not produced in this run
+    falls back to the artifacts on disk.
+    """
+
+    def __init__(self, root_dir=".", jobs=1, cache=None, output_format='both', profiler=None,
+                 include=None, exclude=(), disabled=False):
+        self.root_dir = root_dir
+        self.jobs = jobs
+        self.cache = cache
+        self.output_format = output_format
+        self.profiler = profiler
+        self.trees = TreeCache(root_dir)
+        self.analyzer = DenizenAnalyzer(root_dir, compact=True, trees=self.trees, include=include,
+                                        exclude=exclude, disabled=disabled)
+        self.analyzer.profiler = profiler
+        self.files = None
+        self.data = None
+        self.index = None
+        self.warnings = None
+
+    def run(self, stages):
+        if 'parse' in stages and 'save' in stages and self.output_format in ('both', 'jsonl'):
+            # Stream while parsing so the JSONL file matches analyze_denizen.py byte for byte
+            self.analyzer.open_stream(RECORDS_FILE)
+        for name in stages:
+            with stage(self.profiler, name) as entry:
+                getattr(self, f"run_{name}")(entry['counts'])
+
+    def records(self):
+        if self.data is None:
+            print(f"Loading analysis data from {RECORDS_FILE}...")
+            self.data = load_analysis(compact=True)
+        return self.data
+
+    def run_walk(self, counts):
+        self.files = self.analyzer.find_dsc_files()
+        counts['files'] = len(self.files)
+        counts['disabled'] = self.analyzer.inventory.disabled_count()
+        print(f"Found {len(self.files)} .dsc files{self.analyzer.disabled_note()}")
+
+    def run_parse(self, counts):
+        self.analyzer.parse_files(self.files, self.jobs, self.cache)
+        self.data = self.analyzer.store
+        counts.update(zip(RECORD_KINDS.values(), self.analyzer.record_counts()))
+        print(f"Extraction complete:")
+        print(f"  - {len(self.data['events'])} event handlers")
+        print(f"  - {len(self.data['data_keys'])} data key references")
+        print(f"  - {len(self.data['calls'])} run/inject/task calls")
+
+    def run_save(self, counts):
+        if self.data is not self.analyzer.store:
+            print("Nothing parsed in this run; skipping save")
+            return
+        self.analyzer.close_stream()
+        if self.output_format in ('both', 'json'):
+            self.analyzer.save_json("docs/analysis.json")
+        self.analyzer.inventory.save(INVENTORY_FILE)
+
+    def run_index(self, counts):
+        data = self.records()
+        if self.analyzer.inventory is not None:
+            subsystems = self.analyzer.inventory.subsystems()
+        else:
+            subsystems = generate_docs.categorize_files()
+        self.index = AnalysisIndex(data, subsystems)
+        counts['files'] = sum(len(files) for files in subsystems.values())
+        counts['subsystems'] = len(subsystems)
+
+    def run_warnings(self, counts):
+        with hot(self.profiler, 'warnings'):
+            self.warnings = find_warnings(self.records(), self.root_dir, trees=self.trees)
+        counts['warnings'] = len(self.warnings)
+        with open('docs/warnings.json', 'w') as f:
+            json.dump(self.warnings, f, indent=2)
+        print(f"✓ Found {len(self.warnings)} warnings, saved to docs/warnings.json")
+
+    def run_docs(self, counts):
+        for generator in DOC_GENERATORS:
+            generator(self.index)
+        counts['documents'] = len(DOC_GENERATORS)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the analysis pipeline (or a subset of it) in a single process",
+        epilog="Stages run in pipeline order; parse implies walk and docs implies index. "
+               "Stages whose input was not produced in this run read the existing docs/ artifacts.")
+    parser.add_argument('stages', nargs='*', metavar='STAGE',
+                        help=f"any of: all, {', '.join(STAGES)} (default all)")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="parse files across N worker processes (0 = one per CPU)")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"only re-parse files changed since the last run (cache in {CACHE_FILE})")
+    parser.add_argument('--cache-file', default=CACHE_FILE,
+                        help="location of the incremental cache")
+    parser.add_argument('--format', choices=['both', 'jsonl', 'json'], default='both',
+                        help=f"artifacts written by the save stage: {RECORDS_FILE}, "
+                             "docs/analysis.json, or both")
+    parser.add_argument('--summary', action='store_true',
+                        help="print the full warnings summary after the warnings stage")
+    add_inventory_arguments(parser)
+    add_profile_arguments(parser, PROFILE_FILE)
+    args = parser.parse_args(argv)
+    for name in args.stages:
+        if name != 'all' and name not in STAGES:
+            parser.error(f"unknown stage {name!r} (choose from all, {', '.join(STAGES)})")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = resolve_stages(args.stages)
+    profiler = profiler_for(args, 'stormroot_analyze', PROFILE_FILE)
+    jobs = args.jobs or os.cpu_count() or 1
+    if profiler is not None and jobs > 1:
+        print("Per-file parse times are only recorded with --jobs 1")
+    cache = AnalysisCache(args.cache_file) if args.incremental else None
+
+    os.makedirs('docs', exist_ok=True)
+    pipeline = Pipeline(".", jobs=jobs, cache=cache, output_format=args.format, profiler=profiler,
+                        include=args.include, exclude=args.exclude, disabled=args.disabled)
+    print(f"Running stages: {' -> '.join(stages)}")
+    pipeline.run(stages)
+
+    if args.summary and pipeline.warnings is not None:
+        generate_summary(pipeline.records(), pipeline.warnings)
+    finish(profiler, args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
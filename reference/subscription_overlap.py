@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Overlapping high-frequency event subscriptions
+Groups timer and movement handlers that fire on the same or overlapping
+triggers, lists the loops each one runs per firing, and projects the queues,
+iterations and waits one merged dispatcher per trigger would save
+"""
+
+import json
+import math
+import argparse
+from collections import defaultdict
+
+from analyze_denizen import load_analysis
+from dsc_tree import LOOP_COMMANDS
+from tick_budget import (HandlerWalker, PLAYER_COUNTS, PLAYER_LISTS, timer_frequency,
+                         poly_mul, poly_add_into, poly_eval)
+from wait_loops import PLAYER_EVENT_RATES, WAIT_COMMANDS, handler_frequency, is_waitable
+
+METRICS = ('queues', 'iterations', 'waits')
+
+# Timer events by the unit their every: counts in
+TIMER_UNITS = (
+    ('tick', 'tick'),
+    ('delta time secondly', 'delta time secondly'),
+    ('system time secondly', 'delta time secondly'),
+    ('delta time minutely', 'delta time minutely'),
+    ('delta time hourly', 'delta time hourly'),
+)
+MOVEMENT_TRIGGER = 'player movement'
+# Player list sources a merged dispatcher can iterate once, filtering per subscriber
+PLAYER_SOURCES = ('<server.online_players', '<server.players')
+ONLINE_PLAYERS = 'foreach <server.online_players>'
+# Longest firing pattern simulated when subscribers fire at different rates
+WINDOW_LIMIT = 3600
+
+def trigger_for(event):
+    """Trigger a handler shares with others, or None for low-frequency events"""
+    event = event.lower()
+    if timer_frequency(event) is not None:
+        for prefix, trigger in TIMER_UNITS:
+            if event == prefix or event.startswith(prefix + ' '):
+                return trigger
+        return None
+    for prefix, _rate in PLAYER_EVENT_RATES:
+        if event.startswith(prefix):
+            return MOVEMENT_TRIGGER
+    return None
+
+def cumulative(member, depth, players):
+    """Iterations per firing of the loop at depth in a handler's loop chain"""
+    total = 1.0
+    for loop in member['loops'][:depth + 1]:
+        total *= poly_eval(loop['count'], players)
+    return total
+
+def nest_key(member, depth):
+    """The loops of a handler's chain down to depth, in any nesting order"""
+    return tuple(sorted(loop['family'] for loop in member['loops'][:depth + 1]))
+
+def shared_loop_savings(due, players):
+    """Iterations and waits saved when the handlers in due run in one queue
+
+    Handlers whose loop chains hold the same loops down to a level share that
+    nest, whichever order the loops are nested in: `repeat 5` around a
+    foreach over the players runs the same 5P bodies as the reverse. Each
+    shared nest runs once at its largest iteration count, and the waits in
+    it that a shallower shared nest did not already merge are waited once.
+    Waits directly in the handlers are likewise waited once.
+    """
+    iterations = 0.0
+    waits = 0.0
+    top = sum(1 for m in due if m['top_wait'])
+    if top > 1:
+        waits += top - 1
+    # Per handler, the shallowest loop whose waits are not merged yet
+    unmerged = [0] * len(due)
+    for depth in range(max(len(m['loops']) for m in due)):
+        nests = defaultdict(list)
+        for i, m in enumerate(due):
+            if len(m['loops']) > depth:
+                nests[nest_key(m, depth)].append(i)
+        for members in nests.values():
+            if len(members) < 2:
+                continue
+            counts = [cumulative(due[i], depth, players) for i in members]
+            iterations += sum(counts) - max(counts)
+            waiting = []
+            for i in members:
+                loops = due[i]['loops']
+                waited = sum(cumulative(due[i], level, players)
+                             for level in range(unmerged[i], depth + 1) if loops[level]['wait'])
+                if waited:
+                    waiting.append(waited)
+                unmerged[i] = depth + 1
+            if len(waiting) > 1:
+                waits += sum(waiting) - max(waiting)
+    return iterations, waits
+
+class SubscriptionOverlap(HandlerWalker):
+    """Handlers grouped by trigger, with what merging each group would save
+
+    Timers group by unit (secondly with secondly every:10), movement events
+    (walks, moves, steps on) group together. Subscribers are assumed to fire
+    in phase, so at every firing of the fastest one, the others that are due
+    fire with it; a merged dispatcher fires at the fastest rate and injects
+    the due subscribers into its own queue. Per-firing totals follow
+    run/inject calls and loop counts as in TickBudget.
+    """
+
+    def loop_count(self, name, args, env, script):
+        """loop_multiplier, with filtered player lists counted as every online player"""
+        if name == 'foreach':
+            source = args.split(' as:')[0].strip()
+            if source.lower().startswith(PLAYER_SOURCES):
+                if source.lower() not in PLAYER_LISTS:
+                    self.assumptions[script].add(f"foreach over {source[:40]} counted as every online player")
+                return [0, 1]
+        return self.loop_multiplier(name, args, env, script)
+
+    def loop_family(self, name, args, count):
+        """What two handlers' loops must match on to be run once"""
+        if name == 'foreach':
+            source = args.split(' as:')[0].strip()
+            if source.lower().startswith(PLAYER_SOURCES):
+                return ONLINE_PLAYERS
+            return f"foreach {source}"
+        if name == 'repeat':
+            return f"repeat {poly_eval(count, 0):g}"
+        return f"{name} {args}"
+
+    def loop_chain(self, nodes, env, script):
+        """The handler's outer loops, first loop at each level, and whether each level waits"""
+        loops = []
+        top_wait = False
+        level = nodes
+        while True:
+            loop = None
+            wait = False
+            for node in level:
+                if node.kind != 'command':
+                    continue
+                args = node.args.rstrip(':').strip()
+                if node.name == 'define':
+                    self.track_define(args, env)
+                elif node.name in WAIT_COMMANDS:
+                    wait = True
+                elif node.name in LOOP_COMMANDS and loop is None:
+                    loop = (node, args)
+            if loops:
+                loops[-1]['wait'] = wait
+            else:
+                top_wait = wait
+            if loop is None:
+                return loops, top_wait
+            node, args = loop
+            count = self.loop_count(node.name, args, env, script)
+            loops.append({'loop': f"{node.name} {args}", 'line': node.line,
+                          'family': self.loop_family(node.name, args, count), 'count': count, 'wait': False})
+            level = node.children
+
+    def walk(self, nodes, mult, script, env, stack, totals):
+        for node in nodes:
+            if node.kind != 'command':
+                continue
+            name = node.name
+            args = node.args.rstrip(':').strip()
+
+            if name == 'define':
+                self.track_define(args, env)
+            elif name in WAIT_COMMANDS:
+                poly_add_into(totals['waits'], mult)
+
+            if node.children:
+                child_mult = mult
+                if name in LOOP_COMMANDS:
+                    child_mult = poly_mul(mult, self.loop_count(name, args, env, script))
+                    poly_add_into(totals['iterations'], child_mult)
+                self.walk(node.children, child_mult, script, env, stack, totals)
+
+            if name in ('run', 'inject') and args:
+                target = args.split()[0]
+                body, target_name = self.script_body(target)
+                if body is None:
+                    if target_name:
+                        self.assumptions[script].add(f"{name} {target} not resolved")
+                    continue
+                if target_name in stack:
+                    continue
+                if name == 'run' and not is_waitable(node):
+                    poly_add_into(totals['queues'], mult)
+                self.walk(body.children, mult, target_name, env if name == 'inject' else {},
+                          stack + (target_name,), totals)
+
+    def subscriber(self, event, trigger, frequency):
+        try:
+            node = self.event_node(event)
+        except OSError:
+            self.assumptions[event['file']].add("source not available")
+            return None
+        if node is None:
+            return None
+        label = self.definitions.container_at(event['file'], event['line'])[2]
+        loops, top_wait = self.loop_chain(node.children, {}, label)
+        totals = {'queues': [1], 'iterations': [0], 'waits': [0]}
+        self.walk(node.children, [1], label, {}, (label,), totals)
+        return {
+            'script': label,
+            'file': event['file'],
+            'line': event['line'],
+            'event': event['event'],
+            'trigger': trigger,
+            'per_second': frequency,
+            'loops': loops,
+            'top_wait': top_wait,
+            'per_firing': totals,
+        }
+
+    @staticmethod
+    def merge_savings(members, players):
+        """Queues, iterations and waits per second a merged dispatcher saves"""
+        rates = [poly_eval(m['per_second'], players) for m in members]
+        fastest = max(rates)
+        saved = {m: 0.0 for m in METRICS}
+        if fastest <= 0:
+            return saved
+        # Firings of the fastest subscriber between two firings of each other one
+        steps = [max(1, round(fastest / rate)) if rate > 0 else None for rate in rates]
+        window = 1
+        for step in steps:
+            if step is not None:
+                window = window * step // math.gcd(window, step)
+        window = min(window, WINDOW_LIMIT)
+        for t in range(window):
+            due = [m for m, step in zip(members, steps) if step is not None and t % step == 0]
+            if len(due) < 2:
+                continue
+            iterations, waits = shared_loop_savings(due, players)
+            saved['queues'] += len(due) - 1
+            saved['iterations'] += iterations
+            saved['waits'] += waits
+        return {m: value * fastest / window for m, value in saved.items()}
+
+    def report(self):
+        triggers = defaultdict(list)
+        for event in self.data['events']:
+            trigger = trigger_for(event['event'])
+            if trigger is None:
+                continue
+            member = self.subscriber(event, trigger, handler_frequency(event['event']))
+            if member is not None:
+                triggers[trigger].append(member)
+
+        groups = []
+        for trigger, members in triggers.items():
+            members.sort(key=lambda m: (m['file'], m['line']))
+            projection = {}
+            for players in PLAYER_COUNTS:
+                before = {metric: sum(poly_eval(m['per_second'], players) *
+                                      poly_eval(m['per_firing'][metric], players) for m in members)
+                          for metric in METRICS}
+                saved = self.merge_savings(members, players)
+                projection[players] = {'before': before, 'saved': saved}
+
+            shared = defaultdict(set)
+            for depth in range(max((len(m['loops']) for m in members), default=0)):
+                nests = defaultdict(list)
+                for m in members:
+                    if len(m['loops']) > depth:
+                        nests[nest_key(m, depth)].append(m['script'])
+                for nest, scripts in nests.items():
+                    if len(scripts) > 1:
+                        shared[' × '.join(nest)].update(scripts)
+
+            rates = {tuple(m['per_second']) for m in members}
+            groups.append({
+                'trigger': trigger,
+                'kind': 'single' if len(members) == 1 else 'identical' if len(rates) == 1 else 'overlapping',
+                'handlers': members,
+                'shared_loops': [{'loops': loops, 'scripts': sorted(scripts)}
+                                 for loops, scripts in sorted(shared.items())],
+                'projection': projection,
+            })
+        groups.sort(key=lambda g: (-g['projection'][200]['saved']['queues'] -
+                                   g['projection'][200]['saved']['iterations'], g['trigger']))
+
+        return {
+            'player_counts': list(PLAYER_COUNTS),
+            'groups': groups,
+            'assumptions': {k: sorted(v) for k, v in sorted(self.assumptions.items())},
+        }
+
+def format_loops(handler):
+    parts = []
+    for loop in handler['loops']:
+        count = loop['count']
+        size = 'P' if count == [0, 1] else f"{poly_eval(count, 0):g}"
+        parts.append(f"`{loop['loop'][:40]}` ({size}{', waits' if loop['wait'] else ''})")
+    if handler['top_wait']:
+        parts.insert(0, "waits")
+    return " > ".join(parts).replace('|', '\\|') or "-"
+
+def generate_markdown(report):
+    merged = [g for g in report['groups'] if len(g['handlers']) > 1]
+    saved = {m: sum(g['projection'][200]['saved'][m] for g in merged) for m in METRICS}
+    lines = [
+        "# Subscription Overlap",
+        "",
+        "**Purpose:** Handlers subscribed to the same or overlapping high-frequency triggers, and what one",
+        "merged dispatcher per trigger would save.",
+        "",
+        "A dispatcher fires at the fastest subscriber's rate and injects each due subscriber into its own",
+        "queue, so the subscribers' queues go away. Outer loops two subscribers share (the same",
+        "`foreach <server.online_players>`, or `repeat N` of the same N, nested in either order) run once at",
+        "the larger count, and waits inside a shared nest are waited once. Filtered player lists count as",
+        "every online player. Shared nests are listed as `loop × loop`, in no particular nesting order.",
+        "",
+        f"At 200 players, merging saves **{saved['queues']:,.1f} queues/s**, "
+        f"{saved['iterations']:,.0f} loop iterations/s and {saved['waits']:,.0f} waits/s.",
+        "",
+        "---",
+        "",
+        "## Triggers",
+        "",
+        "| Trigger | Kind | Handlers | Queues/s saved @200 | Iterations/s saved @200 | Waits/s saved @200 |",
+        "|---------|------|----------|---------------------|-------------------------|--------------------|",
+    ]
+    for g in report['groups']:
+        s = g['projection'][200]['saved']
+        lines.append(f"| `{g['trigger']}` | {g['kind']} | {len(g['handlers'])} | {s['queues']:,.1f} | "
+                     f"{s['iterations']:,.0f} | {s['waits']:,.0f} |")
+
+    for g in merged:
+        p = g['projection'][200]
+        lines.extend([
+            "",
+            "---",
+            "",
+            f"## `{g['trigger']}`",
+            "",
+            f"{len(g['handlers'])} {g['kind']} subscriptions. At 200 players: "
+            f"{p['before']['queues']:,.1f} → {p['before']['queues'] - p['saved']['queues']:,.1f} queues/s, "
+            f"{p['before']['iterations']:,.0f} → {p['before']['iterations'] - p['saved']['iterations']:,.0f} "
+            f"iterations/s, {p['before']['waits']:,.0f} → {p['before']['waits'] - p['saved']['waits']:,.0f} waits/s.",
+            "",
+            "| Handler | Event | Firings/s @200 | Outer loops | Queues/firing | Iterations/firing @200 | Waits/firing @200 |",
+            "|---------|-------|----------------|-------------|---------------|------------------------|-------------------|",
+        ])
+        for h in g['handlers']:
+            per_firing = h['per_firing']
+            event = h['event'][:45].replace('|', '\\|')
+            lines.append(f"| [`{h['script']}`]({h['file']}#L{h['line']}) | `{event}` | "
+                         f"{poly_eval(h['per_second'], 200):,.2f} | {format_loops(h)} | "
+                         f"{poly_eval(per_firing['queues'], 200):,.0f} | "
+                         f"{poly_eval(per_firing['iterations'], 200):,.0f} | "
+                         f"{poly_eval(per_firing['waits'], 200):,.0f} |")
+        if g['shared_loops']:
+            lines.append("")
+            lines.append("Shared outer loops:")
+            lines.append("")
+            for shared in g['shared_loops']:
+                lines.append(f"- `{shared['loops']}`: " + ", ".join(f"`{s}`" for s in shared['scripts']))
+
+    if report['assumptions']:
+        lines.extend(["", "---", "", "## Assumptions", ""])
+        for script, notes in report['assumptions'].items():
+            lines.append(f"- `{script}`: " + "; ".join(notes))
+
+    lines.append("")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find overlapping high-frequency subscriptions")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    parse_args(argv)
+    data = load_analysis(compact=True)
+    report = SubscriptionOverlap(data).report()
+
+    with open('docs/subscription_overlap.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    with open('docs/SUBSCRIPTION_OVERLAP.md', 'w') as f:
+        f.write(generate_markdown(report))
+
+    shared = [g for g in report['groups'] if len(g['handlers']) > 1]
+    print(f"✓ Found {len(shared)} triggers with more than one high-frequency handler")
+    for g in shared:
+        s = g['projection'][200]['saved']
+        print(f"  {g['trigger']}: {len(g['handlers'])} handlers, merging saves {s['queues']:,.1f} queues/s, "
+              f"{s['iterations']:,.0f} iterations/s, {s['waits']:,.0f} waits/s at 200 players")
+    print("✓ Generated docs/SUBSCRIPTION_OVERLAP.md and docs/subscription_overlap.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Tag parsing cost of high-frequency handlers
+Parses every tag on the lines timer and movement handlers reach and projects
+tag evaluations, attribute lookups and runtime-built keys per second
+"""
+
+import json
+import argparse
+from collections import defaultdict
+
+from analyze_denizen import load_analysis
+from dsc_tags import iter_tags, line_metrics
+from dsc_tree import LOOP_COMMANDS
+from tick_budget import HandlerWalker, PLAYER_COUNTS, poly_mul, poly_add_into, poly_eval
+from wait_loops import handler_frequency
+
+# Per-second rates; depth and chain are per-line maxima, not rates
+METRICS = ('evaluations', 'attributes', 'dynamic')
+
+class TagCost(HandlerWalker):
+    """Per-handler and per-script tag evaluation rates
+
+    Each reachable command line is parsed once with dsc_tags. Rates start at
+    the handler's firings per second and follow run/inject calls and loop
+    counts as in TickBudget; every if/else branch is counted, so they are
+    upper bounds.
+    """
+
+    def __init__(self, data, root_dir=".", trees=None):
+        super().__init__(data, root_dir, trees)
+        self.lines = {}
+        self.scripts = defaultdict(lambda: {'rates': {m: [0] for m in METRICS}, 'depth': 0,
+                                            'chain': 0, 'dynamic_keys': set()})
+        self.sites = {}
+
+    def line(self, file, node):
+        """Metrics and runtime-built parameters for one command line, parsed once"""
+        entry = self.lines.get((file, node.line))
+        if entry is None:
+            metrics = line_metrics(node.text)
+            dynamic = []
+            if metrics['dynamic']:
+                dynamic = [f"{name}[{param}]" for tag in iter_tags(node.text)
+                           for name, param in tag.dynamic_keys()]
+            entry = self.lines[(file, node.line)] = (metrics, dynamic)
+        return entry
+
+    def walk_handler(self, event, frequency):
+        try:
+            node = self.event_node(event)
+        except OSError:
+            self.assumptions[event['file']].add("source not available")
+            return None
+        if node is None:
+            return None
+        label = self.definitions.container_at(event['file'], event['line'])[2]
+        totals = {m: [0] for m in METRICS}
+        self.walk(node.children, frequency, event['file'], label, {}, (label,), totals, event)
+        return totals
+
+    def walk(self, nodes, mult, file, script, env, stack, totals, event):
+        for node in nodes:
+            if node.kind != 'command':
+                continue
+            name = node.name
+            args = node.args.rstrip(':').strip()
+
+            metrics, dynamic = self.line(file, node)
+            if metrics['evaluations']:
+                contribution = self.scripts[script]
+                contribution['depth'] = max(contribution['depth'], metrics['depth'])
+                contribution['chain'] = max(contribution['chain'], metrics['chain'])
+                contribution['dynamic_keys'].update(dynamic)
+                for metric in METRICS:
+                    if metrics[metric]:
+                        poly_add_into(totals[metric], mult, metrics[metric])
+                        poly_add_into(contribution['rates'][metric], mult, metrics[metric])
+                site = self.sites.setdefault((file, node.line), {
+                    'file': file, 'line': node.line, 'script': script, 'command': node.text,
+                    'per_run': metrics, 'dynamic_keys': dynamic, 'evaluations': [0],
+                    'handlers': set(),
+                })
+                poly_add_into(site['evaluations'], mult, metrics['evaluations'])
+                site['handlers'].add(f"{event['event']} ({event['file']}:{event['line']})")
+
+            if name == 'define':
+                self.track_define(args, env)
+
+            if node.children:
+                child_mult = mult
+                if name in LOOP_COMMANDS:
+                    child_mult = poly_mul(mult, self.loop_multiplier(name, args, env, script))
+                self.walk(node.children, child_mult, file, script, env, stack, totals, event)
+
+            if name in ('run', 'inject') and args:
+                target = args.split()[0]
+                body, target_name = self.script_body(target)
+                if body is None:
+                    if target_name:
+                        self.assumptions[script].add(f"{name} {target} not resolved")
+                    continue
+                if target_name in stack:
+                    continue
+                target_file = self.definitions.lookup(target_name)['file']
+                self.walk(body.children, mult, target_file, target_name, env if name == 'inject' else {},
+                          stack + (target_name,), totals, event)
+
+    def report(self):
+        handlers = []
+        for event in self.data['events']:
+            frequency = handler_frequency(event['event'])
+            if frequency is None:
+                continue
+            totals = self.walk_handler(event, frequency)
+            if totals is None:
+                continue
+            handlers.append({
+                'file': event['file'],
+                'line': event['line'],
+                'event': event['event'],
+                'per_second': totals,
+                'projection': {p: {m: poly_eval(totals[m], p) for m in METRICS} for p in PLAYER_COUNTS},
+            })
+        handlers.sort(key=lambda h: (-h['projection'][200]['evaluations'], h['file'], h['line']))
+
+        scripts = []
+        for name, contribution in self.scripts.items():
+            rates = contribution['rates']
+            scripts.append({
+                'script': name,
+                'per_second': rates,
+                'projection': {p: {m: poly_eval(rates[m], p) for m in METRICS} for p in PLAYER_COUNTS},
+                'max_depth': contribution['depth'],
+                'longest_chain': contribution['chain'],
+                'dynamic_keys': sorted(contribution['dynamic_keys']),
+            })
+        scripts.sort(key=lambda s: (-s['projection'][200]['evaluations'], s['script']))
+
+        sites = []
+        for site in self.sites.values():
+            sites.append(dict(site, handlers=sorted(site['handlers']),
+                              projection={p: poly_eval(site['evaluations'], p) for p in PLAYER_COUNTS}))
+        sites.sort(key=lambda s: (-s['projection'][200], s['file'], s['line']))
+
+        return {
+            'player_counts': list(PLAYER_COUNTS),
+            'handlers': handlers,
+            'scripts': scripts,
+            'sites': sites,
+            'assumptions': {k: sorted(v) for k, v in sorted(self.assumptions.items())},
+        }
+
+def generate_markdown(report):
+    total = {m: sum(h['projection'][200][m] for h in report['handlers']) for m in METRICS}
+    lines = [
+        "# Tag Cost",
+        "",
+        "**Purpose:** Tag parsing and evaluation forced per second by timer and movement handlers.",
+        "",
+        "Every tag is parsed with nesting, so `<player.flag[stat.<[key]>]>` counts two evaluations and a",
+        "dynamic (runtime-built) key. Rates follow run/inject calls and count every if/else branch (upper bounds).",
+        "",
+        f"At 200 players: **{total['evaluations']:,.0f} tag evaluations/s**, "
+        f"{total['attributes']:,.0f} attribute lookups/s, {total['dynamic']:,.0f} dynamic-key tags/s.",
+        "",
+        "---",
+        "",
+        "## Handlers",
+        "",
+        "| Handler | Event | Evaluations/s @50 | Evaluations/s @200 | Attributes/s @200 |",
+        "|---------|-------|-------------------|--------------------|-------------------|",
+    ]
+    for h in report['handlers']:
+        p = h['projection']
+        lines.append(f"| [{h['file']}:{h['line']}]({h['file']}#L{h['line']}) | `{h['event'][:50]}` | "
+                     f"{p[50]['evaluations']:,.0f} | {p[200]['evaluations']:,.0f} | {p[200]['attributes']:,.0f} |")
+
+    lines.extend([
+        "",
+        "---",
+        "",
+        "## Scripts by Tag Evaluations (200 players)",
+        "",
+        "| Script | Evaluations/s | Attributes/s | Dynamic-key tags/s | Max depth | Longest chain |",
+        "|--------|---------------|--------------|--------------------|-----------|---------------|",
+    ])
+    for s in report['scripts'][:25]:
+        p = s['projection'][200]
+        lines.append(f"| `{s['script']}` | {p['evaluations']:,.0f} | {p['attributes']:,.0f} | "
+                     f"{p['dynamic']:,.0f} | {s['max_depth']} | {s['longest_chain']} |")
+
+    lines.extend([
+        "",
+        "---",
+        "",
+        "## Hottest Lines (200 players)",
+        "",
+        "| Location | Script | Tags per run | Depth | Evaluations/s | Dynamic keys |",
+        "|----------|--------|--------------|-------|---------------|--------------|",
+    ])
+    for s in report['sites'][:25]:
+        keys = ", ".join(f"`{k}`" for k in s['dynamic_keys'][:3]).replace('|', '\\|')
+        lines.append(f"| [{s['file']}:{s['line']}]({s['file']}#L{s['line']}) | `{s['script']}` | "
+                     f"{s['per_run']['evaluations']} | {s['per_run']['depth']} | "
+                     f"{s['projection'][200]:,.0f} | {keys} |")
+
+    if report['assumptions']:
+        lines.extend(["", "---", "", "## Assumptions", ""])
+        for script, notes in report['assumptions'].items():
+            lines.append(f"- `{script}`: " + "; ".join(notes))
+
+    lines.append("")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Project tag evaluations of high-frequency handlers")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    parse_args(argv)
+    data = load_analysis(compact=True)
+    report = TagCost(data).report()
+
+    with open('docs/tag_cost.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    with open('docs/TAG_COST.md', 'w') as f:
+        f.write(generate_markdown(report))
+
+    print(f"✓ Parsed tags for {len(report['handlers'])} high-frequency handlers")
+    for s in report['scripts'][:5]:
+        print(f"  {s['script']}: {s['projection'][200]['evaluations']:,.0f} tag evaluations/s at 200 players")
+    print("✓ Generated docs/TAG_COST.md and docs/tag_cost.json")
+
+if __name__ == "__main__":
+    main()
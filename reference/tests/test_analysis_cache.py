@@ -0,0 +1,117 @@
+"""
+Tests for the incremental per-file analysis cache
+Each run must produce exactly what a full rescan of the same tree does
+"""
+
+import os
+
+import pytest
+
+from analyze_denizen import DenizenAnalyzer, AnalysisCache
+
+RECORD_LISTS = ('events', 'data_keys', 'calls', 'scripts')
+
+SCRIPTS = {
+    'magic/mana.dsc': """mana_world:
+    type: world
+    events:
+        on delta time secondly:
+        - foreach <server.online_players> as:player:
+            - run mana_task def.player:<[player]>
+
+mana_task:
+    type: task
+    definitions: player
+    script:
+    - define mana <[player].flag[stat.mana.current]||0>
+    - flag <[player]> stat.mana.current:<[mana].add[1]>
+""",
+    'magic/spells.dsc': """spell_task:
+    type: task
+    script:
+    - narrate <player.flag[spell.selected]>
+    - inject mana_task
+""",
+    'npc/guard.dsc': """guard_assignment:
+    type: assignment
+    actions:
+        on assignment:
+        - trigger name:click state:true
+""",
+}
+
+def write_tree(root, scripts):
+    for rel, text in scripts.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+def records(analyzer):
+    return {name: getattr(analyzer, name) for name in RECORD_LISTS}
+
+def incremental(root, cache_file):
+    analyzer = DenizenAnalyzer(root)
+    cache = AnalysisCache(cache_file)
+    analyzer.analyze_all(cache=cache)
+    return records(analyzer), cache
+
+def full_rescan(root):
+    analyzer = DenizenAnalyzer(root)
+    analyzer.analyze_all()
+    return records(analyzer)
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'scripts'
+    write_tree(root, SCRIPTS)
+    cache_file = tmp_path / 'cache.json'
+    first, cache = incremental(root, cache_file)
+    assert first['events'] and first['data_keys'] and first['calls'] and first['scripts']
+    assert first == full_rescan(root)
+    assert len(cache.files) == len(SCRIPTS)
+    return root, cache_file
+
+def test_unchanged_files_hit_on_size_and_mtime(tree, monkeypatch):
+    root, cache_file = tree
+    # A hit on size + mtime never reads the contents
+    monkeypatch.setattr('analyze_denizen.file_digest', lambda filepath: pytest.fail(f"hashed {filepath}"))
+    result, cache = incremental(root, cache_file)
+    assert cache.reused == len(SCRIPTS)
+    assert result == full_rescan(root)
+
+def test_touched_file_falls_back_to_sha1(tree):
+    root, cache_file = tree
+    path = root / 'magic/spells.dsc'
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    result, cache = incremental(root, cache_file)
+    assert cache.reused == len(SCRIPTS)
+    assert cache.files['magic/spells.dsc']['mtime'] == st.st_mtime_ns + 10**9
+    assert result == full_rescan(root)
+
+def test_edited_file_is_reparsed(tree):
+    root, cache_file = tree
+    path = root / 'magic/spells.dsc'
+    path.write_text(SCRIPTS['magic/spells.dsc'] + "    - run cast_task\n")
+    result, cache = incremental(root, cache_file)
+    assert cache.reused == len(SCRIPTS) - 1
+    assert result == full_rescan(root)
+    assert any(c['target'] == 'cast_task' for c in result['calls'])
+
+def test_renamed_file_reuses_its_records(tree):
+    root, cache_file = tree
+    (root / 'magic/spells.dsc').rename(root / 'npc/spells.dsc')
+    result, cache = incremental(root, cache_file)
+    assert (cache.renamed, cache.removed) == (1, 0)
+    assert 'magic/spells.dsc' not in cache.files
+    assert result == full_rescan(root)
+    assert {c['file'] for c in result['calls'] if c['target'] == 'mana_task'} == {'magic/mana.dsc', 'npc/spells.dsc'}
+
+def test_deleted_file_is_evicted(tree):
+    root, cache_file = tree
+    (root / 'npc/guard.dsc').unlink()
+    result, cache = incremental(root, cache_file)
+    assert cache.removed == 1
+    assert sorted(cache.files) == ['magic/mana.dsc', 'magic/spells.dsc']
+    assert AnalysisCache(cache_file).files.keys() == cache.files.keys()
+    assert result == full_rescan(root)
@@ -0,0 +1,40 @@
+"""
+Tests for the SQLite analysis index's key queries
+"""
+
+import pytest
+
+from analysis_db import build_database, glob_prefix, query
+
+KEYS = [
+    'player.flag.quest[main]*?.stage',
+    'player.flag.quest[main]*?.reward',
+    # Each would match if [ * ? were read as GLOB wildcards
+    'player.flag.questm*?.stage',
+    'player.flag.quest[main]xy.stage',
+    'player.flag.quest[main]*?',
+]
+
+@pytest.fixture
+def db(tmp_path):
+    data = {
+        'events': [],
+        'calls': [],
+        'data_keys': [{'file': 'quests.dsc', 'line': line, 'key': key, 'scope': 'player', 'type': 'flag',
+                       'context': f"- narrate <player.flag[{key[12:]}]>"}
+                      for line, key in enumerate(KEYS, 1)],
+    }
+    path = tmp_path / 'analysis.db'
+    build_database(data, path)
+    return path
+
+def test_glob_prefix_brackets_wildcards():
+    assert glob_prefix('a[b]*?') == 'a[[]b][*][?]*'
+
+def test_prefix_query_takes_brackets_and_wildcards_literally(db):
+    rows = query(db, 'readers', 'player.flag.quest[main]*?.*')
+    assert [key for _path, _line, key, _context in rows] == KEYS[:2]
+
+def test_exact_query(db):
+    rows = query(db, 'readers', 'player.flag.quest[main]*?')
+    assert [key for _path, _line, key, _context in rows] == [KEYS[4]]
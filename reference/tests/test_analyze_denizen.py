@@ -0,0 +1,143 @@
+"""
+Regression tests for DenizenAnalyzer's scanner on the reference corpus
+The corpus is every script under reference/, disabled ones included
+"""
+
+import re
+import mmap
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from analyze_denizen import DenizenAnalyzer, BYTE_SCAN_UNSAFE
+
+REFERENCE_DIR = Path(__file__).resolve().parent.parent
+RECORD_LISTS = ('events', 'data_keys', 'calls', 'scripts')
+
+# The per-line scanner parse_file started from, kept verbatim as the reference
+BASELINE_EVENT = r'^(\s*)(on|after)\s+(.+):\s*$'
+BASELINE_FLAG_PATTERNS = [
+    r'<(player|server|npc)\.flag\[([^\]]+)\]>',
+    r'-\s+flag\s+(player|server|npc)\s+([^\s:]+)',
+    r'-\s+adjust\s+(player|server|npc)\s+flag:([^\s:]+)',
+]
+BASELINE_YAML_PATTERNS = [
+    r'<yaml\[([^\]]+)\]\.read\[([^\]]+)\]>',
+    r'-\s+yaml\s+set\s+([^\s:]+):([^\s]+)',
+]
+BASELINE_CALL_PATTERNS = [
+    (r'-\s+run\s+([^\s]+)', 'run'),
+    (r'-\s+inject\s+([^\s]+)', 'inject'),
+    (r'-\s+task\s+([^\s]+)', 'task'),
+]
+
+def baseline_key(key):
+    key = key.strip()
+    key = re.sub(r'^<player\.', 'player.', key)
+    key = re.sub(r'^<server\.', 'server.', key)
+    key = re.sub(r'^p\.', 'player.', key)
+    key = re.sub(r'^s\.', 'server.', key)
+    return re.sub(r'>$', '', key)
+
+def baseline_records(filepath, rel):
+    events, data_keys, calls = [], [], []
+    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = f.readlines()
+    for line_num, line in enumerate(lines, 1):
+        line = line.rstrip()
+        if not line.strip() or line.strip().startswith('#'):
+            continue
+        context = line.strip()[:80]
+
+        event_match = re.match(BASELINE_EVENT, line, re.IGNORECASE)
+        if event_match:
+            events.append({'file': rel, 'line': line_num, 'type': event_match.group(2),
+                           'event': event_match.group(3).strip(), 'indent': len(event_match.group(1))})
+        for pattern in BASELINE_FLAG_PATTERNS:
+            for match in re.finditer(pattern, line, re.IGNORECASE):
+                scope = match.group(1).lower()
+                data_keys.append({'file': rel, 'line': line_num,
+                                  'key': baseline_key(f"{scope}.flag.{match.group(2)}"),
+                                  'scope': scope, 'type': 'flag', 'context': context})
+        for pattern in BASELINE_YAML_PATTERNS:
+            for match in re.finditer(pattern, line, re.IGNORECASE):
+                data_keys.append({'file': rel, 'line': line_num,
+                                  'key': f"yaml.{match.group(1)}.{match.group(2)}",
+                                  'scope': 'yaml', 'type': 'yaml', 'context': context})
+        for pattern, call_type in BASELINE_CALL_PATTERNS:
+            for match in re.finditer(pattern, line, re.IGNORECASE):
+                calls.append({'file': rel, 'line': line_num, 'type': call_type,
+                              'target': match.group(1), 'context': context})
+    return events, data_keys, calls
+
+@pytest.fixture(scope='module')
+def corpus():
+    files = sorted(REFERENCE_DIR.rglob('*.dsc*'))
+    assert files, "no scripts under reference/"
+    analyzer = DenizenAnalyzer(REFERENCE_DIR)
+    for filepath in files:
+        analyzer.parse_file(filepath)
+    return files, analyzer
+
+@pytest.fixture(scope='module')
+def baseline(corpus):
+    files, _analyzer = corpus
+    events, data_keys, calls = [], [], []
+    for filepath in files:
+        file_events, file_keys, file_calls = baseline_records(filepath, str(filepath.relative_to(REFERENCE_DIR)))
+        events += file_events
+        data_keys += file_keys
+        calls += file_calls
+    return {'events': events, 'data_keys': data_keys, 'calls': calls}
+
+def as_tuples(records):
+    return [tuple(sorted(r.items())) for r in records]
+
+def test_events_match_baseline(corpus, baseline):
+    assert as_tuples(corpus[1].events) == as_tuples(baseline['events'])
+
+def test_calls_match_baseline(corpus, baseline):
+    # `- ~run` (waitable) commands are found since the block tree parser; the baseline missed them
+    calls = [c for c in corpus[1].calls if not c['context'].startswith('- ~')]
+    assert as_tuples(calls) == as_tuples(baseline['calls'])
+
+def test_data_keys_cover_baseline(corpus, baseline):
+    """Every baseline key is still found, except keys it cut off at a nested tag
+
+    The block tree extraction adds flag forms the baseline missed
+    (`- flag <player> ...`), so only the baseline's side is checked.
+    """
+    current = corpus[1].data_keys
+    missing = Counter(as_tuples(baseline['data_keys'])) - Counter(as_tuples(current))
+    on_line = {}
+    for record in current:
+        on_line.setdefault((record['file'], record['line']), []).append(record['key'])
+    for record in missing.elements():
+        record = dict(record)
+        keys = on_line.get((record['file'], record['line']), [])
+        assert '<' in record['key'] and any(k.startswith(record['key']) and k != record['key'] for k in keys), \
+            f"{record['file']}:{record['line']} lost {record['key']}"
+
+def test_byte_scan_matches_line_scan(corpus):
+    """scan_buffer gives the same records as scan_lines on every file it accepts"""
+    files, _analyzer = corpus
+    scanned = 0
+    for filepath in files:
+        rel = str(filepath.relative_to(REFERENCE_DIR))
+        with open(filepath, 'rb') as f:
+            if not f.read(1):
+                continue
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with buf:
+            if BYTE_SCAN_UNSAFE.search(buf):
+                continue
+            by_bytes = DenizenAnalyzer(REFERENCE_DIR)
+            by_bytes.scan_buffer(rel, buf)
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            by_lines = DenizenAnalyzer(REFERENCE_DIR)
+            by_lines.scan_lines(rel, f.readlines())
+        for name in RECORD_LISTS:
+            assert getattr(by_bytes, name) == getattr(by_lines, name), f"{rel}: {name} differ"
+        scanned += 1
+    assert scanned
@@ -0,0 +1,69 @@
+"""
+Tests for the script call graph: cycles, self-loops and depth through a cycle
+"""
+
+import pytest
+
+from call_graph import ScriptCallGraph, strongly_connected_components
+
+def container(name, line, end_line, script_type='task'):
+    return {'file': 'graph.dsc', 'line': line, 'name': name, 'type': script_type, 'end_line': end_line}
+
+def call(line, target, call_type='run'):
+    return {'file': 'graph.dsc', 'line': line, 'type': call_type, 'target': target, 'context': f"- run {target}"}
+
+# world_a's handler -> task_a <-> task_b -> task_c -> task_d -> task_d
+GRAPH = {
+    'scripts': [
+        container('world_a', 1, 10, 'world'),
+        container('task_a', 12, 15),
+        container('task_b', 16, 20),
+        container('task_c', 21, 25),
+        container('task_d', 26, 30),
+        container('task_e', 31, 35),
+    ],
+    'events': [{'file': 'graph.dsc', 'line': 4, 'type': 'on', 'event': 'player joins', 'indent': 8}],
+    'calls': [
+        call(5, 'task_a'),
+        call(14, 'task_b'),
+        call(18, 'task_c'),
+        call(19, 'Task_A', 'inject'),
+        call(23, 'task_d.path'),
+        call(28, 'task_d'),
+        call(33, '<[next]>'),
+        call(34, 'missing_task'),
+    ],
+}
+
+@pytest.fixture
+def graph():
+    return ScriptCallGraph(GRAPH)
+
+def test_components_are_reverse_topological():
+    edges = {'a': ['b'], 'b': ['a', 'c'], 'c': ['d'], 'd': ['d']}
+    components = strongly_connected_components(['a', 'b', 'c', 'd', 'e'], edges)
+    assert components == [['d'], ['c'], ['a', 'b'], ['e']]
+
+def test_long_cycle_does_not_recurse():
+    n = 20000
+    edges = {i: [i + 1] for i in range(n - 1)}
+    edges[n - 1] = [0]
+    assert strongly_connected_components(list(range(n)), edges) == [list(range(n))]
+
+def test_cycles_include_self_loops(graph):
+    assert graph.cycles() == [['task_a', 'task_b'], ['task_d']]
+
+def test_depth_counts_a_cycle_once(graph):
+    assert graph.depth == {'task_a': 2, 'task_b': 2, 'task_c': 1, 'task_d': 0}
+    assert graph.chain('task_b') == ['task_b', 'task_c', 'task_d']
+
+def test_event_chains_start_at_the_handler(graph):
+    assert graph.event_chains() == [{
+        'file': 'graph.dsc', 'line': 4, 'event': 'player joins', 'script': 'world_a',
+        'depth': 3, 'chain': ['task_a', 'task_c', 'task_d'],
+    }]
+    assert 'world_a' not in graph.edges
+
+def test_unresolvable_calls_are_counted(graph):
+    assert graph.dynamic_calls == 1
+    assert graph.unresolved == {'missing_task': 1}
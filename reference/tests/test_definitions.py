@@ -0,0 +1,61 @@
+"""
+Tests for the script definition index's name and position lookups
+"""
+
+import pytest
+
+from definitions import DefinitionIndex, target_script
+
+SCRIPTS = [
+    {'file': 'a.dsc', 'line': 1, 'name': 'First_Task', 'type': 'task', 'end_line': 5},
+    # Blank lines 6-7 belong to no container
+    {'file': 'a.dsc', 'line': 8, 'name': 'second_world', 'type': 'world', 'end_line': 20},
+    {'file': 'a.dsc', 'line': 21, 'name': 'third_task', 'type': 'task', 'end_line': 30},
+    {'file': 'b.dsc', 'line': 3, 'name': 'first_task', 'type': 'task', 'end_line': 9},
+]
+
+@pytest.fixture
+def index():
+    return DefinitionIndex(SCRIPTS)
+
+@pytest.mark.parametrize('line, name', [
+    (1, 'first_task'),
+    (5, 'first_task'),
+    (8, 'second_world'),
+    (20, 'second_world'),
+    (21, 'third_task'),
+    (30, 'third_task'),
+])
+def test_container_at_boundaries(index, line, name):
+    assert index.container_at('a.dsc', line)[2] == name
+
+@pytest.mark.parametrize('file, line', [
+    ('a.dsc', 0),
+    ('a.dsc', 6),
+    ('a.dsc', 7),
+    ('a.dsc', 31),
+    ('b.dsc', 2),
+    ('c.dsc', 1),
+])
+def test_container_at_outside_containers(index, file, line):
+    assert index.container_at(file, line) is None
+
+def test_lookup_is_case_insensitive_and_keeps_the_first(index):
+    assert index.lookup('FIRST_TASK') is SCRIPTS[0]
+    assert index.lookup('missing') is None
+    assert 'Third_Task' in index
+    assert list(index.duplicates()) == ['first_task']
+
+@pytest.mark.parametrize('target, name', [
+    ('Third_Task', 'third_task'),
+    ('second_world.events.path', 'second_world'),
+    ('"first_task"', 'first_task'),
+    ('<[task]>', None),
+])
+def test_target_script(target, name):
+    assert target_script(target) == name
+
+def test_resolve(index):
+    assert index.resolve({'target': 'third_task.path'}) == ('resolved', SCRIPTS[2])
+    assert index.resolve({'target': '<[task]>'}) == ('dynamic', None)
+    assert index.resolve({'target': 'nope'}) == ('unresolved', 'nope')
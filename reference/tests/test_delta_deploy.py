@@ -0,0 +1,117 @@
+"""
+Tests for the manifest-based delta deploy against a temporary target
+"""
+
+import os
+import json
+
+import pytest
+
+import delta_deploy
+from delta_deploy import DeltaDeploy, MANIFEST_NAME, RELOAD_EXIT_STATUS
+
+SPELLS = """fire_task:
+    type: task
+    script:
+    - narrate fire
+
+ice_task:
+    type: task
+    script:
+    - narrate ice
+"""
+SHOP = """shop_task:
+    type: task
+    script:
+    - narrate shop
+"""
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    # Later writes in the same test must not share an mtime
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    root = tmp_path / 'repo'
+    write(root / 'scripts/spells.dsc', SPELLS)
+    write(root / 'scripts/shop.dsc', SHOP)
+    write(root / 'scripts/old.dsc.OFF', SHOP)
+    write(root / 'data/prices.yml', "copper: 1\n")
+    monkeypatch.setattr(delta_deploy, 'REPO_ROOT', root)
+    return root, tmp_path / 'target'
+
+def deploy(target, *flags):
+    return delta_deploy.main(['--target', str(target), '--exit-status', *flags])
+
+def delta(root, target):
+    deployer = DeltaDeploy(root, target, target / MANIFEST_NAME)
+    return deployer.diff(deployer.scan())
+
+def test_first_deploy_ships_everything(repo):
+    root, target = repo
+    assert deploy(target) == RELOAD_EXIT_STATUS
+    assert (target / 'scripts/spells.dsc').read_text() == SPELLS
+    assert (target / 'data/prices.yml').exists()
+    assert not (target / 'scripts/old.dsc.OFF').exists()
+    assert deploy(target) == 0
+
+def test_dry_run_transfers_nothing(repo):
+    root, target = repo
+    assert deploy(target, '--dry-run') == RELOAD_EXIT_STATUS
+    assert not target.exists()
+
+def test_files_and_containers_are_classified(repo, capsys):
+    root, target = repo
+    deploy(target)
+    write(root / 'scripts/spells.dsc', SPELLS.replace('narrate ice', 'narrate frost') +
+          "\nwind_task:\n    type: task\n    script:\n    - narrate wind\n")
+    (root / 'scripts/shop.dsc').unlink()
+    write(root / 'scripts/new.dsc', "new_world:\n    type: world\n")
+    write(root / 'data/prices.yml', "copper: 2\n")
+
+    capsys.readouterr()
+    assert deploy(target, '--json', '--dry-run') == RELOAD_EXIT_STATUS
+    result = json.loads(capsys.readouterr().out.split('\n🔎')[0])
+    assert result['added'] == ['scripts/new.dsc']
+    assert result['changed'] == ['data/prices.yml', 'scripts/spells.dsc']
+    assert result['removed'] == ['scripts/shop.dsc']
+    assert result['containers'] == {
+        'added': [['scripts/new.dsc', 'new_world'], ['scripts/spells.dsc', 'wind_task']],
+        'changed': [['scripts/spells.dsc', 'ice_task']],
+        'removed': [['scripts/shop.dsc', 'shop_task']],
+    }
+
+    assert deploy(target) == RELOAD_EXIT_STATUS
+    assert not (target / 'scripts/shop.dsc').exists()
+    assert (target / 'data/prices.yml').read_text() == "copper: 2\n"
+    assert deploy(target) == 0
+
+def test_comment_and_data_edits_need_no_reload(repo):
+    root, target = repo
+    deploy(target)
+    write(root / 'scripts/spells.dsc', "# Elemental spells\n" + SPELLS.replace('\n\n', '\n\n\n'))
+    write(root / 'data/prices.yml', "copper: 3\n")
+    result = delta(root, target)
+    assert result['changed'] == ['data/prices.yml', 'scripts/spells.dsc']
+    assert not result['reload_needed']
+    assert deploy(target) == 0
+    assert (target / 'scripts/spells.dsc').read_text().startswith("# Elemental")
+
+def test_touched_file_is_not_shipped(repo):
+    root, target = repo
+    deploy(target)
+    write(root / 'scripts/shop.dsc', SHOP)
+    assert delta(root, target)['changed'] == []
+
+def test_file_lost_on_target_is_shipped_again(repo):
+    root, target = repo
+    deploy(target)
+    (target / 'scripts/shop.dsc').unlink()
+    result = delta(root, target)
+    assert result['changed'] == ['scripts/shop.dsc']
+    assert not result['reload_needed']
+    deploy(target)
+    assert (target / 'scripts/shop.dsc').read_text() == SHOP
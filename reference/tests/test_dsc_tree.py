@@ -0,0 +1,108 @@
+"""
+Tests for the indentation-aware block tree that the per-handler reports walk
+"""
+
+from dsc_tree import parse_lines, split_args, split_key_value, evaluate_number
+
+SCRIPT = """# Mana regeneration
+mana_world:
+    type: world
+    debug: false
+    events:
+
+        # Every second
+        on delta time secondly:
+        - foreach <server.online_players> as:player:
+            # Skip the dead
+            - if <[player].is_dead>:
+                - foreach next
+            - else:
+                - ~run mana_task def.player:<[player]>
+
+mana_task:
+    type: task
+    definitions: player
+    script:
+    - repeat 5:
+        - wait 1t
+    - narrate done
+    data:
+        lore:
+        - first line
+        - second line
+"""
+
+def shape(node):
+    """(kind, name, line, children) with the children shaped the same way"""
+    return (node.kind, node.name, node.line, [shape(child) for child in node.children])
+
+def tree():
+    return parse_lines(SCRIPT.splitlines(keepends=True))
+
+def test_tree_shape():
+    assert shape(tree()) == ('root', '', 0, [
+        ('container', 'mana_world', 2, [
+            ('key', 'type', 3, []),
+            ('key', 'debug', 4, []),
+            ('key', 'events', 5, [
+                ('event', 'on delta time secondly', 8, [
+                    ('command', 'foreach', 9, [
+                        ('command', 'if', 11, [
+                            ('command', 'foreach', 12, []),
+                        ]),
+                        ('command', 'else', 13, [
+                            ('command', 'run', 14, []),
+                        ]),
+                    ]),
+                ]),
+            ]),
+        ]),
+        ('container', 'mana_task', 16, [
+            ('key', 'type', 17, []),
+            ('key', 'definitions', 18, []),
+            # The command list sits at the same indent as its key
+            ('key', 'script', 19, [
+                ('command', 'repeat', 20, [
+                    ('command', 'wait', 21, []),
+                ]),
+                ('command', 'narrate', 22, []),
+            ]),
+            ('key', 'data', 23, [
+                # Any list item is a command, named by its first word
+                ('key', 'lore', 24, [
+                    ('command', 'first', 25, []),
+                    ('command', 'second', 26, []),
+                ]),
+            ]),
+        ]),
+    ])
+
+def test_key_and_command_fields():
+    root = tree()
+    world = root.key('MANA_WORLD')
+    assert (world.key('type').args, world.key('debug').args) == ('world', 'false')
+    run = next(node for node in root.walk() if node.name == 'run')
+    assert run.args == 'mana_task def.player:<[player]>'
+    assert run.text == '- ~run mana_task def.player:<[player]>'
+    assert run.indent == 16
+    assert run.enclosing('event').name == 'on delta time secondly'
+    assert run.enclosing('container') is world
+    assert [loop.line for loop in run.loops()] == [9]
+    lore = root.key('mana_task').key('data').key('lore')
+    assert [command.text for command in lore.commands()] == ['- first line', '- second line']
+
+def test_walk_is_in_file_order():
+    lines = [node.line for node in tree().walk()][1:]
+    assert lines == sorted(lines)
+    assert 1 not in lines and 7 not in lines and 10 not in lines
+
+def test_split_args_and_key_values():
+    args = split_args('mana_task def.player:<[player].flag[a b]> "two words" save:x')
+    assert args == ['mana_task', 'def.player:<[player].flag[a b]>', '"two words"', 'save:x']
+    assert split_key_value('def.player:<[player].flag[a:b]>') == ('def.player', '<[player].flag[a:b]>')
+    assert split_key_value('mana_task') == ('mana_task', None)
+
+def test_evaluate_number():
+    assert evaluate_number('<element[<[n]>].mul[3]>', {'n': 2}) == 6
+    assert evaluate_number('<[count]>', {'count': 4}) == 4
+    assert evaluate_number('<server.online_players.size>') is None
@@ -0,0 +1,58 @@
+"""
+Tests for the AnalysisIndex-backed doc generators and the warnings that
+share their read/write classification
+"""
+
+import pytest
+
+from analysis_index import AnalysisIndex
+from analyze_warnings import find_warnings
+import generate_docs
+
+READ = '- narrate "<player.flag[bank.gold]> gold"'
+WRITE = '- flag player purse.copper:1'
+
+def key(file, name, context):
+    return {'file': file, 'line': 3, 'key': name, 'scope': 'player', 'type': 'flag', 'context': context}
+
+@pytest.fixture
+def data():
+    # A context mentioning 'flag' is not a write: only purse.copper is written
+    data_keys = [key(f"bank_{i}.dsc", 'player.flag.bank.gold', READ) for i in range(8)]
+    data_keys += [key(f"shop_{i}.dsc", 'player.flag.purse.copper', WRITE) for i in range(6)]
+    return {
+        'events': [{'file': 'bank_0.dsc', 'line': 2, 'type': 'on', 'event': 'player joins', 'indent': 4}],
+        'data_keys': data_keys,
+        'calls': [{'file': 'bank_0.dsc', 'line': 4, 'type': 'run', 'target': 'shop_task', 'context': '- run shop_task'}],
+        'scripts': [{'file': 'shop_0.dsc', 'line': 1, 'name': 'shop_task', 'type': 'task', 'end_line': 5}],
+    }
+
+@pytest.fixture
+def index(data):
+    return AnalysisIndex(data, {'Economy': ['bank_0.dsc', 'shop_0.dsc']})
+
+def test_index_classifies_with_key_access(index):
+    gold = index.key_info['player.flag.bank.gold']
+    copper = index.key_info['player.flag.purse.copper']
+    assert (len(gold['readers']), len(gold['writers'])) == (8, 0)
+    assert (len(copper['readers']), len(copper['writers'])) == (0, 6)
+
+def test_concurrent_writes_agrees_with_the_index(data, tmp_path):
+    warnings = {w['type']: w for w in find_warnings(data, tmp_path)}
+    assert warnings['concurrent_writes']['examples'] == ['player.flag.purse.copper (6 writers)']
+
+def test_generators_write_their_docs(index, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'docs').mkdir()
+    generate_docs.generate_system_map(index)
+    generate_docs.generate_data_keys(index)
+    generate_docs.generate_event_index(index)
+    generate_docs.generate_call_graph(index)
+
+    data_keys = (tmp_path / 'docs/DATA_KEYS.md').read_text()
+    assert "| `player.flag.bank.gold` | flag | player | 8 | 0 |" in data_keys
+    assert "- `player.flag.purse.copper`: 6 different files write to this" in data_keys
+    assert "bank.gold`: " not in data_keys
+    assert "player joins" in (tmp_path / 'docs/EVENT_INDEX.md').read_text()
+    assert "shop_task" in (tmp_path / 'docs/CALL_GRAPH.md').read_text()
+    assert "Economy" in (tmp_path / 'docs/SYSTEM_MAP.md').read_text()
@@ -0,0 +1,39 @@
+"""
+Tests for the hoisting report on the live scripts/ tree
+"""
+
+from pathlib import Path
+
+import pytest
+
+from analyze_denizen import DenizenAnalyzer
+from hoist_lookups import HoistLookups, lookup_keys
+from dsc_tags import parse_tags
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+@pytest.fixture(scope='module')
+def report():
+    analyzer = DenizenAnalyzer(REPO_ROOT, compact=True)
+    analyzer.analyze_all()
+    return HoistLookups(analyzer.store, REPO_ROOT).report()
+
+def test_path_prefix_costs_a_deep_get():
+    tag = parse_tags('<[player].flag[stat.mana.max]||20>')[0]
+    keys = {text: (rest, added) for text, rest, _cost, _hint, added in lookup_keys(tag)}
+    assert keys['[player].flag[stat.mana.max]'] == ('', 0)
+    assert keys['[player].flag[stat.mana]'] == ('deep_get[max]', 1)
+
+def test_prefix_that_does_not_pay_off_is_dropped(report):
+    # mana_tick_task reads stat.mana.max and stat.mana.current: a define of
+    # flag[stat.mana] plus two deep_gets costs more than the two reads
+    lines = {(f['file'], f['line']) for f in report['findings']}
+    assert ('scripts/magic_handler.dsc', 208) not in lines
+
+def test_prefix_saving_subtracts_deep_gets(report):
+    finding = next(f for f in report['findings'] if f['script'] == 'cast_spell_task')
+    assert finding['kind'] == 'prefix'
+    uses = [u['replacement'] for u in finding['uses']]
+    added = sum('deep_get[' in use for use in uses)
+    per_run = finding['cost'] * (finding['repeats'] - 1) - added
+    assert finding['projection'][200]['saved'] == pytest.approx(per_run * finding['projection'][200]['runs'])
@@ -0,0 +1,76 @@
+"""
+Tests for the query daemon's in-memory index
+"""
+
+import pytest
+
+from analysis_db import build_database, query
+from query_daemon import QueryIndex
+
+def result(rel, keys=(), calls=(), scripts=(), events=()):
+    return (rel, list(events),
+            [(line, key, 'player', 'flag', context) for line, key, context in keys],
+            [(line, 'run', target, f"- run {target}") for line, target in calls],
+            [(line, name, 'task', end_line) for line, name, end_line in scripts])
+
+OLD = result('quests.dsc',
+             keys=[(3, 'player.flag.quest.stage', '- narrate <player.flag[quest.stage]>'),
+                   (4, 'player.flag.quest[a].x', '- flag player quest[a].x:1')],
+             calls=[(5, 'reward_task')],
+             scripts=[(1, 'Quest_Task', 9)],
+             events=[(2, 'on', 'player joins', 4)])
+NEW = result('quests.dsc',
+             keys=[(7, 'player.flag.quest.reward', '- narrate <player.flag[quest.reward]>')],
+             scripts=[(6, 'quest_task', 12)])
+OTHER = result('rewards.dsc',
+               keys=[(2, 'player.flag.quest.stage', '- narrate <player.flag[quest.stage]>'),
+                     (3, 'player.flag.questa].x', '- narrate <player.flag[questa].x]>')],
+               calls=[(4, 'reward_task')])
+
+@pytest.fixture
+def index():
+    index = QueryIndex()
+    index.replace('quests.dsc', OLD)
+    index.replace('rewards.dsc', OTHER)
+    return index
+
+def test_replace_drops_stale_records(index):
+    index.replace('quests.dsc', NEW)
+    assert index.query('readers', 'player.flag.quest.stage') == [
+        ('rewards.dsc', 2, 'player.flag.quest.stage', '- narrate <player.flag[quest.stage]>')]
+    assert index.query('readers', 'player.flag.quest.*') == [
+        ('quests.dsc', 7, 'player.flag.quest.reward', '- narrate <player.flag[quest.reward]>'),
+        ('rewards.dsc', 2, 'player.flag.quest.stage', '- narrate <player.flag[quest.stage]>')]
+    assert index.query('writers', 'player.flag.quest[a].x') == []
+    assert index.query('callers', 'reward_task') == [('rewards.dsc', 4, 'run', '- run reward_task')]
+    assert index.query('events', 'player joins') == []
+    assert index.query('definition', 'QUEST_TASK') == [('quests.dsc', 6, 12, 'task', 'quest_task')]
+    assert 'player.flag.quest[a].x' not in index.maps['writers']
+    assert 'player joins' not in index.maps['events']
+    assert index.records == 5
+
+def test_replace_with_none_drops_the_file(index):
+    index.replace('quests.dsc', None)
+    assert list(index.files) == ['rewards.dsc']
+    assert index.records == 3
+    assert index.query('definition', 'quest_task') == []
+
+def test_prefix_is_literal(index):
+    # As a glob, [a] would also match questa].x
+    assert index.query('writers', 'player.flag.quest[a]*') == [
+        ('quests.dsc', 4, 'player.flag.quest[a].x', '- flag player quest[a].x:1')]
+
+def test_rows_match_analysis_db(index, tmp_path):
+    data = {'events': [], 'data_keys': [], 'calls': [], 'scripts': []}
+    for rel, events, data_keys, calls, scripts in index.files.values():
+        data['events'] += [{'file': rel, 'line': l, 'type': t, 'event': e, 'indent': i} for l, t, e, i in events]
+        data['data_keys'] += [{'file': rel, 'line': l, 'key': k, 'scope': s, 'type': t, 'context': c}
+                              for l, k, s, t, c in data_keys]
+        data['calls'] += [{'file': rel, 'line': l, 'type': t, 'target': g, 'context': c} for l, t, g, c in calls]
+        data['scripts'] += [{'file': rel, 'line': l, 'name': n, 'type': t, 'end_line': e}
+                            for l, n, t, e in scripts]
+    db = tmp_path / 'analysis.db'
+    build_database(data, db)
+    for kind, name in [('readers', 'player.flag.quest*'), ('writers', 'player.flag.quest[a]*'),
+                       ('callers', 'reward_task'), ('definition', 'quest_task'), ('events', 'player joins')]:
+        assert index.query(kind, name) == query(db, kind, name), (kind, name)
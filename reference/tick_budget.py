@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Static tick budget for timer-driven Denizen handlers
+Follows the call graph from every timer event and projects work per second by player count
+"""
+
+import re
+import json
+import argparse
+from collections import defaultdict
+
+from analyze_denizen import load_analysis
+from definitions import DefinitionIndex, target_script
+from dsc_tags import TAG_START
+from dsc_tree import TreeCache, LOOP_COMMANDS, evaluate_number
+
+PLAYER_COUNTS = (1, 50, 200, 500)
+METRICS = ('commands', 'flag_reads', 'flag_writes', 'tags')
+
+FLAG_READ = re.compile(r'\b(?:has_)?flag(?:_expiration)?\[')
+EVERY = re.compile(r'\bevery:(\d+(?:\.\d+)?)')
+
+# Lists that grow with the number of online players
+PLAYER_LISTS = ('<server.online_players>', '<server.players>')
+
+def timer_frequency(event):
+    """Firings per second for a timer event, or None if it isn't one"""
+    event = event.lower()
+    if event.startswith(('delta time secondly', 'system time secondly')):
+        base = 1.0
+    elif event.startswith('delta time minutely'):
+        base = 1 / 60
+    elif event.startswith('delta time hourly'):
+        base = 1 / 3600
+    elif event == 'tick' or event.startswith('tick '):
+        base = 20.0
+    else:
+        return None
+    every = EVERY.search(event)
+    return base / float(every.group(1)) if every else base
+
+def line_cost(node):
+    """Metric counts for executing one command line once"""
+    text = node.text
+    return {
+        'commands': 1,
+        'flag_reads': len(FLAG_READ.findall(text)),
+        'flag_writes': 1 if node.name == 'flag' else 0,
+        'tags': len(TAG_START.findall(text)),
+    }
+
+# Costs are polynomials in the online player count P: [c0, c1, c2, ...]
+def poly_mul(a, b):
+    out = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                out[i + j] += x * y
+    return out
+
+def poly_add_into(target, poly, scale=1):
+    if len(target) < len(poly):
+        target.extend([0] * (len(poly) - len(target)))
+    for i, x in enumerate(poly):
+        target[i] += x * scale
+
+def poly_eval(poly, players):
+    return sum(c * players ** i for i, c in enumerate(poly))
+
+class HandlerWalker:
+    """Locates handler and task bodies in the block trees for static walks"""
+
+    def __init__(self, data, root_dir=".", trees=None):
+        self.data = data
+        self.definitions = DefinitionIndex(data.get('scripts', []))
+        self.trees = trees if trees is not None else TreeCache(root_dir)
+        self.assumptions = defaultdict(set)
+
+    def event_node(self, event):
+        container = self.definitions.container_at(event['file'], event['line'])
+        if container is None:
+            return None
+        tree = self.trees.get(event['file'])
+        for node in tree.walk():
+            if node.line == event['line']:
+                return node
+        return None
+
+    def script_body(self, target):
+        """Command list a run/inject target executes, and the script's name"""
+        name = target_script(target)
+        if name is None:
+            return None, None
+        definition = self.definitions.lookup(name)
+        if definition is None:
+            return None, name
+        node = self.trees.container(definition['file'], definition['name'])
+        if node is None:
+            return None, name
+        parts = target.split('.')[1:] or ['script']
+        for part in parts:
+            node = node.key(part) if node is not None else None
+        return node, name
+
+    def track_define(self, args, env):
+        """Keep env in step with `define name <value>` for values that fold to a number"""
+        parts = args.split(None, 1)
+        if len(parts) == 2:
+            value = evaluate_number(parts[1], env)
+            if value is None:
+                env.pop(parts[0], None)
+            else:
+                env[parts[0]] = value
+
+    def repeat_count(self, args, env, script):
+        value = args.split()[0] if args else ''
+        count = evaluate_number(value, env)
+        if count is None:
+            self.assumptions[script].add(f"repeat {value} counted once")
+            return 1
+        return count
+
+    def loop_multiplier(self, name, args, env, script):
+        """Times a repeat/foreach/while body runs, as a polynomial in P"""
+        if name == 'repeat':
+            return [self.repeat_count(args, env, script)]
+        if name == 'foreach':
+            if args.split(' as:')[0].strip().lower() in PLAYER_LISTS:
+                return [0, 1]
+            self.assumptions[script].add(f"foreach over {args.split(' as:')[0][:40]} counted once")
+        elif name == 'while':
+            self.assumptions[script].add("while loop counted once")
+        return [1]
+
+class TickBudget(HandlerWalker):
+    """Walks timer handlers and the tasks they run, accumulating weighted costs
+
+    Every branch of an if/else is counted (an upper bound), repeat counts come
+    from literals or earlier `define name <number>` lines, and a foreach over
+    the online players multiplies its body by P. Recursive runs stop at the
+    first repeat visit.
+    """
+
+    def handler_costs(self, event):
+        """Per-firing cost polynomials for one handler: totals and per-script"""
+        totals = {m: [0] for m in METRICS}
+        contributions = defaultdict(lambda: {m: [0] for m in METRICS})
+        try:
+            node = self.event_node(event)
+        except OSError:
+            self.assumptions[event['file']].add("source not available")
+            return totals, contributions
+        if node is None:
+            return totals, contributions
+        label = self.definitions.container_at(event['file'], event['line'])[2]
+        self.walk(node.children, [1], label, {}, (label,), totals, contributions)
+        return totals, contributions
+
+    def walk(self, nodes, mult, script, env, stack, totals, contributions):
+        for node in nodes:
+            if node.kind != 'command':
+                continue
+            cost = line_cost(node)
+            for metric, count in cost.items():
+                if count:
+                    poly_add_into(totals[metric], mult, count)
+                    poly_add_into(contributions[script][metric], mult, count)
+
+            name = node.name
+            args = node.args.rstrip(':').strip()
+            if name == 'define':
+                self.track_define(args, env)
+
+            child_mult = mult
+            if name in LOOP_COMMANDS:
+                child_mult = poly_mul(mult, self.loop_multiplier(name, args, env, script))
+
+            if node.children:
+                self.walk(node.children, child_mult, script, env, stack, totals, contributions)
+
+            if name in ('run', 'inject') and args:
+                target = args.split()[0]
+                body, target_name = self.script_body(target)
+                if body is None:
+                    if target_name:
+                        self.assumptions[script].add(f"{name} {target} not resolved")
+                    continue
+                if target_name in stack:
+                    continue
+                self.walk(body.children, mult, target_name, env if name == 'inject' else {},
+                          stack + (target_name,), totals, contributions)
+
+    def report(self):
+        handlers = []
+        scripts = defaultdict(lambda: {m: [0] for m in METRICS})
+        for event in self.data['events']:
+            frequency = timer_frequency(event['event'])
+            if frequency is None:
+                continue
+            totals, contributions = self.handler_costs(event)
+            for script, cost in contributions.items():
+                for metric, poly in cost.items():
+                    poly_add_into(scripts[script][metric], poly, frequency)
+            handlers.append({
+                'file': event['file'],
+                'line': event['line'],
+                'event': event['event'],
+                'per_second': frequency,
+                'per_tick': totals,
+                'projection': {p: {m: poly_eval(totals[m], p) * frequency for m in METRICS}
+                               for p in PLAYER_COUNTS},
+            })
+
+        handlers.sort(key=lambda h: -h['projection'][200]['commands'])
+        contributors = sorted(
+            ({'script': name,
+              'projection': {p: {m: poly_eval(cost[m], p) for m in METRICS} for p in PLAYER_COUNTS}}
+             for name, cost in scripts.items()),
+            key=lambda c: -c['projection'][200]['commands'])
+
+        return {
+            'player_counts': list(PLAYER_COUNTS),
+            'handlers': handlers,
+            'contributors': contributors,
+            'assumptions': {k: sorted(v) for k, v in sorted(self.assumptions.items())},
+        }
+
+def format_poly(poly):
+    terms = []
+    for power, coeff in enumerate(poly):
+        if not coeff:
+            continue
+        coeff = f"{coeff:g}"
+        terms.append(coeff if power == 0 else f"{coeff}·P" if power == 1 else f"{coeff}·P^{power}")
+    return " + ".join(terms) or "0"
+
+def generate_markdown(report):
+    lines = [
+        "# Tick Budget",
+        "",
+        "**Purpose:** Static estimate of the work timer-driven handlers schedule every second.",
+        "",
+        "Costs follow run/inject calls from each timer event. All if/else branches are counted (upper bound);",
+        "`foreach <server.online_players>` multiplies its body by the player count P.",
+        "",
+        "---",
+        "",
+        "## Timer Handlers",
+        "",
+        "| Handler | Event | Fires/s | Commands per firing | Flag writes per firing |",
+        "|---------|-------|---------|---------------------|------------------------|",
+    ]
+    for h in report['handlers']:
+        lines.append(f"| [{h['file']}:{h['line']}]({h['file']}#L{h['line']}) | `{h['event'][:50]}` | "
+                     f"{h['per_second']:g} | {format_poly(h['per_tick']['commands'])} | "
+                     f"{format_poly(h['per_tick']['flag_writes'])} |")
+
+    lines.extend(["", "---", "", "## Projected Work per Second", ""])
+    header = "| Players | Commands/s | Flag reads/s | Flag writes/s | Tag evaluations/s |"
+    lines.extend([header, "|---------|------------|--------------|---------------|-------------------|"])
+    for players in report['player_counts']:
+        total = {m: sum(h['projection'][players][m] for h in report['handlers']) for m in METRICS}
+        lines.append(f"| {players} | {total['commands']:,.0f} | {total['flag_reads']:,.0f} | "
+                     f"{total['flag_writes']:,.0f} | {total['tags']:,.0f} |")
+
+    lines.extend([
+        "",
+        "---",
+        "",
+        "## Top Contributors (200 players)",
+        "",
+        "| Script | Commands/s | Flag reads/s | Flag writes/s | Tag evaluations/s |",
+        "|--------|------------|--------------|---------------|-------------------|",
+    ])
+    for c in report['contributors'][:20]:
+        p = c['projection'][200]
+        lines.append(f"| `{c['script']}` | {p['commands']:,.0f} | {p['flag_reads']:,.0f} | "
+                     f"{p['flag_writes']:,.0f} | {p['tags']:,.0f} |")
+
+    if report['assumptions']:
+        lines.extend(["", "---", "", "## Assumptions", ""])
+        for script, notes in report['assumptions'].items():
+            lines.append(f"- `{script}`: " + "; ".join(notes))
+
+    lines.append("")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Static tick budget for timer-driven handlers")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    parse_args(argv)
+    data = load_analysis(compact=True)
+    report = TickBudget(data).report()
+
+    with open('docs/tick_budget.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    with open('docs/TICK_BUDGET.md', 'w') as f:
+        f.write(generate_markdown(report))
+
+    print(f"✓ Budgeted {len(report['handlers'])} timer handlers")
+    for players in report['player_counts']:
+        commands = sum(h['projection'][players]['commands'] for h in report['handlers'])
+        print(f"  {players:>4} players: {commands:,.0f} commands/s")
+    print("✓ Generated docs/TICK_BUDGET.md and docs/tick_budget.json")
+
+if __name__ == "__main__":
+    main()
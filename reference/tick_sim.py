@@ -0,0 +1,1309 @@
+#!/usr/bin/env python3
+"""
+Offline discrete-event simulator for timer and player-driven handlers
+Interprets the command subset the game loops use against N synthetic players
+and reports commands per tick, queue overlap and flag-store size
+"""
+
+import re
+import sys
+import json
+import heapq
+import random
+import argparse
+from collections import defaultdict, Counter
+
+from analyze_denizen import load_analysis
+from dsc_tags import TAG_START
+from dsc_tree import split_key_value, parse_duration
+from tick_budget import HandlerWalker, timer_frequency
+from wait_loops import PLAYER_EVENT_RATES
+
+TICKS_PER_SECOND = 20
+CLICK_EVENTS = ('player right clicks',)
+# Right clicks per player per second
+CLICK_RATE = 0.5
+# A queue that runs this many commands without waiting is treated as stuck
+STEP_LIMIT = 100000
+WHILE_LIMIT = 10000
+
+COMPARISONS = ('==', '!=', '<', '>', '<=', '>=')
+# <red>, <&b>, <&color[#fff]>: formatting only, always empty here
+FORMAT_TAGS = {
+    'black', 'dark_blue', 'dark_green', 'dark_aqua', 'dark_red', 'dark_purple', 'gold', 'gray',
+    'dark_gray', 'blue', 'green', 'aqua', 'red', 'light_purple', 'yellow', 'white', 'reset',
+    'bold', 'italic', 'underline', 'strike', 'obfuscated', 'magic', 'n', 'r',
+}
+
+class TagError(Exception):
+    """A tag failed to resolve; its || fallback applies"""
+
+class StopQueue(Exception):
+    """`stop`, a non-passive `determine` or a ratelimit ends the queue"""
+
+class LoopControl(Exception):
+    def __init__(self, action):
+        super().__init__(action)
+        self.action = action
+
+class Determine(Exception):
+    def __init__(self, value):
+        super().__init__(value)
+        self.value = value
+
+def fmt(value):
+    """Element text for a value, as Denizen would print it"""
+    if value is None:
+        return 'null'
+    if value is True or value is False:
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, list):
+        return '|'.join(fmt(v) for v in value)
+    if isinstance(value, dict):
+        return '[' + ';'.join(f"{k}={fmt(v)}" for k, v in value.items()) + ']'
+    return str(value)
+
+def number(value):
+    """Float for a numeric value, or raise TagError"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value))
+    except ValueError:
+        raise TagError(f"{fmt(value)} is not a number")
+
+def truthy(value):
+    return value is True or (isinstance(value, str) and value.lower() == 'true')
+
+def as_list(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        return list(value.values())
+    if isinstance(value, str):
+        return value.split('|')
+    return [value]
+
+def tag_end(text, start):
+    """Index just past the '>' closing the tag opened at start"""
+    depth = 0
+    i = start
+    while i < len(text):
+        ch = text[i]
+        if ch == '<' and TAG_START.match(text, i):
+            depth += 1
+        elif ch == '>':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(text)
+
+def split_words(text):
+    """Split on spaces outside tags and quotes; a bare `<` stays an operator"""
+    words = []
+    i = start = 0
+    quote = None
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '<' and TAG_START.match(text, i):
+            i = tag_end(text, i)
+            continue
+        elif ch == ' ':
+            if i > start:
+                words.append(text[start:i].strip('"'))
+            start = i + 1
+        i += 1
+    if start < len(text):
+        words.append(text[start:].strip('"'))
+    return words
+
+def split_top(text, sep):
+    """Split on sep outside [brackets] and <tags>"""
+    parts = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in '[<':
+            depth += 1
+        elif ch in ']>':
+            depth = max(depth - 1, 0)
+        elif depth == 0 and text.startswith(sep, i):
+            parts.append(text[start:i])
+            i += len(sep)
+            start = i
+            continue
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+def parse_tag(body):
+    """(parts, fallback) for a tag body: [(name, arg or None)], fallback text or None"""
+    pieces = split_top(body, '||')
+    fallback = '||'.join(pieces[1:]) if len(pieces) > 1 else None
+    parts = []
+    for part in split_top(pieces[0], '.'):
+        bracket = part.find('[')
+        if bracket == -1:
+            parts.append((part, None))
+        else:
+            end = part.rfind(']')
+            parts.append((part[:bracket] or '[]', part[bracket + 1:end if end > bracket else len(part)]))
+    return parts, fallback
+
+class FlagStore:
+    """Flags on one object: dotted key -> (value, expiry tick or None)"""
+
+    def __init__(self):
+        self.flags = {}
+
+    def live(self, key, now):
+        entry = self.flags.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.flags[key]
+            return None
+        return entry
+
+    def get(self, key, now):
+        entry = self.live(key, now)
+        if entry is not None:
+            return entry[0]
+        prefix = key + '.'
+        children = {k[len(prefix):]: v[0] for k, v in self.flags.items()
+                    if k.startswith(prefix) and (v[1] is None or v[1] > now)}
+        if not children:
+            raise TagError(f"no flag {key}")
+        return children
+
+    def has(self, key, now):
+        if self.live(key, now) is not None:
+            return True
+        prefix = key + '.'
+        return any(k.startswith(prefix) and (v[1] is None or v[1] > now) for k, v in self.flags.items())
+
+    def expiration(self, key, now):
+        entry = self.live(key, now)
+        if entry is None or entry[1] is None:
+            raise TagError(f"flag {key} does not expire")
+        return TimeTag(entry[1])
+
+    def set(self, key, value, expires):
+        prefix = key + '.'
+        for k in [k for k in self.flags if k.startswith(prefix)]:
+            del self.flags[k]
+        self.flags[key] = (value, expires)
+
+    def remove(self, key):
+        self.flags.pop(key, None)
+        prefix = key + '.'
+        for k in [k for k in self.flags if k.startswith(prefix)]:
+            del self.flags[k]
+
+    def purge(self, now):
+        for k in [k for k, v in self.flags.items() if v[1] is not None and v[1] <= now]:
+            del self.flags[k]
+
+    def size_bytes(self):
+        return sum(len(k) + len(fmt(v[0])) for k, v in self.flags.items())
+
+class SimObject:
+    """Base for simulated objects; tag_<name>(sim, arg) resolves a property"""
+    flags = None
+
+    def tag_flag(self, sim, arg):
+        return self.flags.get(arg, sim.tick)
+
+    def tag_has_flag(self, sim, arg):
+        return self.flags.has(arg, sim.tick)
+
+    def tag_flag_expiration(self, sim, arg):
+        return self.flags.expiration(arg, sim.tick)
+
+class Server(SimObject):
+    def __init__(self, players):
+        self.flags = FlagStore()
+        self.players = players
+
+    def __str__(self):
+        return 'server'
+
+    def tag_online_players(self, sim, arg):
+        return list(self.players)
+
+    tag_players = tag_online_players
+
+class Entity(SimObject):
+    """A living mob for right-click and target tags"""
+
+    def __init__(self, name):
+        self.name = name
+        self.flags = FlagStore()
+
+    def __str__(self):
+        return f"e@{self.name}"
+
+    def tag_is_living(self, sim, arg):
+        return True
+
+    def tag_is_spawned(self, sim, arg):
+        return True
+
+    def tag_name(self, sim, arg):
+        return self.name
+
+    tag_uuid = tag_name
+
+    def tag_health(self, sim, arg):
+        return 20.0
+
+class Player(Entity):
+    """A synthetic player
+
+    Sneaking players stand still (the meditation path); the rest walk one
+    block every 4 ticks. Everyone holds nothing in the main hand and a
+    spellbook in the offhand, so right clicks reach the casting path.
+    """
+
+    def __init__(self, index, sneaking):
+        super().__init__(f"player_{index}")
+        self.index = index
+        self.sneaking = sneaking
+        self.slot = 1
+        self.target = Entity(f"target_{index}")
+
+    def __str__(self):
+        return f"p@{self.name}"
+
+    def tag_location(self, sim, arg):
+        x = self.index * 16 if self.sneaking else self.index * 16 + sim.tick // 4
+        return f"{x},64,{self.index * 16},world"
+
+    def tag_is_sneaking(self, sim, arg):
+        return self.sneaking
+
+    def tag_is_online(self, sim, arg):
+        return True
+
+    tag_is_player = tag_is_online
+
+    def tag_as_player(self, sim, arg):
+        return self
+
+    tag_as_entity = tag_as_player
+
+    def tag_held_item_slot(self, sim, arg):
+        return float(self.slot)
+
+    def tag_item_in_hand(self, sim, arg):
+        return Item('air')
+
+    def tag_item_in_offhand(self, sim, arg):
+        return Item('knowledge_book', spellbook=True)
+
+    def tag_target(self, sim, arg):
+        return self.target
+
+    def tag_food_level(self, sim, arg):
+        return 20.0
+
+    def tag_saturation(self, sim, arg):
+        return 5.0
+
+class Item(SimObject):
+    def __init__(self, material, **flags):
+        self.material = material
+        self.flags = FlagStore()
+        for key, value in flags.items():
+            self.flags.set(key, value, None)
+
+    def __str__(self):
+        return f"i@{self.material}"
+
+    def tag_material(self, sim, arg):
+        return Material(self.material)
+
+class Material(SimObject):
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return f"m@{self.name}"
+
+    def tag_name(self, sim, arg):
+        return self.name
+
+class TimeTag(SimObject):
+    def __init__(self, tick):
+        self.at = tick
+
+    def __str__(self):
+        return f"time@{self.at}"
+
+    def tag_from_now(self, sim, arg):
+        return Duration((self.at - sim.tick) / TICKS_PER_SECOND)
+
+class Duration(SimObject):
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __str__(self):
+        return f"d@{fmt(self.seconds)}s"
+
+    def tag_formatted(self, sim, arg):
+        return f"{fmt(round(self.seconds, 1))}s"
+
+    def tag_in_seconds(self, sim, arg):
+        return self.seconds
+
+class ScriptRef(SimObject):
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return f"s@{self.name}"
+
+    def tag_name(self, sim, arg):
+        return self.name
+
+    def tag_data_key(self, sim, arg):
+        definition = sim.definitions.lookup(self.name)
+        node = sim.trees.container(definition['file'], definition['name']) if definition else None
+        for part in arg.split('.'):
+            node = node.key(part) if node is not None else None
+        if node is None:
+            raise TagError(f"no data key {arg}")
+        return key_value(node)
+
+class RandomTag(SimObject):
+    """util.random.int[a].to[b] / util.random.decimal[a].to[b]"""
+
+    def __init__(self, kind=None, low=None):
+        self.kind = kind
+        self.low = low
+
+    def tag_int(self, sim, arg):
+        return RandomTag('int', number(arg))
+
+    def tag_decimal(self, sim, arg):
+        return RandomTag('decimal', number(arg))
+
+    def tag_to(self, sim, arg):
+        high = number(arg)
+        if self.kind == 'int':
+            low, high = sorted((int(self.low), int(high)))
+            return float(sim.rng.randint(low, high))
+        return sim.rng.uniform(self.low, high)
+
+class Util(SimObject):
+    def tag_random(self, sim, arg):
+        return RandomTag()
+
+    def tag_random_chance(self, sim, arg):
+        return sim.rng.random() * 100 < number(arg)
+
+def key_value(node):
+    """Value of a data key: text, a list for `- item` children, or a map"""
+    if node.args:
+        return node.args.strip('"')
+    commands = node.commands()
+    if commands:
+        return [c.text[1:].strip().strip('"') for c in commands]
+    return {child.name: key_value(child) for child in node.children if child.kind in ('key', 'event')}
+
+def element_tag(sim, value, name, arg):
+    """Properties of plain values: numbers, text, lists and maps"""
+    if isinstance(value, list):
+        if name == 'size':
+            return float(len(value))
+        if name == 'get':
+            index = int(number(arg))
+            if not 1 <= index <= len(value):
+                raise TagError(f"list index {index} out of range")
+            return value[index - 1]
+        if name == 'contains':
+            wanted = {s.lower() for s in arg.split('|')}
+            return any(fmt(v).lower() in wanted for v in value)
+        if name == 'is_empty':
+            return not value
+        if name == 'any':
+            return bool(value)
+        if name in ('first', 'last', 'random'):
+            if not value:
+                raise TagError("empty list")
+            return sim.rng.choice(value) if name == 'random' else value[0 if name == 'first' else -1]
+    elif isinstance(value, dict):
+        if name == 'keys':
+            return list(value)
+        if name == 'values':
+            return list(value.values())
+        if name == 'get':
+            if arg not in value:
+                raise TagError(f"no map key {arg}")
+            return value[arg]
+        if name == 'size':
+            return float(len(value))
+        if name == 'contains':
+            return arg in value
+        if name == 'is_empty':
+            return not value
+
+    if name == 'exists':
+        return value is not None
+    if name == 'not':
+        return not truthy(value)
+    if name == 'is_truthy':
+        return value is not None and value is not False and fmt(value).lower() not in ('false', 'null', '')
+    if name == 'equals':
+        return fmt(value).lower() == arg.lower()
+    if name in ('simple', 'as_element', 'as_list', 'as_map'):
+        return value
+    if name in ('contains', 'contains_text'):
+        return arg.lower() in fmt(value).lower()
+    if name == 'length':
+        return float(len(fmt(value)))
+
+    if name in NUMBER_TAGS:
+        return NUMBER_TAGS[name](number(value), arg)
+    raise UnsupportedTag(name)
+
+def divide(a, b):
+    if b == 0:
+        raise TagError("division by zero")
+    return a / b
+
+NUMBER_TAGS = {
+    'add': lambda v, arg: v + number(arg),
+    'sub': lambda v, arg: v - number(arg),
+    'mul': lambda v, arg: v * number(arg),
+    'div': lambda v, arg: divide(v, number(arg)),
+    'mod': lambda v, arg: v % number(arg),
+    'min': lambda v, arg: min(v, number(arg)),
+    'max': lambda v, arg: max(v, number(arg)),
+    'power': lambda v, arg: v ** number(arg),
+    'sqrt': lambda v, arg: v ** 0.5 if v >= 0 else divide(0, 0),
+    'abs': lambda v, arg: abs(v),
+    'round': lambda v, arg: float(round(v)),
+    'round_up': lambda v, arg: float(-(-v // 1)),
+    'round_down': lambda v, arg: float(v // 1),
+    'round_to': lambda v, arg: round(v, int(number(arg))),
+    'is_integer': lambda v, arg: v.is_integer(),
+}
+
+class UnsupportedTag(TagError):
+    """A tag the simulator does not model; recorded as an assumption"""
+
+class Frame:
+    """One script's execution state: definitions, linked player and event context"""
+    __slots__ = ('script', 'defs', 'player', 'context', 'proc')
+
+    def __init__(self, script, player=None, context=None, defs=None, proc=False):
+        self.script = script
+        self.defs = defs if defs is not None else {}
+        self.player = player
+        self.context = context or {}
+        self.proc = proc
+
+class Queue:
+    __slots__ = ('id', 'script', 'handler', 'gen', 'started')
+
+    def __init__(self, qid, script, handler, gen, started):
+        self.id = qid
+        self.script = script
+        self.handler = handler
+        self.gen = gen
+        self.started = started
+
+class TickSimulator(HandlerWalker):
+    """Runs handlers tick by tick against synthetic players
+
+    Time advances in 50 ms ticks. Timer events fire on their interval,
+    movement events fire per walking player at the PLAYER_EVENT_RATES rate,
+    and right clicks fire at random at the click rate. A queue runs until it
+    waits; `run` starts a new queue at once, while `inject` and `~run`
+    continue in the caller's queue. Commands outside the modelled subset
+    are counted but have no effect, and tags that cannot be modelled fall
+    back to their `||` value (listed under assumptions).
+    """
+
+    def __init__(self, data, players=50, sneaking=0.25, click_rate=CLICK_RATE, seed=1,
+                 worlds=None, root_dir=".", trees=None):
+        super().__init__(data, root_dir, trees)
+        self.rng = random.Random(seed)
+        self.players = [Player(i + 1, i < round(players * sneaking)) for i in range(players)]
+        self.server = Server(self.players)
+        self.util = Util()
+        self.click_rate = click_rate
+        self.tick = 0
+        self.counting = True
+        self.heap = []
+        self.next_id = 0
+        self.live = {}
+        # Queues being stepped; a run inside one starts a nested queue
+        self.running = []
+        self.ratelimits = {}
+        self.step_commands = 0
+        self.tags = {}
+        self.words = {}
+        self.segments = {}
+
+        self.commands_by_script = Counter()
+        self.opaque = Counter()
+        self.queue_stats = defaultdict(lambda: {'started': 0, 'finished': 0, 'ticks': 0, 'max_ticks': 0})
+        self.handlers = []
+        self.skipped = Counter()
+        for event in data['events']:
+            container = self.definitions.container_at(event['file'], event['line'])
+            if container is None or (worlds and container[2] not in worlds):
+                continue
+            handler = self.handler(event, container[2])
+            if handler is None:
+                self.skipped[event['event']] += 1
+            else:
+                self.handlers.append(handler)
+
+    def handler(self, event, script):
+        """Firing schedule for an event, or None if it is not simulated"""
+        name = event['event'].lower()
+        handler = {'event': event, 'script': script, 'firings': 0, 'overlapping': 0,
+                   'roots': set(), 'live': 0, 'max_live': 0}
+        frequency = timer_frequency(name)
+        if frequency is not None:
+            handler['kind'] = 'timer'
+            handler['interval'] = max(1, round(TICKS_PER_SECOND / frequency))
+            return handler
+        for prefix, rate in PLAYER_EVENT_RATES:
+            if name.startswith(prefix):
+                handler['kind'] = 'movement'
+                handler['interval'] = max(1, round(TICKS_PER_SECOND / rate))
+                return handler
+        if name.startswith(CLICK_EVENTS):
+            handler['kind'] = 'click'
+            return handler
+        return None
+
+    # ---- scheduling
+
+    def run(self, seconds):
+        ticks = int(seconds * TICKS_PER_SECOND)
+        clicks = [h for h in self.handlers if h['kind'] == 'click']
+        click_chance = self.click_rate / TICKS_PER_SECOND
+        commands = []
+        live = []
+        flag_samples = []
+        for tick in range(ticks):
+            self.tick = tick
+            self.tick_commands = 0
+
+            while self.heap and self.heap[0][0] <= tick:
+                _, _, queue = heapq.heappop(self.heap)
+                self.step(queue)
+
+            for handler in self.handlers:
+                if handler['kind'] == 'timer':
+                    if tick % handler['interval'] == 0:
+                        self.fire(handler, None, {})
+                elif handler['kind'] == 'movement':
+                    for player in self.players:
+                        if not player.sneaking and (tick + player.index) % handler['interval'] == 0:
+                            self.fire(handler, player, {})
+            if clicks:
+                for player in self.players:
+                    if self.rng.random() < click_chance:
+                        player.slot = self.rng.randint(1, 9)
+                        self.fire(self.rng.choice(clicks), player,
+                                  {'entity': player.target, 'location': player.tag_location(self, None)})
+
+            commands.append(self.tick_commands)
+            live.append(len(self.live))
+            if tick % TICKS_PER_SECOND == 0:
+                flag_samples.append(self.flag_store())
+        self.tick = ticks
+        flag_samples.append(self.flag_store())
+        return commands, live, flag_samples
+
+    def fire(self, handler, player, context):
+        node = handler.get('node')
+        if node is None:
+            try:
+                node = handler['node'] = self.event_node(handler['event'])
+            except OSError:
+                node = None
+            if node is None:
+                self.assumptions[handler['script']].add("source not available")
+                return
+        handler['firings'] += 1
+        if handler['roots']:
+            handler['overlapping'] += 1
+        frame = Frame(handler['script'], player, context)
+        queue = self.start(self.execute(node.children, frame), handler['script'], handler)
+        if queue is not None:
+            handler['roots'].add(queue.id)
+
+    def start(self, gen, script, handler, delay=0):
+        """Create a queue and run it until its first wait; the queue if it is still live"""
+        self.next_id += 1
+        queue = Queue(self.next_id, script, handler, gen, self.tick + delay)
+        self.live[queue.id] = queue
+        self.queue_stats[script]['started'] += 1
+        if handler is not None:
+            handler['live'] += 1
+            handler['max_live'] = max(handler['max_live'], handler['live'])
+        if delay:
+            heapq.heappush(self.heap, (self.tick + delay, queue.id, queue))
+            return queue
+        return queue if self.step(queue) else None
+
+    def step(self, queue):
+        """Resume a queue; True while it is still waiting"""
+        outer = self.step_commands
+        self.step_commands = 0
+        self.running.append(queue)
+        try:
+            ticks = next(queue.gen)
+        except (StopIteration, StopQueue):
+            self.finish(queue)
+            return False
+        except (LoopControl, Determine):
+            self.assumptions[queue.script].add("loop control or determine outside its block ends the queue")
+            self.finish(queue)
+            return False
+        finally:
+            self.running.pop()
+            self.step_commands = outer
+        heapq.heappush(self.heap, (self.tick + ticks, queue.id, queue))
+        return True
+
+    def finish(self, queue):
+        del self.live[queue.id]
+        stats = self.queue_stats[queue.script]
+        lifetime = self.tick - queue.started
+        stats['finished'] += 1
+        stats['ticks'] += lifetime
+        stats['max_ticks'] = max(stats['max_ticks'], lifetime)
+        if queue.handler is not None:
+            queue.handler['live'] -= 1
+            queue.handler['roots'].discard(queue.id)
+
+    def flag_store(self):
+        holders = [self.server] + self.players + [p.target for p in self.players]
+        for holder in holders:
+            holder.flags.purge(self.tick)
+        return {
+            'entries': sum(len(h.flags.flags) for h in holders),
+            'bytes': sum(h.flags.size_bytes() for h in holders),
+        }
+
+    # ---- interpreter
+
+    def count(self, frame, name):
+        self.step_commands += 1
+        if self.step_commands > STEP_LIMIT:
+            self.assumptions[frame.script].add(f"queue stopped after {STEP_LIMIT} commands without a wait")
+            raise StopQueue()
+        if self.counting:
+            self.tick_commands += 1
+            self.commands_by_script[frame.script] += 1
+
+    def execute(self, nodes, frame):
+        """Generator over a command list; yields the ticks each wait lasts"""
+        chain = None
+        for node in nodes:
+            if node.kind != 'command':
+                continue
+            name = node.name
+            args = node.args
+            if node.children and args.endswith(':'):
+                args = args[:-1].rstrip()
+
+            if name == 'else':
+                if chain is None or chain:
+                    continue
+                self.count(frame, name)
+                chain = True if not args.startswith('if ') else self.condition(args[3:], frame)
+                if chain:
+                    yield from self.execute(node.children, frame)
+                continue
+            self.count(frame, name)
+            if name == 'if':
+                chain = self.condition(args, frame)
+                if chain:
+                    yield from self.execute(node.children, frame)
+                continue
+            chain = None
+
+            if args in ('stop', 'next') and name in ('repeat', 'foreach', 'while'):
+                raise LoopControl(args)
+            if name in ('repeat', 'foreach', 'while'):
+                yield from self.loop(node, name, args, frame)
+            elif name == 'define':
+                self.define(args, frame)
+            elif name == 'flag':
+                self.flag(args, frame)
+            elif name == 'wait':
+                yield self.wait_ticks(args, frame)
+            elif name == 'waituntil':
+                yield from self.waituntil(args, frame)
+            elif name in ('run', 'inject'):
+                yield from self.call(node, name, args, frame)
+            elif name == 'stop':
+                raise StopQueue()
+            elif name == 'determine':
+                words = split_words(args)
+                if words and words[0].lower() == 'passively':
+                    continue
+                if frame.proc:
+                    raise Determine(self.value(args, frame))
+                raise StopQueue()
+            elif name == 'ratelimit':
+                self.ratelimit(node, args, frame)
+            else:
+                self.opaque[name] += 1
+
+    def loop(self, node, name, args, frame):
+        words = self.split(args)
+        options = dict(split_key_value(w) for w in words[1:] if split_key_value(w)[1] is not None)
+        if name == 'while':
+            items = range(WHILE_LIMIT)
+        elif name == 'repeat':
+            items = range(1, int(number(self.value(words[0], frame))) + 1 if words else 1)
+        else:
+            items = self.value(words[0], frame) if words else []
+            if isinstance(items, dict):
+                items = list(items.items())
+            else:
+                items = as_list(items)
+
+        for item in items:
+            if name == 'while':
+                if not self.condition(args, frame):
+                    break
+                frame.defs['loop_index'] = float(item + 1)
+            elif name == 'repeat':
+                frame.defs[options.get('as', 'value')] = float(item)
+            elif isinstance(item, tuple):
+                frame.defs[options.get('key', 'key')] = item[0]
+                frame.defs[options.get('as', 'value')] = item[1]
+            else:
+                frame.defs[options.get('as', 'value')] = item
+            try:
+                yield from self.execute(node.children, frame)
+            except LoopControl as control:
+                if control.action == 'stop':
+                    break
+        else:
+            if name == 'while':
+                self.assumptions[frame.script].add(f"while loop stopped after {WHILE_LIMIT} iterations")
+
+    def define(self, args, frame):
+        parts = args.split(None, 1)
+        if not parts:
+            return
+        if len(parts) == 1:
+            name, value = split_key_value(parts[0])
+            frame.defs[name] = self.value(value, frame) if value is not None else ''
+        else:
+            frame.defs[parts[0]] = self.value(parts[1], frame)
+
+    def holders(self, word, frame):
+        if word.lower() == 'player':
+            return [frame.player] if frame.player is not None else []
+        if word.lower() in ('server', '<server>'):
+            return [self.server]
+        value = self.value(word, frame)
+        return [v for v in (value if isinstance(value, list) else [value]) if isinstance(v, SimObject)]
+
+    def flag(self, args, frame):
+        words = self.split(args)
+        if len(words) < 2:
+            return
+        expires = None
+        for word in words[2:]:
+            option, value = split_key_value(word)
+            if option in ('expire', 'duration') and value is not None:
+                seconds = parse_duration(fmt(self.value(value, frame)))
+                if seconds is not None:
+                    expires = self.tick + max(1, round(seconds * TICKS_PER_SECOND))
+        key, value = split_key_value(words[1])
+        key = self.text(key, frame)
+        for holder in self.holders(words[0], frame):
+            self.apply_flag(holder.flags, key, value, expires, frame)
+
+    def apply_flag(self, store, key, value, expires, frame):
+        if value is None:
+            store.set(key, True, expires)
+            return
+        if value == '!':
+            store.remove(key)
+            return
+        try:
+            current = store.get(key, self.tick)
+        except TagError:
+            current = None
+        if value in ('++', '--'):
+            store.set(key, number(current or 0) + (1 if value == '++' else -1), expires)
+            return
+        op, operand = split_key_value(value)
+        if operand is not None and op in ('+', '-', '*', '/'):
+            amount = number(self.value(operand, frame))
+            base = number(current or 0)
+            result = {'+': base + amount, '-': base - amount, '*': base * amount,
+                      '/': divide(base, amount) if amount else base}[op]
+            store.set(key, result, expires)
+        elif operand is not None and op in ('->', '<-', '|'):
+            items = list(as_list(current))
+            raw = self.value(operand, frame)
+            if op == '<-':
+                items = [i for i in items if fmt(i) != fmt(raw)]
+            else:
+                items.extend(as_list(raw) if op == '|' else [raw])
+            store.set(key, items, expires)
+        else:
+            store.set(key, self.value(value, frame), expires)
+
+    def wait_ticks(self, args, frame):
+        value = self.split(args)[0] if args else '1t'
+        if value.startswith('delay:'):
+            value = value[6:]
+        seconds = parse_duration(fmt(self.value(value, frame)))
+        if seconds is None:
+            self.assumptions[frame.script].add(f"wait {value} counted as one tick")
+            return 1
+        return max(1, round(seconds * TICKS_PER_SECOND))
+
+    def waituntil(self, args, frame):
+        words = self.split(args)
+        rate, limit, condition = 1, None, []
+        for word in words:
+            option, value = split_key_value(word)
+            if option in ('rate', 'max') and value is not None:
+                seconds = parse_duration(fmt(self.value(value, frame))) or 0
+                if option == 'rate':
+                    rate = max(1, round(seconds * TICKS_PER_SECOND))
+                else:
+                    limit = round(seconds * TICKS_PER_SECOND)
+            else:
+                condition.append(word)
+        waited = 0
+        while not self.condition(' '.join(condition), frame):
+            if limit is not None and waited >= limit:
+                break
+            waited += rate
+            yield rate
+
+    def call(self, node, name, args, frame):
+        words = self.split(args)
+        if not words:
+            return
+        target = self.text(words[0], frame)
+        body, target_name = self.script_body(target)
+        if body is None:
+            if target_name:
+                self.assumptions[frame.script].add(f"{name} {target} not resolved")
+            return
+        if name == 'inject':
+            yield from self.execute(body.children, frame)
+            return
+
+        player = frame.player
+        defs = {}
+        delay = 0
+        params = self.definition_names(target_name)
+        for word in words[1:]:
+            option, value = split_key_value(word)
+            if value is None:
+                continue
+            if option == 'def':
+                pieces = [self.value(p, frame) for p in split_top(value, '|')]
+                if len(pieces) == 1 and isinstance(pieces[0], list):
+                    pieces = pieces[0]
+                defs.update(zip(params, pieces))
+            elif option.startswith('def.'):
+                defs[option[4:]] = self.value(value, frame)
+            elif option == 'player':
+                player = self.value(value, frame)
+            elif option == 'delay':
+                seconds = parse_duration(fmt(self.value(value, frame)))
+                delay = max(0, round((seconds or 0) * TICKS_PER_SECOND))
+        callee = Frame(target_name, player, {}, defs)
+
+        if node.text[1:].lstrip().startswith('~'):
+            try:
+                yield from self.execute(body.children, callee)
+            except StopQueue:
+                pass
+        else:
+            handler = self.running[-1].handler if self.running else None
+            self.start(self.execute(body.children, callee), target_name, handler, delay)
+
+    def definition_names(self, script):
+        definition = self.definitions.lookup(script)
+        container = self.trees.container(definition['file'], definition['name']) if definition else None
+        key = container.key('definitions') if container is not None else None
+        if key is None or not key.args:
+            return []
+        return [re.sub(r'\[.*$', '', d).strip() for d in split_top(key.args, '|')]
+
+    def ratelimit(self, node, args, frame):
+        words = self.split(args)
+        if len(words) < 2:
+            return
+        seconds = parse_duration(fmt(self.value(words[1], frame))) or 0
+        key = (node.line, id(node), fmt(self.value(words[0], frame)))
+        if self.ratelimits.get(key, -1) > self.tick:
+            raise StopQueue()
+        self.ratelimits[key] = self.tick + round(seconds * TICKS_PER_SECOND)
+
+    def procedure(self, name, args, frame):
+        body, target_name = self.script_body(name)
+        if body is None:
+            raise UnsupportedTag(f"proc[{name}]")
+        defs = dict(zip(self.definition_names(target_name), args))
+        callee = Frame(target_name, frame.player, {}, defs, proc=True)
+        try:
+            for _ in self.execute(body.children, callee):
+                self.assumptions[target_name].add("wait inside a procedure ignored")
+        except Determine as result:
+            return result.value
+        except StopQueue:
+            pass
+        raise TagError(f"proc {name} determined nothing")
+
+    # ---- conditions and tags
+
+    def split(self, text):
+        words = self.words.get(text)
+        if words is None:
+            words = self.words[text] = split_words(text)
+        return words
+
+    def condition(self, args, frame):
+        words = self.split(args)
+        if '(' in words or ')' in words:
+            self.assumptions[frame.script].add("parenthesised conditions are not modelled (false)")
+            return False
+        groups = [[]]
+        for word in words:
+            if word == '||':
+                groups.append([])
+            else:
+                groups[-1].append(word)
+        for group in groups:
+            terms = [[]]
+            for word in group:
+                if word == '&&':
+                    terms.append([])
+                else:
+                    terms[-1].append(word)
+            if all(self.compare(term, frame) for term in terms):
+                return True
+        return False
+
+    def operand(self, word, frame):
+        if word.startswith('!'):
+            return not truthy(self.value(word[1:], frame))
+        return self.value(word, frame)
+
+    def compare(self, term, frame):
+        if len(term) == 1:
+            return truthy(self.operand(term[0], frame))
+        if len(term) != 3 or term[1] not in COMPARISONS:
+            self.assumptions[frame.script].add(f"condition {' '.join(term)[:40]} not modelled (false)")
+            return False
+        left, op, right = self.operand(term[0], frame), term[1], self.operand(term[2], frame)
+        try:
+            a, b = number(left), number(right)
+        except TagError:
+            a, b = fmt(left).lower(), fmt(right).lower()
+            if op not in ('==', '!='):
+                return False
+        return {'==': a == b, '!=': a != b, '<': a < b, '>': a > b, '<=': a <= b, '>=': a >= b}[op]
+
+    def text(self, text, frame):
+        value = self.value(text, frame)
+        return value if isinstance(value, str) else fmt(value)
+
+    def value(self, text, frame):
+        """Evaluate every tag in text; a lone tag keeps its object (player, list, number)"""
+        segments = self.segments.get(text)
+        if segments is None:
+            segments = []
+            pos = 0
+            for match in TAG_START.finditer(text):
+                start = match.start()
+                if start < pos:
+                    continue
+                end = tag_end(text, start)
+                if start > pos:
+                    segments.append((False, text[pos:start]))
+                segments.append((True, text[start + 1:end - 1]))
+                pos = end
+            if pos < len(text) or not segments:
+                segments.append((False, text[pos:]))
+            self.segments[text] = segments
+        if len(segments) == 1:
+            is_tag, part = segments[0]
+            return self.tag(part, frame) if is_tag else part
+        return ''.join(fmt(self.tag(part, frame)) if is_tag else part for is_tag, part in segments)
+
+    def tag(self, body, frame):
+        parsed = self.tags.get(body)
+        if parsed is None:
+            parsed = self.tags[body] = parse_tag(body)
+        parts, fallback = parsed
+        try:
+            value = self.resolve(parts, frame)
+            if value is None:
+                raise TagError("null")
+            return value
+        except UnsupportedTag as e:
+            self.assumptions[frame.script].add(f"tag .{e} not modelled")
+            return self.value(fallback, frame) if fallback is not None else None
+        except TagError:
+            return self.value(fallback, frame) if fallback is not None else None
+
+    def resolve(self, parts, frame):
+        name, arg = parts[0]
+        rest = parts[1:]
+        arg_text = self.text(arg, frame) if arg is not None else None
+        if name == '[]':
+            if arg_text not in frame.defs:
+                raise TagError(f"no definition {arg_text}")
+            value = frame.defs[arg_text]
+        elif name == 'player':
+            value = frame.player
+        elif name == 'server':
+            value = self.server
+        elif name == 'util':
+            value = self.util
+        elif name in ('element', 'location', 'material'):
+            value = arg_text
+        elif name == 'item':
+            value = Item(arg_text)
+        elif name == 'script':
+            value = ScriptRef(arg_text or frame.script)
+        elif name == 'list':
+            value = [self.value(p, frame) for p in split_top(arg, '|')] if arg else []
+        elif name == 'context':
+            if not rest or rest[0][0] not in frame.context:
+                raise TagError("no such context")
+            value = frame.context[rest[0][0]]
+            rest = rest[1:]
+        elif name == 'proc':
+            params = []
+            if rest and rest[0][0] == 'context':
+                params = [self.value(p, frame) for p in split_top(rest[0][1] or '', '|')]
+                rest = rest[1:]
+            value = self.procedure(arg_text, params, frame)
+        elif name.startswith('&') or name in FORMAT_TAGS:
+            return ''
+        else:
+            raise UnsupportedTag(name)
+
+        for name, arg in rest:
+            if value is None:
+                raise TagError("null")
+            arg_text = self.text(arg, frame) if arg is not None else None
+            if isinstance(value, SimObject):
+                handler = getattr(value, 'tag_' + name, None)
+                if handler is None:
+                    raise UnsupportedTag(name)
+                value = handler(self, arg_text)
+            else:
+                value = element_tag(self, value, name, arg_text)
+        return value
+
+    # ---- setup and report
+
+    def setup(self, scripts, flags):
+        """Run setup scripts and apply initial flags for every player; not counted"""
+        self.counting = False
+        for player in self.players:
+            for key, value in flags:
+                player.flags.set(key, value, None)
+            for script in scripts:
+                body, name = self.script_body(script)
+                if body is None:
+                    raise SystemExit(f"Setup script {script} not found")
+                try:
+                    for _ in self.execute(body.children, Frame(name, player, {'args': []})):
+                        self.assumptions[name].add("wait inside a setup script ignored")
+                except StopQueue:
+                    pass
+        self.counting = True
+
+    def report(self, seconds):
+        commands, live, flag_samples = self.run(seconds)
+        players = len(self.players)
+        ordered = sorted(commands)
+
+        def percentile(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0
+
+        handlers = []
+        for h in self.handlers:
+            event = h['event']
+            handlers.append({
+                'file': event['file'], 'line': event['line'], 'event': event['event'],
+                'script': h['script'], 'kind': h['kind'],
+                'firings': h['firings'],
+                'overlapping_firings': h['overlapping'],
+                'max_live_queues': h['max_live'],
+            })
+        handlers.sort(key=lambda h: (-h['max_live_queues'], -h['firings'], h['file'], h['line']))
+
+        queues = []
+        for script, stats in self.queue_stats.items():
+            running = stats['started'] - stats['finished']
+            queues.append({
+                'script': script,
+                'started': stats['started'],
+                'still_running': running,
+                'mean_ticks': stats['ticks'] / stats['finished'] if stats['finished'] else 0,
+                'max_ticks': stats['max_ticks'],
+            })
+        queues.sort(key=lambda q: (-q['started'], q['script']))
+
+        keys = Counter()
+        for holder in [self.server] + self.players:
+            for key in holder.flags.flags:
+                keys[key] += 1
+
+        total = sum(commands)
+        return {
+            'players': players,
+            'seconds': seconds,
+            'ticks': len(commands),
+            'commands': {
+                'total': total,
+                'per_tick': {
+                    'mean': total / len(commands) if commands else 0,
+                    'p50': percentile(0.5),
+                    'p95': percentile(0.95),
+                    'max': ordered[-1] if ordered else 0,
+                },
+                'per_second_per_player': total / seconds / players if players and seconds else 0,
+                'by_script': dict(self.commands_by_script.most_common()),
+                'not_modelled': dict(self.opaque.most_common()),
+            },
+            'queues': {
+                'started': sum(q['started'] for q in queues),
+                'max_live': max(live, default=0),
+                'mean_live': sum(live) / len(live) if live else 0,
+                'by_script': queues,
+            },
+            'flags': {
+                'entries': flag_samples[-1]['entries'],
+                'bytes': flag_samples[-1]['bytes'],
+                'max_entries': max(s['entries'] for s in flag_samples),
+                'max_bytes': max(s['bytes'] for s in flag_samples),
+                'keys': dict(keys.most_common(40)),
+            },
+            'handlers': handlers,
+            'events_not_simulated': dict(sorted(self.skipped.items())),
+            'series': {
+                'commands_per_second': [sum(commands[i:i + TICKS_PER_SECOND])
+                                        for i in range(0, len(commands), TICKS_PER_SECOND)],
+                'max_live_queues_per_second': [max(live[i:i + TICKS_PER_SECOND])
+                                               for i in range(0, len(live), TICKS_PER_SECOND)],
+                'flag_entries': [s['entries'] for s in flag_samples],
+            },
+            'assumptions': {k: sorted(v) for k, v in sorted(self.assumptions.items())},
+        }
+
+def parse_flag(option):
+    key, _, value = option.partition('=')
+    if '|' in value:
+        return key, value.split('|')
+    try:
+        return key, float(value)
+    except ValueError:
+        return key, value or True
+
+def format_summary(report, baseline=None):
+    c, q, f = report['commands'], report['queues'], report['flags']
+    rows = [
+        ("commands/tick (mean)", c['per_tick']['mean']),
+        ("commands/tick (p95)", c['per_tick']['p95']),
+        ("commands/tick (max)", c['per_tick']['max']),
+        ("commands/s per player", c['per_second_per_player']),
+        ("live queues (mean)", q['mean_live']),
+        ("live queues (max)", q['max_live']),
+        ("flag entries (max)", f['max_entries']),
+        ("flag bytes (max)", f['max_bytes']),
+    ]
+    old = {}
+    if baseline:
+        bc, bq, bf = baseline['commands'], baseline['queues'], baseline['flags']
+        old = dict(zip([r[0] for r in rows], [
+            bc['per_tick']['mean'], bc['per_tick']['p95'], bc['per_tick']['max'],
+            bc['per_second_per_player'], bq['mean_live'], bq['max_live'],
+            bf['max_entries'], bf['max_bytes'],
+        ]))
+    lines = [f"✓ Simulated {report['seconds']:g}s ({report['ticks']} ticks) with {report['players']} players"]
+    if baseline and (baseline['players'], baseline['seconds']) != (report['players'], report['seconds']):
+        lines.append(f"  ⚠️  baseline ran {baseline['seconds']:g}s with {baseline['players']} players")
+    for label, value in rows:
+        line = f"  {label:<24} {value:>12,.2f}"
+        if label in old:
+            delta = value - old[label]
+            pct = f" ({delta / old[label] * 100:+.1f}%)" if old[label] else ""
+            line += f"   baseline {old[label]:>12,.2f}  {delta:+,.2f}{pct}"
+        lines.append(line)
+    overlapping = [h for h in report['handlers'] if h['overlapping_firings']]
+    for h in overlapping[:5]:
+        lines.append(f"  ⚠️  {h['file']}:{h['line']} `{h['event'][:40]}`: {h['overlapping_firings']} of "
+                     f"{h['firings']} firings overlapped a previous one (max {h['max_live_queues']} live queues)")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate timer and player handlers against synthetic players")
+    parser.add_argument('--players', type=int, default=50, help="synthetic players online (default 50)")
+    parser.add_argument('--seconds', type=float, default=60, help="simulated time (default 60)")
+    parser.add_argument('--sneaking', type=float, default=0.25,
+                        help="fraction of players standing still while sneaking (default 0.25)")
+    parser.add_argument('--click-rate', type=float, default=CLICK_RATE,
+                        help=f"right clicks per player per second (default {CLICK_RATE:g})")
+    parser.add_argument('--world', action='append', metavar='NAME',
+                        help="only simulate handlers in these world scripts (repeatable)")
+    parser.add_argument('--setup', action='append', default=[], metavar='SCRIPT',
+                        help="run a task/command script for every player before the simulation (repeatable)")
+    parser.add_argument('--flag', action='append', default=[], metavar='KEY=VALUE',
+                        help="initial player flag, e.g. prepared_spells=fireball|spark (repeatable)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed (default 1)")
+    parser.add_argument('--output', default='docs/tick_sim.json', help="report location")
+    parser.add_argument('--compare', metavar='REPORT',
+                        help="print the change against an earlier report, e.g. before a script edit")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+    data = load_analysis(compact=True)
+    sim = TickSimulator(data, players=args.players, sneaking=args.sneaking, click_rate=args.click_rate,
+                        seed=args.seed, worlds={w.lower() for w in args.world} if args.world else None)
+    sim.setup(args.setup, [parse_flag(f) for f in args.flag])
+    report = sim.report(args.seconds)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(format_summary(report, baseline))
+    print(f"✓ Generated {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
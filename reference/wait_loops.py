@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Detect wait/waituntil inside loops on high-frequency paths
+Walks timer and per-player movement handlers plus the tasks they run, and
+estimates how many queues each handler keeps alive at once
+"""
+
+import json
+import math
+import argparse
+
+from analyze_denizen import load_analysis
+from dsc_tree import LOOP_COMMANDS, parse_duration
+from tick_budget import (HandlerWalker, PLAYER_COUNTS, timer_frequency,
+                         poly_mul, poly_add_into, poly_eval)
+
+WAIT_COMMANDS = ('wait', 'waituntil')
+
+# Per-player events that fire continuously while players move (firings/s per player)
+PLAYER_EVENT_RATES = (
+    ('player walks', 20.0),
+    ('player moves', 20.0),
+    ('player steps on', 5.0),
+)
+
+# A waituntil without max: re-checks every tick; count a single check
+WAITUNTIL_DEFAULT = 0.05
+
+def handler_frequency(event):
+    """Firings per second as a polynomial in P, or None for low-frequency events"""
+    frequency = timer_frequency(event)
+    if frequency is not None:
+        return [frequency]
+    event = event.lower()
+    for prefix, rate in PLAYER_EVENT_RATES:
+        if event.startswith(prefix):
+            return [0, rate]
+    return None
+
+def is_waitable(node):
+    """`- ~run ...` holds the calling queue until the task finishes"""
+    return node.text[1:].lstrip().startswith('~')
+
+class WaitLoopDetector(HandlerWalker):
+    """Finds blocking waits inside loops and models the queues they keep alive
+
+    A handler firing starts one queue. `inject` and `~run` execute in that
+    queue, so their waits add to its lifetime; a plain `run` starts a new
+    queue per call. A queue that lives longer than the firing interval
+    overlaps the next firing, so the live count at P players is
+    floor(firings/s x lifetime) + 1 for the handler, plus calls/s x lifetime
+    for every queue it spawns. Loop counts and branches follow TickBudget.
+    """
+
+    def __init__(self, data, root_dir=".", trees=None):
+        super().__init__(data, root_dir, trees)
+        self.findings = []
+
+    def handler_queues(self, event):
+        """Queues one firing creates: [{'script', 'count', 'duration'}], handler first"""
+        try:
+            node = self.event_node(event)
+        except OSError:
+            self.assumptions[event['file']].add("source not available")
+            return []
+        if node is None:
+            return []
+        label = self.definitions.container_at(event['file'], event['line'])[2]
+        queues = []
+        self.walk_queue(node.children, label, {}, (label,), [1], event, queues)
+        return queues
+
+    def walk_queue(self, nodes, script, env, stack, count, event, queues):
+        queue = {'script': script, 'count': count, 'duration': [0]}
+        queues.append(queue)
+        self.walk(nodes, [1], script, env, stack, (), queue, event, queues)
+
+    def walk(self, nodes, mult, script, env, stack, loops, queue, event, queues):
+        for node in nodes:
+            if node.kind != 'command':
+                continue
+            name = node.name
+            args = node.args.rstrip(':').strip()
+
+            if name == 'define':
+                self.track_define(args, env)
+
+            elif name in WAIT_COMMANDS:
+                seconds = self.wait_seconds(name, args, env, script)
+                poly_add_into(queue['duration'], mult, seconds)
+                if loops:
+                    definition = self.definitions.lookup(script)
+                    self.findings.append({
+                        'file': definition['file'] if definition else event['file'],
+                        'line': node.line,
+                        'command': node.text,
+                        'script': script,
+                        'loops': [f"{loop.name} {loop.args.rstrip(':').strip()} (line {loop.line})" for loop in loops],
+                        'seconds': seconds,
+                        'handler': {'file': event['file'], 'line': event['line'], 'event': event['event']},
+                    })
+
+            if node.children:
+                if name in LOOP_COMMANDS:
+                    child_mult = poly_mul(mult, self.loop_multiplier(name, args, env, script))
+                    self.walk(node.children, child_mult, script, env, stack, loops + (node,),
+                              queue, event, queues)
+                else:
+                    self.walk(node.children, mult, script, env, stack, loops, queue, event, queues)
+
+            if name in ('run', 'inject') and args:
+                target = args.split()[0]
+                body, target_name = self.script_body(target)
+                if body is None:
+                    if target_name:
+                        self.assumptions[script].add(f"{name} {target} not resolved")
+                    continue
+                if target_name in stack:
+                    continue
+                if name == 'inject' or is_waitable(node):
+                    self.walk(body.children, mult, target_name, env if name == 'inject' else {},
+                              stack + (target_name,), loops, queue, event, queues)
+                else:
+                    self.walk_queue(body.children, target_name, {}, stack + (target_name,),
+                                    poly_mul(queue['count'], mult), event, queues)
+
+    def wait_seconds(self, name, args, env, script):
+        if name == 'waituntil':
+            for arg in args.split():
+                if arg.startswith('max:'):
+                    seconds = parse_duration(arg[4:], env)
+                    if seconds is not None:
+                        return seconds
+            self.assumptions[script].add(f"waituntil without max: counted as {WAITUNTIL_DEFAULT:g}s")
+            return WAITUNTIL_DEFAULT
+        value = args.split()[0] if args else ''
+        seconds = parse_duration(value.split(':', 1)[1] if value.startswith('delay:') else value, env)
+        if seconds is None:
+            self.assumptions[script].add(f"wait {value} counted as one tick")
+            return 0.05
+        return seconds
+
+    def report(self):
+        handlers = []
+        for event in self.data['events']:
+            frequency = handler_frequency(event['event'])
+            if frequency is None:
+                continue
+            # The firing's own queue is always walked first
+            queues = self.handler_queues(event)
+            handler_queue = queues[0] if queues else None
+            queues = [q for q in queues if any(q['duration'])]
+            if not queues:
+                continue
+
+            projection = {}
+            for players in PLAYER_COUNTS:
+                rate = poly_eval(frequency, players)
+                live = 0.0
+                for q in queues:
+                    lifetime = rate * poly_eval(q['count'], players) * poly_eval(q['duration'], players)
+                    live += math.floor(lifetime + 1e-9) + 1 if q is handler_queue else lifetime
+                projection[players] = {'live_queues': live, 'per_player': live / players}
+
+            handlers.append({
+                'file': event['file'],
+                'line': event['line'],
+                'event': event['event'],
+                'per_second': frequency,
+                'queues': [{'script': q['script'], 'per_firing': q['count'], 'seconds': q['duration']}
+                           for q in queues],
+                'overlaps': poly_eval(frequency, 1) * poly_eval(handler_queue['duration'], 1) >= 1 - 1e-9,
+                'projection': projection,
+            })
+
+        handlers.sort(key=lambda h: (-h['projection'][50]['live_queues'], h['file'], h['line']))
+        findings = sorted({(f['file'], f['line'], f['handler']['file'], f['handler']['line']): f
+                           for f in self.findings}.values(),
+                          key=lambda f: (f['file'], f['line'], f['handler']['file'], f['handler']['line']))
+        return {
+            'player_counts': list(PLAYER_COUNTS),
+            'findings': findings,
+            'handlers': handlers,
+            'assumptions': {k: sorted(v) for k, v in sorted(self.assumptions.items())},
+        }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find waits inside loops on high-frequency handler paths")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    parse_args(argv)
+    data = load_analysis(compact=True)
+    report = WaitLoopDetector(data).report()
+
+    with open('docs/wait_loops.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"✓ Found {len(report['findings'])} waits inside loops on high-frequency paths")
+    for h in report['handlers'][:10]:
+        p = h['projection'][50]
+        print(f"  {h['file']}:{h['line']} `{h['event'][:40]}`: "
+              f"{p['live_queues']:,.1f} live queues at 50 players ({p['per_player']:.2f}/player)")
+    print("✓ Generated docs/wait_loops.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Watch scripts/ and data/ with Linux inotify and sync changes to the local server
+Replaces the polling and fswatch watchers: bursts of saves are debounced,
+only the changed files are copied, and only those files are re-analyzed
+"""
+
+import os
+import sys
+import time
+import shutil
+import struct
+import signal
+import ctypes
+import ctypes.util
+import argparse
+import selectors
+from pathlib import Path
+
+from analyze_denizen import (DenizenAnalyzer, AnalysisCache, parse_file_compact,
+                             CACHE_FILE, RECORDS_FILE)
+from file_inventory import FileEntry, FileInventory, INVENTORY_FILE
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DIRS = ('scripts', 'data')
+DEFAULT_DEST = "_server_local/plugins/Denizen"
+WATCHED_SUFFIXES = ('.dsc', '.yml')
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+class Inotify:
+    """Minimal ctypes binding: recursive directory watches and decoded events"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.libc.inotify_init1.argtypes = [ctypes.c_int]
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}
+
+    def add_tree(self, root):
+        """Watch a directory and everything below it; returns the files found"""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            self.add(Path(dirpath))
+            files.extend(Path(dirpath) / name for name in filenames)
+        return files
+
+    def add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            print(f"⚠️  Cannot watch {path}: {os.strerror(errno)}")
+            return
+        self.paths[wd] = path
+
+    def read(self):
+        """Yield (mask, path) for every queued event"""
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            if mask & IN_Q_OVERFLOW:
+                yield mask, None
+                continue
+            base = self.paths.get(wd)
+            if base is not None:
+                yield mask, base / os.fsdecode(name) if name else base
+
+    def close(self):
+        os.close(self.fd)
+
+class WatchSync:
+    """Debounced inotify loop that copies changed files and re-analyzes them
+
+    Events are coalesced per path until the tree has been quiet for the
+    debounce window (or max_delay has passed since the first event), then
+    each path is copied or removed once. Changed scripts are re-parsed
+    individually and spliced into the in-memory per-file results, so no
+    cycle ever rescans the whole tree.
+    """
+
+    def __init__(self, repo_root, dest, debounce=0.02, max_delay=0.08, analyze=True,
+                 output_format='both'):
+        self.repo_root = Path(repo_root)
+        self.sources = [self.repo_root / d for d in SOURCE_DIRS if (self.repo_root / d).is_dir()]
+        self.dest = Path(dest)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.analyze = analyze
+        self.output_format = output_format
+        self.inotify = Inotify()
+        self.pending = {}
+        self.first_event = None
+        self.last_event = None
+
+        # Scripts are analyzed from the repo root, as `analyze_denizen.py` run
+        # there does, so the cache, records and inventory stay shared with it
+        self.cache = AnalysisCache(CACHE_FILE) if analyze else None
+        self.results = {}
+        self.entries = {}
+
+    def target(self, path):
+        """Destination for a source path"""
+        for source in self.sources:
+            try:
+                rel = path.relative_to(source)
+            except ValueError:
+                continue
+            return self.dest / source.name / rel
+        return None
+
+    def start(self):
+        """Watch the sources, reconcile the destination once, and load the analysis"""
+        for source in self.sources:
+            (self.dest / source.name).mkdir(parents=True, exist_ok=True)
+            self.reconcile(source, self.inotify.add_tree(source))
+
+        if self.analyze:
+            analyzer = DenizenAnalyzer(self.repo_root)
+            self.results = analyzer.collect_incremental(analyzer.find_dsc_files(), 1, self.cache)
+            self.entries = dict(analyzer.inventory.by_rel)
+            self.write_analysis()
+
+    def reconcile(self, source, files):
+        """Startup pass: copy what differs, remove what the source no longer has"""
+        copied = removed = 0
+        wanted = set()
+        for path in files:
+            if not path.name.endswith(WATCHED_SUFFIXES):
+                continue
+            target = self.target(path)
+            wanted.add(target)
+            try:
+                st, dt = path.stat(), target.stat()
+                if st.st_size == dt.st_size and int(st.st_mtime) == int(dt.st_mtime):
+                    continue
+            except FileNotFoundError:
+                pass
+            self.copy(path, target)
+            copied += 1
+
+        for dirpath, _dirnames, filenames in os.walk(self.dest / source.name):
+            for name in filenames:
+                target = Path(dirpath) / name
+                if name.endswith(WATCHED_SUFFIXES) and target not in wanted:
+                    target.unlink()
+                    removed += 1
+        print(f"✓ {source.name}/: {copied} copied, {removed} removed")
+
+    def copy(self, path, target):
+        """Copy via a temp file + rename so the server never reads a partial script"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.sync")
+        shutil.copy2(path, tmp)
+        os.replace(tmp, target)
+
+    def run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.inotify.fd, selectors.EVENT_READ)
+        for source in self.sources:
+            print(f"👀 Watching {source.relative_to(self.repo_root)}/ → {self.dest / source.name}")
+        print("   Press Ctrl+C to stop")
+
+        try:
+            while True:
+                timeout = None
+                if self.first_event is not None:
+                    timeout = max(0.0, self.due() - time.monotonic())
+                if selector.select(timeout):
+                    self.collect()
+                # A steady stream of events still flushes once max_delay is reached
+                if self.first_event is not None and time.monotonic() >= self.due():
+                    self.flush()
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+        finally:
+            selector.close()
+            self.inotify.close()
+            if self.cache is not None:
+                self.cache.save()
+
+    def due(self):
+        """When the pending batch should be flushed"""
+        return min(self.last_event + self.debounce, self.first_event + self.max_delay)
+
+    def collect(self):
+        """Coalesce queued events into pending path -> 'changed' / 'deleted'"""
+        now = time.monotonic()
+        for mask, path in self.inotify.read():
+            if path is None:
+                print("⚠️  inotify queue overflowed; re-scanning sources")
+                for source in self.sources:
+                    self.mark_tree(source)
+            elif mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files can land before the new watch exists, so pick them up now
+                    for path_in_dir in self.inotify.add_tree(path):
+                        self.pending[path_in_dir] = 'changed'
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.pending[path] = 'deleted_dir'
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                continue
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.pending[path] = 'deleted'
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self.pending[path] = 'changed'
+            else:
+                continue
+            if self.first_event is None:
+                self.first_event = now
+            self.last_event = now
+
+    def mark_tree(self, source):
+        for dirpath, _dirnames, filenames in os.walk(source):
+            for name in filenames:
+                self.pending[Path(dirpath) / name] = 'changed'
+
+    def flush(self):
+        """Apply one coalesced batch: sync first, then re-analyze"""
+        pending, self.pending = self.pending, {}
+        started, self.first_event = self.first_event, None
+
+        synced = []
+        for path, change in sorted(pending.items()):
+            target = self.target(path)
+            if target is None:
+                continue
+            if change == 'deleted_dir':
+                if target.is_dir():
+                    shutil.rmtree(target)
+                synced.append((path, change))
+            elif not path.name.endswith(WATCHED_SUFFIXES):
+                continue
+            elif change == 'changed' and path.is_file():
+                self.copy(path, target)
+                synced.append((path, change))
+            elif change != 'changed' or not path.exists():
+                if target.exists():
+                    target.unlink()
+                synced.append((path, 'deleted'))
+
+        if not synced:
+            return
+        latency = (time.monotonic() - started) * 1000
+        names = ", ".join(str(p.relative_to(self.repo_root)) for p, _ in synced[:3])
+        more = f" (+{len(synced) - 3} more)" if len(synced) > 3 else ""
+        print(f"✅ Synced {len(synced)} file(s) in {latency:.0f} ms: {names}{more}")
+
+        if self.analyze:
+            self.reanalyze(synced)
+
+    def reanalyze(self, synced):
+        """Re-parse the changed scripts and rewrite the merged analysis"""
+        started = time.monotonic()
+        parsed = 0
+        for path, change in synced:
+            # A destination inside the repo is part of the analysis root too
+            target = self.target(path)
+            for changed in (path, target):
+                if changed is not None:
+                    parsed += self.update(changed, change)
+
+        self.write_analysis()
+        elapsed = (time.monotonic() - started) * 1000
+        print(f"   Re-analyzed {parsed} file(s) in {elapsed:.0f} ms")
+
+    def update(self, path, change):
+        """Splice one path's change into the results and inventory; 1 if it was parsed"""
+        try:
+            rel = path.relative_to(self.repo_root).as_posix()
+        except ValueError:
+            return 0
+        if change == 'deleted_dir':
+            for gone in [r for r in self.results if r.startswith(rel + '/')]:
+                del self.results[gone]
+                self.entries.pop(gone, None)
+                self.cache.discard(gone)
+            return 0
+        if path.suffix != '.dsc':
+            return 0
+        result = None
+        if change != 'deleted':
+            try:
+                st = path.stat()
+                entry = FileEntry(path, rel, st.st_size, st.st_mtime_ns)
+                result = self.cache.lookup(path, rel, entry)
+            except FileNotFoundError:
+                change = 'deleted'
+        if change == 'deleted':
+            self.entries.pop(rel, None)
+            if self.results.pop(rel, None) is not None:
+                self.cache.discard(rel)
+            return 0
+        parsed = 0
+        if result is None:
+            result = parse_file_compact(str(self.repo_root), str(path))
+            self.cache.store(result)
+            parsed = 1
+        self.results[rel] = result
+        self.entries[rel] = entry
+        return parsed
+
+    def write_analysis(self):
+        """Merge per-file results in file order and write the analysis outputs and inventory"""
+        analyzer = DenizenAnalyzer(self.repo_root, compact=True)
+        if self.output_format in ('both', 'jsonl'):
+            analyzer.open_stream(RECORDS_FILE)
+        for rel in sorted(self.results, key=Path):
+            analyzer.merge_compact(self.results[rel])
+        analyzer.close_stream()
+        if self.output_format in ('both', 'json'):
+            analyzer.save_json("docs/analysis.json")
+        inventory = FileInventory(".", sorted(self.entries.values(), key=lambda e: e.path))
+        inventory.save(INVENTORY_FILE)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sync scripts/ and data/ to a local server on every save")
+    parser.add_argument('--dest', default=str(REPO_ROOT / DEFAULT_DEST),
+                        help=f"Denizen plugin directory to sync into (default {DEFAULT_DEST})")
+    parser.add_argument('--debounce', type=float, default=20,
+                        help="quiet period in ms before a burst of saves is synced")
+    parser.add_argument('--max-delay', type=float, default=80,
+                        help="sync at most this many ms after the first change of a burst")
+    parser.add_argument('--no-analyze', action='store_true',
+                        help="only sync; skip re-analysis of changed scripts")
+    parser.add_argument('--format', choices=['both', 'jsonl', 'json'], default='jsonl',
+                        help="analysis outputs to rewrite after each batch")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    if not sys.platform.startswith('linux'):
+        print("❌ watch_sync.py needs Linux inotify")
+        return 1
+    args = parse_args(argv)
+    # Analysis outputs (docs/...) live under the repo root, like a manual run
+    os.chdir(REPO_ROOT)
+    watcher = WatchSync(REPO_ROOT, Path(args.dest), debounce=args.debounce / 1000,
+                        max_delay=args.max_delay / 1000, analyze=not args.no_analyze,
+                        output_format=args.format)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    watcher.start()
+    watcher.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())